@@ -0,0 +1,102 @@
+"""
+Measure the latency of the websocket updates while a large copy is executed,
+with the copy running in the main event loop and in the command loop
+
+The copy mimics the Copy command: the file system checks are executed in the loop
+and the chunks are copied in a thread. On a network share each check takes a few
+milliseconds, this is simulated with a sleep of STAT_LATENCY. The updates are coroutines
+registered on the main loop at each TICK, like the messages received from the websocket server
+
+usage: python script/benchmark/command_loop.py [file_count] [file_size_kb]
+"""
+
+import os
+import pathlib
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from silex_client.core.event_loop import EventLoop
+from silex_client.utils.thread import execute_in_thread
+
+TICK = 0.01
+STAT_LATENCY = 0.005
+
+
+def copy_file(src: pathlib.Path, dst: pathlib.Path):
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        while True:
+            buf = fsrc.read(64 * 1024)
+            if not buf:
+                break
+            fdst.write(buf)
+
+
+async def large_copy(src_paths: list, dst_dir: pathlib.Path):
+    for src_path in src_paths:
+        dst_path = dst_dir / src_path.name
+        # Blocking checks executed in the loop, like in the Copy command
+        os.makedirs(dst_path.parent, exist_ok=True)
+        if dst_path.exists():
+            os.remove(dst_path)
+        os.path.getsize(src_path)
+        time.sleep(STAT_LATENCY)
+        await execute_in_thread(copy_file, src_path, dst_path)
+
+
+async def update(registered_time: float, latencies: list):
+    latencies.append(time.perf_counter() - registered_time)
+
+
+def run(src_paths: list, root: pathlib.Path, command_loop: bool):
+    event_loop = EventLoop()
+    event_loop.command_loop_enabled = command_loop
+    event_loop.start()
+    time.sleep(0.1)
+
+    dst_dir = root / "dst"
+    shutil.rmtree(dst_dir, ignore_errors=True)
+    latencies: list = []
+
+    start = time.perf_counter()
+    copy_future = event_loop.register_command_task(large_copy(src_paths, dst_dir))
+    while not copy_future.done():
+        event_loop.register_task(update(time.perf_counter(), latencies))
+        time.sleep(TICK)
+    copy_future.result()
+    duration = time.perf_counter() - start
+
+    event_loop.stop()
+    # statistics.quantiles requires python 3.8
+    p95 = sorted(latencies)[int(0.95 * (len(latencies) - 1))]
+    mode = "command" if command_loop else "main"
+    print(
+        f"{mode:<8} loop copy: {duration * 1000:8.1f} ms | "
+        f"update latency max: {max(latencies) * 1000:8.1f} ms, "
+        f"p95: {p95 * 1000:6.2f} ms, "
+        f"mean: {statistics.mean(latencies) * 1000:6.2f} ms"
+    )
+
+
+def main():
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    file_size = int(sys.argv[2]) * 1024 if len(sys.argv) > 2 else 256 * 1024
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = pathlib.Path(temp_dir)
+        src_dir = root / "src"
+        src_dir.mkdir()
+        src_paths = []
+        for index in range(file_count):
+            src_path = src_dir / f"render.{index:04d}.exr"
+            src_path.write_bytes(os.urandom(file_size))
+            src_paths.append(src_path)
+
+        for command_loop in [False, True]:
+            run(src_paths, root, command_loop)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Compare the throughput and the CPU time of the copy methods on large files:
+the former bytes loop of the Copy command, the buffered copy with a reused buffer,
+the kernel copy (copy_file_range / sendfile), the full copy_file (with reflink)
+and the parallel range copy (with fsync and verification)
+
+usage: python script/benchmark/file_copy.py [file_size_mb] [directory]
+"""
+
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+from silex_client.utils import transfer
+from silex_client.utils.datatypes import SharedVariable
+
+
+def bytes_loop(src: pathlib.Path, dst: pathlib.Path, progress: SharedVariable):
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        while True:
+            buf = fsrc.read(64 * 1024)
+            if not buf:
+                break
+            progress.value += fdst.write(buf)
+
+
+def buffered(src: pathlib.Path, dst: pathlib.Path, progress: SharedVariable):
+    def report(size: int):
+        progress.value += size
+
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        transfer.copy_file_buffered(fsrc, fdst, report)
+
+
+def kernel(src: pathlib.Path, dst: pathlib.Path, progress: SharedVariable):
+    def report(size: int):
+        progress.value += size
+
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        copied = transfer.copy_file_kernel(fsrc, fdst, src.stat().st_size, report)
+        if copied != src.stat().st_size:
+            raise RuntimeError("The kernel copy is not supported on this filesystem")
+
+
+def main():
+    file_size = (int(sys.argv[1]) if len(sys.argv) > 1 else 512) * 1024 * 1024
+    directory = sys.argv[2] if len(sys.argv) > 2 else None
+
+    with tempfile.TemporaryDirectory(dir=directory) as temp_dir:
+        src = pathlib.Path(temp_dir) / "src.exr"
+        dst = pathlib.Path(temp_dir) / "dst.exr"
+        with open(src, "wb") as fsrc:
+            for _ in range(file_size // (16 * 1024 * 1024)):
+                fsrc.write(os.urandom(16 * 1024 * 1024))
+
+        methods = [
+            ("bytes loop", bytes_loop),
+            ("buffered", buffered),
+            ("kernel", kernel),
+            ("copy_file", transfer.copy_file),
+            ("ranges", transfer.copy_file_ranges),
+        ]
+        for name, method in methods:
+            # The first run warms up the page cache
+            for _ in range(2):
+                if dst.exists():
+                    dst.unlink()
+                progress = SharedVariable(0)
+                start, start_cpu = time.perf_counter(), time.process_time()
+                try:
+                    method(src, dst, progress)
+                except RuntimeError as exception:
+                    print(f"{name:<10} skipped: {exception}")
+                    break
+                duration = time.perf_counter() - start
+                cpu_time = time.process_time() - start_cpu
+
+            else:
+                assert progress.value == file_size
+                print(
+                    f"{name:<10} {file_size / duration / 1024 ** 2:8.1f} MB/s | "
+                    f"wall: {duration * 1000:7.1f} ms, cpu: {cpu_time * 1000:7.1f} ms"
+                )
+
+
+if __name__ == "__main__":
+    main()
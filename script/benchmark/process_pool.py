@@ -0,0 +1,68 @@
+"""
+Measure the latency of the event loop while a 20k files sequence is analysed,
+with the sequence detection executed inline, in a thread and in the process pool
+
+usage: python script/benchmark/process_pool.py [file_count]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+
+from silex_client.core.event_loop import EventLoop
+from silex_client.utils.parsing import find_sequences_in_list
+
+TICK = 0.01
+
+
+async def measure_latency(stop: asyncio.Event, latencies: list):
+    """
+    Simulate the websocket updates: wake up every TICK and record how late it is
+    """
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        latencies.append(time.perf_counter() - start - TICK)
+
+
+async def run(event_loop: EventLoop, file_paths: list, mode: str):
+    stop = asyncio.Event()
+    latencies: list = []
+    ticker = asyncio.ensure_future(measure_latency(stop, latencies))
+    await asyncio.sleep(TICK * 5)
+
+    start = time.perf_counter()
+    if mode == "inline":
+        find_sequences_in_list(file_paths)
+    else:
+        await event_loop.run_in_process(find_sequences_in_list, file_paths)
+    duration = time.perf_counter() - start
+
+    await asyncio.sleep(TICK * 5)
+    stop.set()
+    await ticker
+
+    print(
+        f"{mode:<8} analysis: {duration * 1000:8.1f} ms | "
+        f"loop latency max: {max(latencies) * 1000:8.1f} ms, "
+        f"mean: {statistics.mean(latencies) * 1000:6.2f} ms"
+    )
+
+
+def main():
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    file_paths = [
+        f"/prod/shot/render/beauty.{index:05d}.exr" for index in range(file_count)
+    ]
+
+    event_loop = EventLoop()
+    for mode, process_pool_size in [("inline", 0), ("thread", 0), ("process", 2)]:
+        event_loop.process_pool_size = process_pool_size
+        asyncio.run(run(event_loop, file_paths, mode))
+
+    event_loop.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -54,6 +54,8 @@ class ActionBuffer(BaseBuffer):
     context_metadata: Dict[str, Any] = field(default_factory=dict)
     #: Category when displaying the action in shelves
     shelf: Optional[str] = field(default=None)
+    #: Max amount of commands executed concurrently, 1 executes the commands in order
+    max_parallelism: int = field(default=1)
 
     @property
     def child_type(self):
@@ -9,22 +9,36 @@ from __future__ import annotations
 import asyncio
 import copy
 import os
+import pathlib
 from concurrent import futures
-from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
 import jsondiff
 from silex_client.action.action_buffer import ActionBuffer
 from silex_client.core.context import Context
 from silex_client.resolve.config import Config
-from silex_client.utils.datatypes import ReadOnlyDict
+from silex_client.utils.datatypes import CommandOutput, ReadOnlyDict
 from silex_client.utils.enums import Execution, Status
 from silex_client.utils.log import logger
-from silex_client.utils.serialiser import silex_diff
+from silex_client.utils.serialiser import LOG_STREAM_CAPABILITY, silex_diff
+from silex_client.utils.thread import get_thread_pool
+from silex_client.utils.trash import purge_action_trash
 
 # Forward references
 if TYPE_CHECKING:
     from silex_client.action.command_buffer import CommandBuffer
     from silex_client.action.step_buffer import StepBuffer
+    from silex_client.core.action_scheduler import ActionScheduler
     from silex_client.core.event_loop import EventLoop
     from silex_client.network.websocket import WebsocketConnection
 
@@ -51,6 +65,7 @@ class ActionQuery:
             return
 
         self.event_loop: EventLoop = context.event_loop
+        self.action_scheduler: ActionScheduler = context.action_scheduler
         self.ws_connection: WebsocketConnection = context.ws_connection
 
         self.buffer: ActionBuffer = ActionBuffer(
@@ -68,12 +83,26 @@ class ActionQuery:
         self.command_iterator: CommandIterator = self.iter_commands()
         self._buffer_diff = copy.deepcopy(self.buffer.serialize())
         self._task: Optional[asyncio.Task] = None
+        # The commands being executed by the parallel scheduler
+        self._running_commands: Dict[asyncio.Task, CommandBuffer] = {}
+        self._prompt_lock: Optional[asyncio.Lock] = None
         self.closed = futures.Future()
         self.batch = False
+        # The trash directories of the files removed by the action, purged once closed
+        self.trash_roots: Set[pathlib.Path] = set()
+        self.closed.add_done_callback(lambda _: self.purge_trash())
 
         context.register_action(self)
 
     async def execute_commands(self, step_by_step: bool = False) -> None:
+        if (
+            self.max_parallelism > 1
+            and not step_by_step
+            and self.execution_type is Execution.FORWARD
+        ):
+            await self.execute_commands_parallel()
+            return
+
         command_iterator = self.command_iterator
         if step_by_step:
             command_iterator = [next(self.command_iterator)]
@@ -103,6 +132,184 @@ class ActionQuery:
         # Inform the UI of the state of the action (either completed or sucess)
         await self.async_update_websocket()
 
+    async def execute_commands_parallel(self) -> None:
+        """
+        Execute the commands as soon as their dependencies are completed,
+        with at most max_parallelism commands running at the same time.
+
+        The commands of a step are executed in order, and the steps in order, except the
+        steps inserted by the different iterations of an IterateAction, which run concurrently.
+        A command always waits for the commands it references with !command-output.
+        The prompts are serialized.
+        """
+        started: Set[str] = set()
+        completed: Set[str] = set()
+        running = self._running_commands
+
+        # When the action is resumed (after a pause, an undo or an error),
+        # the commands that are already completed are not executed again
+        for command in self.commands:
+            if command.status is Status.COMPLETED:
+                started.add(command.uuid)
+                completed.add(command.uuid)
+            elif command.status is Status.ERROR:
+                # Like in sequential mode, the command that errored out is retried
+                command.status = Status.INITIALIZED
+
+        async def execute_command(command: CommandBuffer) -> None:
+            # If the command requires an input from user, wait for the response
+            if command.require_prompt():
+                await self.prompt_command(command)
+
+            await command.setup(self)
+            await command.execute(self, self.execution_type)
+
+        try:
+            while True:
+                # The list of commands is queried at each loop,
+                # since the commands can insert new steps
+                ready_commands = self._get_ready_commands(
+                    started, completed, self.max_parallelism - len(running)
+                )
+                if self.buffer.status in [Status.INVALID, Status.ERROR]:
+                    ready_commands = []
+                if self.execution_type is not Execution.FORWARD:
+                    ready_commands = []
+                # The slot might have been given away while the commands waited for the user
+                if ready_commands:
+                    await self.action_scheduler.resume(self)
+
+                for index, command in ready_commands:
+                    if len(running) >= self.max_parallelism:
+                        break
+
+                    started.add(command.uuid)
+                    command.status = Status.INITIALIZED
+                    # Keep the iterator on the furthest command started,
+                    # so an undo goes back through all of them in order
+                    self.command_iterator.command_index = max(
+                        self.command_iterator.command_index, index
+                    )
+                    running[asyncio.ensure_future(execute_command(command))] = command
+
+                if not running:
+                    break
+
+                # The running commands might all be waiting for the user
+                self.action_scheduler.release_if_suspended(self)
+                done, _ = await asyncio.wait(
+                    running.keys(), return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    completed.add(running.pop(task).uuid)
+                    task.result()
+        finally:
+            # When the action is cancelled, the running commands are cancelled with it
+            for task in running:
+                task.cancel()
+            running.clear()
+
+        if self.buffer.status in [Status.INVALID, Status.ERROR]:
+            logger.error(
+                "Stopping action %s because the buffer is invalid or errored out",
+                self.name,
+            )
+
+        # Inform the UI of the state of the action (either completed or sucess)
+        await self.async_update_websocket()
+
+    @staticmethod
+    def _is_step_barrier(previous_step: StepBuffer, step: StepBuffer) -> bool:
+        """
+        Check if the given step must wait for the previous step to be completed.
+        The steps inserted in different branches of the same IterateAction are independent
+        """
+        for (group, branch), (other_group, other_branch) in zip(
+            previous_step.branches, step.branches
+        ):
+            if group != other_group:
+                return True
+            if branch != other_branch:
+                return False
+        return True
+
+    def _get_ready_commands(
+        self, started: Set[str], completed: Set[str], limit: Optional[int] = None
+    ) -> List[Tuple[int, CommandBuffer]]:
+        """
+        Get the commands that are not started yet, and with all their dependencies completed
+        A command depends on:
+            - the previous command in its step
+            - the commands it references with !command-output
+            - all the commands of the previous steps, except the steps of the other
+              branches of the same IterateAction
+        At most limit commands are returned
+        """
+        commands_paths: Dict[str, CommandBuffer] = {}
+        positions: Dict[str, int] = {}
+        ready_commands: List[Tuple[int, CommandBuffer]] = []
+        incomplete_steps: List[StepBuffer] = []
+        if limit is not None and limit <= 0:
+            return ready_commands
+
+        def references_completed(command: CommandBuffer) -> bool:
+            # The output of a command can also be a reference to an other command's output
+            for parameter in command.parameters.values():
+                value = parameter.value
+                visited: Set[str] = set()
+                while isinstance(value, CommandOutput):
+                    referenced = commands_paths.get(value.get_command_path())
+                    # The references to the next commands are ignored, like in sequential mode
+                    if (
+                        referenced is None
+                        or referenced.uuid in visited
+                        or positions[referenced.uuid] >= positions[command.uuid]
+                    ):
+                        break
+                    if referenced.uuid not in completed:
+                        return False
+
+                    visited.add(referenced.uuid)
+                    output_keys = value.output_keys
+                    value = referenced.output_result
+                    for key in output_keys:
+                        if isinstance(value, dict):
+                            value = value.get(key, {})
+            return True
+
+        # The steps are ordered by index
+        for step in self.steps:
+            step_blocked: Optional[bool] = None
+            step_completed = True
+            previous_command: Optional[CommandBuffer] = None
+            for name, command in step.commands.items():
+                commands_paths[f"{step.name}:{name}"] = command
+                commands_paths.setdefault(name, command)
+                positions[command.uuid] = len(positions)
+                step_completed = step_completed and command.uuid in completed
+
+                is_candidate = command.uuid not in started and (
+                    previous_command is None or previous_command.uuid in completed
+                )
+                previous_command = command
+                if not is_candidate:
+                    continue
+
+                if step_blocked is None:
+                    step_blocked = any(
+                        self._is_step_barrier(incomplete_step, step)
+                        for incomplete_step in incomplete_steps
+                    )
+                if not step_blocked and references_completed(command):
+                    ready_commands.append((positions[command.uuid], command))
+                    if limit is not None and len(ready_commands) >= limit:
+                        return ready_commands
+
+            if not step_completed:
+                incomplete_steps.append(step)
+
+        return ready_commands
+
     def execute(self, batch=False, step_by_step: bool = False) -> futures.Future:
         """
         Register a task that will execute the action's commands in order
@@ -136,15 +343,21 @@ class ActionQuery:
         # Initialize the communication with the websocket server
         self.initialize_websocket()
 
+        async def execute_scheduled():
+            # Wait for a free slot, too many actions might be running already
+            async with self.action_scheduler.running(self):
+                await self.execute_commands(step_by_step)
+            # Nobody can undo an action executed in batch mode once it is completed
+            if self.batch and self.status is Status.COMPLETED:
+                self.purge_trash()
+
         async def create_task():
             # Execute the task that will run all the commands
-            self._task = self.event_loop.loop.create_task(
-                self.execute_commands(step_by_step)
-            )
+            self._task = asyncio.get_event_loop().create_task(execute_scheduled())
             await self._task
 
-        # Execute the commands in the event loop
-        return self.event_loop.register_task(create_task())
+        # Execute the commands in the command loop, or in the event loop if disabled
+        return self.event_loop.register_command_task(create_task())
 
     async def prompt_commands(self, start: int = None, end: int = None):
         """
@@ -154,39 +367,59 @@ class ActionQuery:
         if start is None:
             start = self.current_command_index
 
-        # Get the range of commands
-        commands_prompt = self.commands[start:end]
-        # Set the commands to WAITING_FOR_RESPONSE
-        for index, command_left in enumerate(commands_prompt):
-            await command_left.setup(self)
-            if not command_left.require_prompt():
-                end = start + index if start is not None else index
-                break
-            command_left.ask_user = True
-            command_left.status = Status.WAITING_FOR_RESPONSE
-            command_left.hide = False
-
-        # Send the update to the UI and wait for its response
-        while (
-            self.ws_connection.is_running
-            and not self.buffer.hide
-            and self.commands[start].require_prompt()
-        ):
-            # Call the setup on all the commands
-            for command in self.commands[start:end]:
-                await command.setup(self)
-            # Wait for a response from the UI
-            logger.debug("Waiting for UI response")
-            await asyncio.wait_for(
-                await self.async_update_websocket(apply_response=True), None
-            )
-
-        # Put the commands back to initialized
-        for index, command_left in enumerate(self.commands[start:end]):
-            command_left.ask_user = False
-            command_left.status = Status.INITIALIZED
+        async with self.prompt_lock:
+            # Get the range of commands
+            commands_prompt = self.commands[start:end]
+            # Set the commands to WAITING_FOR_RESPONSE
+            for index, command_left in enumerate(commands_prompt):
+                await command_left.setup(self)
+                if not command_left.require_prompt():
+                    commands_prompt = commands_prompt[:index]
+                    break
+                command_left.ask_user = True
+                command_left.status = Status.WAITING_FOR_RESPONSE
+                command_left.hide = False
+
+            # Send the update to the UI and wait for its response
+            while (
+                self.ws_connection.is_running
+                and not self.buffer.hide
+                and commands_prompt
+                and commands_prompt[0].require_prompt()
+            ):
+                # Call the setup on all the commands
+                for command in commands_prompt:
+                    await command.setup(self)
+                # Wait for a response from the UI, without holding a slot in the scheduler
+                logger.debug("Waiting for UI response")
+                async with self.action_scheduler.suspend(self):
+                    await asyncio.wait_for(
+                        await self.async_update_websocket(apply_response=True), None
+                    )
+
+            # Put the commands back to initialized
+            for command_left in commands_prompt:
+                command_left.ask_user = False
+                command_left.status = Status.INITIALIZED
+
+            await asyncio.wait_for(await self.async_update_websocket(), None)
+
+    async def prompt_command(self, command: CommandBuffer):
+        """
+        Ask a user input for the given command only
+        """
+        index = self.commands.index(command)
+        await self.prompt_commands(index, index + 1)
 
-        await asyncio.wait_for(await self.async_update_websocket(), None)
+    @property
+    def prompt_lock(self) -> asyncio.Lock:
+        """
+        Lock used to make sure only one prompt of this action is waiting for the UI at a time.
+        It is created lazily since it must be created from the event loop
+        """
+        if self._prompt_lock is None:
+            self._prompt_lock = asyncio.Lock()
+        return self._prompt_lock
 
     async def async_cancel(self, emit_clear: bool = True):
         """
@@ -200,7 +433,8 @@ class ActionQuery:
                 "/dcc/action", "clearAction", {"uuid": self.buffer.uuid}
             )
 
-        self._task.cancel()
+        # The task belongs to the command loop, which might be running in another thread
+        self.event_loop.call_in_command_loop(self._task.cancel)
 
     def cancel(self, emit_clear: bool = True):
         future = self.event_loop.register_task(self.async_cancel(emit_clear))
@@ -210,16 +444,22 @@ class ActionQuery:
         """
         Cancel the action if running and restart it backward
         """
-        if self.is_running and self._task is not None:
+        was_running = self.is_running and self._task is not None
+        if was_running:
             await self.async_cancel(emit_clear=False)
-            if self.execution_type is not Execution.BACKWARD:
+
+        async def execute_undo():
+            if was_running and self.execution_type is not Execution.BACKWARD:
                 self.command_iterator.command_index += 1
 
-        for command in self.commands[self.current_command_index :]:
-            command.status = Status.INITIALIZED
+            for command in self.commands[self.current_command_index :]:
+                command.status = Status.INITIALIZED
+
+            self.execution_type = Execution.BACKWARD
+            await self.execute_commands(step_by_step=not all_commands)
 
-        self.execution_type = Execution.BACKWARD
-        await self.execute_commands(step_by_step=not all_commands)
+        # The buffers are only modified from the loop that executes the action
+        await self.event_loop.run_in_command_loop(execute_undo())
 
     def undo(self, all_commands: bool = False):
         self.event_loop.register_task(self.async_undo(all_commands))
@@ -234,6 +474,19 @@ class ActionQuery:
     def stop(self):
         self.execution_type = Execution.PAUSE
 
+    def purge_trash(self) -> None:
+        """
+        Delete the files moved to the trash by the action in the background,
+        once the removals can't be undone anymore
+        """
+        if not self.trash_roots:
+            return
+
+        get_thread_pool("io").submit(
+            purge_action_trash, set(self.trash_roots), self.buffer.uuid
+        )
+        self.trash_roots.clear()
+
     def _initialize_buffer(
         self, resolved_config: dict, custom_data: Union[dict, None] = None
     ) -> None:
@@ -283,7 +536,9 @@ class ActionQuery:
         """
         Send a diff between the current state of the buffer and the last saved state of the buffer
         """
-        return self.event_loop.register_task(
+        # The buffer is serialized from the loop that modifies it,
+        # only the sending of the update happens in the event loop
+        return self.event_loop.register_command_task(
             self.async_update_websocket(apply_response)
         )
 
@@ -291,38 +546,58 @@ class ActionQuery:
         """
         Send a diff between the current state of the buffer and the last saved state of the buffer
         """
+        # The UIs that support it only receive the new logs of the commands
+        log_stream = LOG_STREAM_CAPABILITY in self.ws_connection.capabilities
         serialized_buffer = self.buffer.serialize()
-        diff = silex_diff(self._buffer_diff, serialized_buffer)
+        diff = silex_diff(self._buffer_diff, serialized_buffer, log_stream=log_stream)
 
         if (
             not self.ws_connection.is_running
             or self.buffer.hide
             or not (diff or apply_response)
         ):
-            future = self.event_loop.loop.create_future()
+            future = asyncio.get_event_loop().create_future()
             future.set_result(None)
             return future
 
         serialized_buffer = self.buffer.serialize()
-        diff = silex_diff(self._buffer_diff, serialized_buffer)
+        diff = silex_diff(self._buffer_diff, serialized_buffer, log_stream=log_stream)
         self._buffer_diff = serialized_buffer
         diff["uuid"] = self.buffer.uuid
 
-        confirm = await self.ws_connection.async_send("/dcc/action", "update", diff)
+        async def apply_update(response: Any) -> Any:
+            logger.debug("Applying update: %s", response)
+            self.buffer.deserialize(response)
+            self._buffer_diff = self.buffer.serialize()
+            return response
 
-        def apply_update(response: asyncio.Future) -> None:
-            if response.cancelled():
-                return
+        async def send_update() -> Any:
+            # The websocket futures belong to the event loop, they must be awaited from there
+            confirm = await self.ws_connection.async_send("/dcc/action", "update", diff)
+            if not apply_response:
+                return confirm.result() if confirm.done() else None
 
-            logger.debug("Applying update: %s", response.result())
-            self.buffer.deserialize(response.result())
-            self._buffer_diff = self.buffer.serialize()
+            response = (
+                await self.ws_connection.action_namespace.register_update_callback(
+                    self.buffer.uuid, lambda _: None
+                )
+            )
+            return await response
+
+        async def send_and_apply_update() -> Any:
+            response = await self.event_loop.run_in_control_loop(send_update())
+            # The commands modify the buffers from the command loop, the response
+            # of the UI must be applied from there too
+            return await self.event_loop.run_in_command_loop(apply_update(response))
 
+        # The action might be executed in the command loop, the update is sent
+        # from the event loop that owns the websocket connection
         if apply_response:
-            return await self.ws_connection.action_namespace.register_update_callback(
-                self.buffer.uuid, apply_update
-            )
-        return confirm
+            return asyncio.ensure_future(send_and_apply_update())
+
+        future = asyncio.get_event_loop().create_future()
+        future.set_result(await self.event_loop.run_in_control_loop(send_update()))
+        return future
 
     @property
     def current_command(self):
@@ -331,9 +606,19 @@ class ActionQuery:
 
     @property
     def is_running(self):
-        """Check if the action is currently running"""
+        """Check if the action is currently running, or waiting for a slot to run"""
         return not (self._task is None or self._task.done())
 
+    @property
+    def active_commands(self) -> int:
+        """Amount of commands being executed, the sequential mode executes one at a time"""
+        return max(len(self._running_commands), 1)
+
+    @property
+    def is_queued(self):
+        """Check if the action is waiting for a slot in the scheduler"""
+        return self.action_scheduler.is_queued(self)
+
     @property
     def execution_type(self) -> Execution:
         """Shortcut to get the status of the action stored in the buffer"""
@@ -359,6 +644,16 @@ class ActionQuery:
         """Shortcut to get the status of the action stored in the buffer"""
         return self.buffer.status
 
+    @property
+    def max_parallelism(self) -> int:
+        """Shortcut to get the max amount of commands executed concurrently"""
+        return self.buffer.max_parallelism
+
+    @max_parallelism.setter
+    def max_parallelism(self, value: int) -> None:
+        """Shortcut to set the max amount of commands executed concurrently"""
+        self.buffer.max_parallelism = value
+
     @property
     def store(self) -> Dict[str, Any]:
         """Shortcut to get the variable of the buffer"""
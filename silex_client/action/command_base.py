@@ -157,32 +157,36 @@ class CommandBase:
         if not action_query.ws_connection.is_running:
             return {}
 
-        # Hide the existing parameters
-        for parameter in self.command_buffer.parameters.values():
-            parameter.hide = True
-        # Add the parameters to the command buffer's parameters
-        self.command_buffer.parameters.update(new_parameters)
-        # Set the current command to WAITING_FOR_RESPONSE
-        self.command_buffer.status = Status.WAITING_FOR_RESPONSE
-        self.command_buffer.ask_user = True
-
-        self.command_buffer.hide = False
-        # Send the update to the UI and wait for its response
-        while (
-            action_query.ws_connection.is_running
-            and self.command_buffer.require_prompt()
-        ):
-            # Call the setup on all the commands
-            await self.command_buffer.setup(action_query)
-            # Wait for a response from the UI
-            await asyncio.wait_for(
-                await action_query.async_update_websocket(apply_response=True), None
-            )
-
-        # Put the commands back to processing
-        self.command_buffer.ask_user = False
-        self.command_buffer.status = Status.PROCESSING
-        await asyncio.wait_for(await action_query.async_update_websocket(), None)
+        # When commands are executed in parallel, only one can prompt at a time
+        async with action_query.prompt_lock:
+            # Hide the existing parameters
+            for parameter in self.command_buffer.parameters.values():
+                parameter.hide = True
+            # Add the parameters to the command buffer's parameters
+            self.command_buffer.parameters.update(new_parameters)
+            # Set the current command to WAITING_FOR_RESPONSE
+            self.command_buffer.status = Status.WAITING_FOR_RESPONSE
+            self.command_buffer.ask_user = True
+
+            self.command_buffer.hide = False
+            # Send the update to the UI and wait for its response
+            while (
+                action_query.ws_connection.is_running
+                and self.command_buffer.require_prompt()
+            ):
+                # Call the setup on all the commands
+                await self.command_buffer.setup(action_query)
+                # Wait for a response from the UI, without holding a slot in the scheduler
+                async with action_query.action_scheduler.suspend(action_query):
+                    await asyncio.wait_for(
+                        await action_query.async_update_websocket(apply_response=True),
+                        None,
+                    )
+
+            # Put the commands back to processing
+            self.command_buffer.ask_user = False
+            self.command_buffer.status = Status.PROCESSING
+            await asyncio.wait_for(await action_query.async_update_websocket(), None)
 
         return {
             key: value.get_value(action_query)
@@ -21,7 +21,7 @@ from silex_client.action.base_buffer import BaseBuffer
 from silex_client.action.command_base import CommandBase
 from silex_client.action.parameter_buffer import ParameterBuffer
 from silex_client.network.websocket_log import RedirectWebsocketLogs
-from silex_client.utils.datatypes import CommandOutput
+from silex_client.utils.datatypes import CommandLogs, CommandOutput
 from silex_client.utils.enums import Execution, Status
 from silex_client.utils.log import logger
 
@@ -61,8 +61,8 @@ class CommandBuffer(BaseBuffer):
     output_result: Any = field(default=None, init=False)
     #: The callable that will be used when the command is executed
     executor: CommandBase = field(init=False)
-    #: List of all the logs during the execution of that command
-    logs: List[Dict[str, str]] = field(default_factory=list)
+    #: The last logs during the execution of that command, only the new ones are sent
+    logs: List[Dict[str, Any]] = field(default_factory=CommandLogs)
     #: Defines if the command must be executed or not
     skip: bool = field(default=False)
     #: The progress is only infomational, it should go from 0 to 100
@@ -70,6 +70,8 @@ class CommandBuffer(BaseBuffer):
 
     def __post_init__(self):
         super().__post_init__()
+        if not isinstance(self.logs, CommandLogs):
+            self.logs = CommandLogs(self.logs)
 
         # Get the executor
         self.executor = self._get_executor(self.path)
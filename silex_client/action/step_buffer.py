@@ -7,7 +7,7 @@ Dataclass used to store the data related to a step
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Dict
+from typing import Dict, List, Tuple
 
 from silex_client.action.base_buffer import BaseBuffer
 from silex_client.action.command_buffer import CommandBuffer
@@ -21,7 +21,7 @@ class StepBuffer(BaseBuffer):
     """
 
     #: The list of fields that should be ignored when serializing this buffer to json
-    PRIVATE_FIELDS = ["outdated_cache", "serialize_cache", "parent"]
+    PRIVATE_FIELDS = ["outdated_cache", "serialize_cache", "parent", "branches"]
     READONLY_FIELDS = ["label"]
     CHILD_NAME = "commands"
 
@@ -31,6 +31,9 @@ class StepBuffer(BaseBuffer):
     status: Status = field(init=False)  # type: ignore
     #: Dict that represent the parameters of the command, their type, value, name...
     children: Dict[str, CommandBuffer] = field(default_factory=dict)
+    #: The (command, branch) pairs of the InsertAction commands that inserted this step,
+    #: from the outermost. The steps of different branches of a command are independent
+    branches: List[Tuple[str, str]] = field(default_factory=list)
 
     @property
     def child_type(self):
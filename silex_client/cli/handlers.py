@@ -69,10 +69,8 @@ def action_handler(action_name: str, **kwargs) -> None:
         action_future = action.execute(batch=kwargs.get("batch", False))
         if not kwargs.get("batch", False):
             action_future = action.closed
-        while not action_future.done():
-            futures.wait([action_future], timeout=0.05)
-            while not Context.get().callback_queue.empty():
-                Context.get().callback_queue.get()()
+        # Execute the callables sent to the main thread until the action is done
+        silex_context.main_thread_dispatcher.run_until_complete(action_future)
     except KeyboardInterrupt:
         action.cancel()
     finally:
@@ -4,7 +4,6 @@ import logging
 import os
 import pathlib
 import typing
-import uuid
 from typing import Any, Dict, Optional
 
 import fileseq
@@ -19,6 +18,14 @@ from silex_client.utils.parameter_types import (
     StringParameterMeta,
     TaskParameterMeta,
 )
+from silex_client.utils.path_sequence import PathSequence
+from silex_client.utils.scan import SequenceRecord
+from silex_client.utils.staging import (
+    clean_stale_staging,
+    create_staging_directory,
+    get_staging_path,
+)
+from silex_client.utils.thread import get_thread_pool
 
 # Forward references
 if typing.TYPE_CHECKING:
@@ -159,11 +166,9 @@ class BuildOutputPath(CommandBase):
             raise Exception("Could not get the output path from gazu")
 
         directory = output_path.parent / name_path if name else output_path.parent
-        temp_directory = output_path.parent / str(uuid.uuid4())
+        temp_directory = get_staging_path(output_path.parent)
         file_name = output_path.name + f"_{name}" if name else output_path.name
         full_name = file_name
-        full_names = []
-        full_paths = [directory / full_name]
 
         # Create the directories
         if create_output_dir:
@@ -171,25 +176,24 @@ class BuildOutputPath(CommandBase):
             logger.info(f"Output directory created: {directory}")
 
         if create_temp_dir:
-            os.makedirs(temp_directory)
+            create_staging_directory(temp_directory)
             logger.info(f"Temp directory created: {temp_directory}")
+            # The staging directories of the crashed actions are cleaned in the background
+            get_thread_pool("io").submit(clean_stale_staging, output_path.parent)
 
-        # Handle the sequences of files
+        # Handle the sequences of files, the paths are only built when iterated
         if nb_elements > 1:
-            for item in frame_set:
-                full_names.append(
-                    full_name + f".{str(item).zfill(padding)}.{extension}"
+            full_paths = PathSequence(
+                SequenceRecord(
+                    str(directory), f"{full_name}.", padding, f".{extension}", frame_set
                 )
-            full_paths = [directory / name for name in full_names]
+            )
+            full_names = [full_path.name for full_path in full_paths]
         else:
             full_names = full_name + f".{extension}"
             full_paths = directory / full_names
 
-        if isinstance(full_paths, list):
-            sequence = fileseq.findSequencesInList(full_paths)
-            logger.info("Output path(s) built: %s", sequence)
-        else:
-            logger.info("Output path(s) built: %s", full_paths)
+        logger.info("Output path(s) built: %s", full_paths)
 
         return {
             "directory": directory,
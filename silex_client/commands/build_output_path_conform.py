@@ -10,7 +10,11 @@ import fileseq
 
 from silex_client.action.command_base import CommandBase
 from silex_client.commands.build_output_path import BuildOutputPath
-from silex_client.utils.parameter_types import PathParameterMeta, TextParameterMeta
+from silex_client.utils.parameter_types import (
+    PathSequenceParameterMeta,
+    TextParameterMeta,
+)
+from silex_client.utils.path_sequence import PathSequence
 from silex_client.action.parameter_buffer import ParameterBuffer
 
 # Forward references
@@ -26,7 +30,7 @@ class BuildOutputPathConform(BuildOutputPath):
     parameters = {
         "files": {
             "label": "File paths the we want to conform",
-            "type": PathParameterMeta(multiple=True),
+            "type": PathSequenceParameterMeta(),
             "hide": True,
         },
         "fast_conform": {
@@ -80,7 +84,7 @@ class BuildOutputPathConform(BuildOutputPath):
         logger: logging.Logger,
     ):
         fast_conform = parameters["fast_conform"]
-        file_paths = fileseq.findSequencesInList(parameters["files"])[0]
+        file_paths = parameters["files"].sequences()[0]
 
         input_key = f"build_output_path_conform:{str(file_paths)}"
         result = await super().__call__(parameters, action_query, logger)
@@ -117,9 +121,8 @@ class BuildOutputPathConform(BuildOutputPath):
     ):
         files_parameter = self.command_buffer.parameters["files"]
         files_value = files_parameter.get_value(action_query)
-        if not isinstance(files_value, list):
-            files_value = [files_value]
-        file_paths: fileseq.FileSequence = fileseq.findSequencesInList(files_value)[0]
+        # The sequence is found the same way than in __call__, to get the same key
+        file_paths: fileseq.FileSequence = PathSequence(files_value).sequences()[0]
 
         # If the file has already been conformed, don't build the path
         key = f"build_output_path_conform:{str(file_paths)}"
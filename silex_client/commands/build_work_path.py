@@ -6,9 +6,10 @@ import pathlib
 import typing
 from typing import Any, Dict
 
-import fileseq
 import gazu
 from silex_client.action.command_base import CommandBase
+from silex_client.utils.sequence_index import SequenceIndex
+from silex_client.utils.thread import execute_in_thread
 
 # Forward references
 if typing.TYPE_CHECKING:
@@ -80,7 +81,9 @@ class BuildWorkPath(CommandBase):
         version = initial_version
         work_path, full_path = await work_and_full_path(initial_version)
 
-        existing_sequences = fileseq.findSequencesOnDisk(os.path.dirname(full_path))
+        existing_sequences = await execute_in_thread(
+            SequenceIndex.get().get_sequences, os.path.dirname(full_path)
+        )
 
         # Only get the sequences of that software
         software_sequences = [
@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import pathlib
+import shutil
+import threading
+import typing
+import uuid
+from typing import Any, Dict, List, Optional
+
+from silex_client.action.command_base import CommandBase
+from silex_client.commands.rename import prompt_override
+from silex_client.utils.datatypes import SharedVariable
+from silex_client.utils.dedup import ContentStore, find_project_store
+from silex_client.utils.enums import ConflictBehaviour
+from silex_client.utils.parameter_types import (
+    ListParameterMeta,
+    PathSequenceParameterMeta,
+)
+from silex_client.utils.path_sequence import PathSequence
+from silex_client.utils.prompt import UpdateProgress
+from silex_client.utils.scan import stat_paths
+from silex_client.utils.staging import (
+    clean_stale_staging,
+    commit_staging_directory,
+    create_staging_directory,
+)
+from silex_client.utils.thread import execute_in_thread, get_thread_pool
+from silex_client.utils.transfer import copy_file
+
+if typing.TYPE_CHECKING:
+    from silex_client.action.action_query import ActionQuery
+
+
+class ConformTransfer(CommandBase):
+    """
+    Copy the given files into the destination directory under their final name.
+    Each file is written under a temporary name, and renamed to its final name once complete,
+    so the published files are never partial. With a temp directory, all the files are written
+    into it and the whole directory is committed at once
+    """
+
+    parameters = {
+        "src": {
+            "label": "Source path",
+            "type": PathSequenceParameterMeta(),
+            "value": None,
+            "tooltip": "Select the file or the directory you want to copy",
+        },
+        "dst": {
+            "label": "Destination directory",
+            "type": pathlib.Path,
+            "value": None,
+            "tooltip": "Select the directory in wich you want to copy you file(s)",
+        },
+        "name": {
+            "label": "New name",
+            "type": ListParameterMeta(str),
+            "value": None,
+            "tooltip": "Insert the new name for the given file",
+        },
+        "force": {
+            "label": "Force override existing files",
+            "type": bool,
+            "value": True,
+            "tooltip": "If a file already exists, it will be overriden without prompt",
+        },
+        "temp_dir": {
+            "label": "Staging directory",
+            "type": pathlib.Path,
+            "value": None,
+            "tooltip": "The files are copied into this directory, and moved to the destination once all copied",
+            "hide": True,
+        },
+        "dedup": {
+            "label": "Deduplicate identical files",
+            "type": bool,
+            "value": False,
+            "tooltip": "The files already conformed in the project are linked instead of copied again",
+            "hide": True,
+        },
+        "dedup_store": {
+            "label": "Deduplication store",
+            "type": pathlib.Path,
+            "value": None,
+            "tooltip": "By default, the store is at the root of the project",
+            "hide": True,
+        },
+        "max_in_flight": {
+            "label": "Parallel copies",
+            "type": int,
+            "value": 8,
+            "tooltip": "Amount of files copied at the same time",
+            "hide": True,
+        },
+    }
+
+    @staticmethod
+    def transfer(
+        src: pathlib.Path,
+        dst: pathlib.Path,
+        progress: SharedVariable,
+        progress_lock: threading.Lock,
+        staging_dir: Optional[pathlib.Path] = None,
+        store: Optional[ContentStore] = None,
+    ) -> None:
+        """
+        Copy the source next to the destination, and replace the destination with it.
+        With a staging directory, the source is copied into it and committed later.
+        With a store, the source is linked to its content in the store
+        """
+        if store is not None:
+            target = dst if staging_dir is None else staging_dir / dst.name
+            store.publish(src, target, progress, progress_lock)
+            return
+
+        if staging_dir is not None:
+            copy_file(src, staging_dir / dst.name, progress, progress_lock)
+            return
+
+        temp_path = dst.with_name(f".{dst.name}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            copy_file(src, temp_path, progress, progress_lock)
+            os.replace(temp_path, dst)
+        except BaseException:
+            if os.path.lexists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    @CommandBase.conform_command()
+    async def __call__(
+        self,
+        parameters: Dict[str, Any],
+        action_query: ActionQuery,
+        logger: logging.Logger,
+    ):
+        src_paths: PathSequence = parameters["src"]
+        dst_dir: pathlib.Path = parameters["dst"]
+        new_names: List[str] = parameters["name"]
+        force: bool = parameters["force"]
+        temp_dir: Optional[pathlib.Path] = parameters["temp_dir"]
+        dedup: bool = parameters["dedup"]
+        dedup_store: Optional[pathlib.Path] = parameters["dedup_store"]
+        max_in_flight: int = max(parameters["max_in_flight"], 1)
+
+        store: Optional[ContentStore] = None
+        if dedup:
+            if dedup_store is None:
+                project = action_query.context_metadata.get("project") or ""
+                dedup_store = find_project_store(dst_dir, project)
+            if dedup_store is None:
+                logger.warning(
+                    "Could not find the deduplication store of %s, the files will be copied",
+                    dst_dir,
+                )
+            else:
+                store = ContentStore(dedup_store)
+
+        # The sequences are known, they don't need to be detected again
+        logger.info("Conforming %s to %s", src_paths, dst_dir)
+
+        # Construct the new paths, the extension of the sequence is kept
+        new_paths: List[pathlib.Path] = []
+        extensions: List[str] = []
+        for record in src_paths.records:
+            extensions.extend([record.extension] * len(record))
+        for index in range(len(src_paths)):
+            new_name = new_names[index % len(new_names)]
+            new_name = os.path.splitext(new_name)[0] + extensions[index]
+            new_paths.append(dst_dir / new_name)
+
+        await execute_in_thread(os.makedirs, dst_dir, exist_ok=True)
+
+        # Test the existence of all the files at once, with one listing per directory
+        src_stats = await execute_in_thread(stat_paths, src_paths)
+        dst_stats = await execute_in_thread(stat_paths, new_paths, False)
+        for src_path in src_paths:
+            if not src_stats[src_path].exists:
+                raise Exception(f"Source path {src_path} does not exists")
+
+        # Handle the existing files before copying, the prompts are sequential anyway
+        transfers = []
+        for index, src_path in enumerate(src_paths):
+            new_path = new_paths[index]
+            if force or not dst_stats[new_path].exists:
+                transfers.append((src_path, new_path))
+                continue
+
+            new_name = new_path.stem
+            conflict_behaviour = action_query.store.get("file_conflict_behaviour")
+            if conflict_behaviour is None:
+                conflict_behaviour, new_name = await prompt_override(
+                    self, new_path, action_query, new_path.stem
+                )
+            if conflict_behaviour is ConflictBehaviour.RENAME:
+                new_path = dst_dir / (new_name + extensions[index])
+                new_paths[index] = new_path
+            if conflict_behaviour in [
+                ConflictBehaviour.ALWAYS_OVERRIDE,
+                ConflictBehaviour.ALWAYS_KEEP_EXISTING,
+            ]:
+                action_query.store["file_conflict_behaviour"] = conflict_behaviour
+            if conflict_behaviour in [
+                ConflictBehaviour.OVERRIDE,
+                ConflictBehaviour.ALWAYS_OVERRIDE,
+            ]:
+                force = True
+            if conflict_behaviour in [
+                ConflictBehaviour.KEEP_EXISTING,
+                ConflictBehaviour.ALWAYS_KEEP_EXISTING,
+            ]:
+                continue
+            # The existing file is replaced atomically, it is never removed first
+            transfers.append((src_path, new_path))
+
+        label = self.command_buffer.label
+        progress = SharedVariable(0)
+        progress_lock = threading.Lock()
+        total_file_size = SharedVariable(
+            sum(src_stats[src_path].size for src_path, _ in transfers)
+        )
+        transfer_slots = asyncio.Semaphore(max_in_flight)
+        transferred_count = 0
+
+        async def transfer_one_file(src_path: pathlib.Path, new_path: pathlib.Path):
+            nonlocal transferred_count
+            async with transfer_slots:
+                await execute_in_thread(
+                    self.transfer,
+                    src_path,
+                    new_path,
+                    progress,
+                    progress_lock,
+                    temp_dir,
+                    store,
+                )
+                transferred_count += 1
+                self.command_buffer.label = (
+                    f"{label} ({transferred_count}/{len(transfers)})"
+                )
+
+        # The staging directory is only created when there is something to transfer,
+        # the conforms skipped by the cache don't leave it behind
+        if temp_dir is not None and transfers:
+            await execute_in_thread(create_staging_directory, temp_dir)
+            # The staging directories of the crashed actions are cleaned in the background
+            get_thread_pool("io").submit(clean_stale_staging, temp_dir.parent)
+
+        async with UpdateProgress(
+            self.command_buffer, action_query, progress, total_file_size, 0.2
+        ):
+            transfer_tasks = [
+                asyncio.ensure_future(transfer_one_file(src_path, new_path))
+                for src_path, new_path in transfers
+            ]
+            try:
+                await asyncio.gather(*transfer_tasks)
+            except BaseException:
+                # Stop the remaining copies if one of them failed
+                for transfer_task in transfer_tasks:
+                    transfer_task.cancel()
+                # Nothing was published, the staged files can be dropped
+                if temp_dir is not None:
+                    await execute_in_thread(shutil.rmtree, temp_dir, True)
+                raise
+
+        # All the staged files appear in the destination at once
+        if temp_dir is not None and transfers:
+            await execute_in_thread(commit_staging_directory, temp_dir, dst_dir)
+
+        logger.info(
+            "Conformed %s files, kept %s existing files",
+            len(transfers),
+            len(src_paths) - len(transfers),
+        )
+        dedup_stats: Dict[str, int] = {}
+        if store is not None:
+            dedup_stats = {
+                "hits": store.hits,
+                "misses": store.misses,
+                "saved_bytes": store.saved_bytes,
+            }
+            logger.info(
+                "%s files were already in the store, %s bytes were not copied",
+                store.hits,
+                store.saved_bytes,
+            )
+            # The unused contents are regularly deleted from the store
+            get_thread_pool("io").submit(store.collect_garbage_if_due)
+
+        return {
+            "source_paths": src_paths,
+            "destination_paths": new_paths,
+            "new_paths": new_paths,
+            "dedup": dedup_stats,
+        }
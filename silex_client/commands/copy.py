@@ -1,19 +1,27 @@
 from __future__ import annotations
 
+import asyncio
 import os
 import pathlib
-import shutil
 import logging
+import shutil
+import threading
 import typing
-from typing import Any, Dict, List
-
-import fileseq
+from typing import Any, Dict, Optional
 
 from silex_client.action.command_base import CommandBase
 from silex_client.utils.enums import ConflictBehaviour
+from silex_client.utils.scan import stat_paths
 from silex_client.utils.prompt import UpdateProgress, prompt_override
-from silex_client.utils.parameter_types import PathParameterMeta
+from silex_client.utils.parameter_types import PathSequenceParameterMeta
+from silex_client.utils.path_sequence import PathSequence
 from silex_client.utils.thread import execute_in_thread
+from silex_client.utils.manifest import (
+    create_manifest_entry,
+    read_manifest,
+    update_manifest,
+)
+from silex_client.utils.transfer import copy_file, copy_file_verified, is_synced
 from silex_client.utils.datatypes import SharedVariable
 
 if typing.TYPE_CHECKING:
@@ -28,13 +36,13 @@ class Copy(CommandBase):
     parameters = {
         "src": {
             "label": "Source path",
-            "type": PathParameterMeta(multiple=True),
+            "type": PathSequenceParameterMeta(),
             "value": None,
             "tooltip": "Select the file or the directory you want to copy",
         },
         "dst": {
             "label": "Destination directory",
-            "type": PathParameterMeta(multiple=True),
+            "type": PathSequenceParameterMeta(),
             "value": None,
             "tooltip": "Select the directory in wich you want to copy you file(s)",
         },
@@ -44,26 +52,84 @@ class Copy(CommandBase):
             "value": True,
             "tooltip": "If a file already exists, it will be overriden without prompt",
         },
+        "max_in_flight": {
+            "label": "Parallel copies",
+            "type": int,
+            "value": 8,
+            "tooltip": "Amount of files copied at the same time",
+            "hide": True,
+        },
+        "range_copy_threshold": {
+            "label": "Split files bigger than (MB)",
+            "type": int,
+            "value": 0,
+            "tooltip": "The bigger files are split into ranges copied at the same time, 0 to disable",
+            "hide": True,
+        },
+        "verify": {
+            "label": "Verify the copied files",
+            "type": bool,
+            "value": False,
+            "tooltip": "Compare the hash of the copied files with the source, and store it in a manifest",
+        },
+        "sync": {
+            "label": "Skip identical files",
+            "type": bool,
+            "value": False,
+            "tooltip": "The existing files with the same size and modification time are not copied again",
+        },
+        "sync_hash": {
+            "label": "Compare the content of the files",
+            "type": bool,
+            "value": False,
+            "tooltip": "When skipping identical files, compare the content of the files that might have changed",
+            "hide": True,
+        },
     }
 
     @staticmethod
-    def copy(src: pathlib.Path, dst: pathlib.Path, progress: SharedVariable):
+    def copy(
+        src: pathlib.Path,
+        dst: pathlib.Path,
+        progress: SharedVariable,
+        progress_lock: Optional[threading.Lock] = None,
+        range_threshold: int = 0,
+        sync: bool = False,
+    ):
         """
         The default shutil copy copies the files with very small chunks which end up
-        with poor copy performances on windows. This is an equivalent of the copy with
-        a bigger chunk size and progress information
+        with poor copy performances on windows. The copy is delegated to the kernel
+        when possible, or made with bigger chunks, with progress information.
+
+        The progress lock must be given when several files are copied at the same time,
+        the files bigger than range_threshold (in bytes) are split into ranges copied in parallel.
+        With sync, the modification time of the source is kept so the next syncs can compare it
         """
-        with open(src, "rb") as fsrc:
-            with open(dst, "wb") as fdst:
-                while 1:
-                    buf = fsrc.read(64 * 1024 * 1)
-                    if not buf:
-                        break
-                    progress.value += fdst.write(buf)
-
-        shutil.copymode(src, dst)
+        copy_file(src, dst, progress, progress_lock, range_threshold)
+        if sync:
+            shutil.copystat(src, dst)
         return progress
 
+    @staticmethod
+    def copy_verified(
+        src: pathlib.Path,
+        dst: pathlib.Path,
+        progress: SharedVariable,
+        progress_lock: Optional[threading.Lock] = None,
+        sync: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Copy the file, hashing its content during the copy, and compare it with the hash
+        of the destination. Returns the manifest entry of the copied file.
+        With sync, the modification time of the source is kept so the next syncs can compare it
+        """
+        manifest_entry = copy_file_verified(src, dst, progress, progress_lock)
+        if sync:
+            shutil.copystat(src, dst)
+            # The manifest describes the destination as it is now
+            manifest_entry["mtime"] = os.stat(dst).st_mtime_ns
+        return manifest_entry
+
     @CommandBase.conform_command()
     async def __call__(
         self,
@@ -71,77 +137,220 @@ class Copy(CommandBase):
         action_query: ActionQuery,
         logger: logging.Logger,
     ):
-        src_paths: List[pathlib.Path] = parameters["src"]
-        dst_paths: List[pathlib.Path] = parameters["dst"]
+        src_paths: PathSequence = parameters["src"]
+        dst_paths: PathSequence = parameters["dst"]
         force: bool = parameters["force"]
+        max_in_flight: int = max(parameters["max_in_flight"], 1)
+        range_threshold: int = parameters["range_copy_threshold"] * 1024 * 1024
+        verify: bool = parameters["verify"]
+        sync: bool = parameters["sync"]
+        sync_hash: bool = parameters["sync_hash"]
+        # The sync is stored apart, the other commands don't handle it
+        if action_query.store.get("copy_conflict_behaviour") is ConflictBehaviour.SYNC:
+            sync = True
 
-        src_sequences = fileseq.findSequencesInList(src_paths)
-        dst_sequences = fileseq.findSequencesInList(dst_paths)
-        logger.info("Copying %s to %s", src_sequences, dst_sequences)
+        # The sequences are known, they don't need to be detected again
+        logger.info("Copying %s to %s", src_paths, dst_paths)
+
+        # Get the metadata of all the files at once, one listing per directory
+        src_stats = await execute_in_thread(stat_paths, src_paths)
+        dst_dir_stats = await execute_in_thread(stat_paths, dst_paths, False)
 
         full_dst_path = []
+        for index, src_path in enumerate(src_paths):
+            dst_path = dst_paths[index % len(dst_paths)]
+            if dst_dir_stats[dst_path].is_dir:
+                dst_path = dst_path / src_path.name
+            full_dst_path.append(dst_path)
+
+        dst_stats = await execute_in_thread(stat_paths, full_dst_path, False)
+
         label = self.command_buffer.label
-        total_file_size = SharedVariable(
-            sum(os.path.getsize(path) for path in src_paths)
-        )
+        file_sizes = [src_stats[src_path].size for src_path in src_paths]
+        total_file_size = SharedVariable(sum(file_sizes))
         progress: SharedVariable = SharedVariable(0)
+        progress_lock = threading.Lock()
+        copy_slots = asyncio.Semaphore(max_in_flight)
+        # The prompts and the conflict behaviour stored by them are handled one at a time
+        conflict_lock = asyncio.Lock()
+        created_directories: Dict[pathlib.Path, asyncio.Future] = {}
+        manifests: Dict[pathlib.Path, asyncio.Future] = {}
+        manifest_entries: Dict[pathlib.Path, Dict[str, Dict[str, Any]]] = {}
+        copied_count = 0
+        transferred = {"files": 0, "bytes": 0}
+        skipped = {"files": 0, "bytes": 0}
 
-        async with UpdateProgress(
-            self.command_buffer, action_query, progress, total_file_size, 0.2
-        ):
-            for index, src_path in enumerate(src_paths):
-                self.command_buffer.label = f"{label} ({index+1}/{len(src_paths)})"
+        async def create_directory(directory: pathlib.Path) -> None:
+            # All the files of a sequence share the same directory, create it only once
+            future = created_directories.get(directory)
+            if future is None:
+                future = asyncio.ensure_future(
+                    execute_in_thread(os.makedirs, str(directory), exist_ok=True)
+                )
+                created_directories[directory] = future
+            await asyncio.shield(future)
 
-                dst_path = dst_paths[index % len(dst_paths)]
+        async def get_manifest(directory: pathlib.Path) -> Dict[str, Dict[str, Any]]:
+            # The manifest of a directory is read once for all its files
+            future = manifests.get(directory)
+            if future is None:
+                future = asyncio.ensure_future(
+                    execute_in_thread(read_manifest, directory)
+                )
+                manifests[directory] = future
+            return await asyncio.shield(future)
 
-                if not src_path.exists():
-                    raise Exception(f"Source path {src_path} does not exists")
+        async def resolve_conflict(dst_path: pathlib.Path) -> ConflictBehaviour:
+            """
+            Remove the existing destination if it must be overriden,
+            return the behaviour to apply to the existing destination
+            """
+            nonlocal force, sync
+            if sync:
+                return ConflictBehaviour.SYNC
+            if force:
+                await execute_in_thread(os.remove, dst_path)
+                return ConflictBehaviour.OVERRIDE
 
-                if dst_path.is_dir():
-                    dst_path = dst_path / src_path.name
-                
-                os.makedirs(str(dst_path.parents[0]), exist_ok=True)
+            async with conflict_lock:
+                # An other file might have changed the behaviour while waiting
+                if sync:
+                    return ConflictBehaviour.SYNC
+                if force:
+                    await execute_in_thread(os.remove, dst_path)
+                    return ConflictBehaviour.OVERRIDE
+
+                conflict_behaviour = action_query.store.get("file_conflict_behaviour")
+                if conflict_behaviour is None:
+                    conflict_behaviour = await prompt_override(
+                        self, dst_path, action_query, sync=True
+                    )
+                if conflict_behaviour in [
+                    ConflictBehaviour.ALWAYS_OVERRIDE,
+                    ConflictBehaviour.ALWAYS_KEEP_EXISTING,
+                ]:
+                    action_query.store["file_conflict_behaviour"] = conflict_behaviour
+                if conflict_behaviour is ConflictBehaviour.SYNC:
+                    action_query.store["copy_conflict_behaviour"] = conflict_behaviour
+                    sync = True
+                    return ConflictBehaviour.SYNC
+                if conflict_behaviour in [
+                    ConflictBehaviour.OVERRIDE,
+                    ConflictBehaviour.ALWAYS_OVERRIDE,
+                ]:
+                    force = True
+                    await execute_in_thread(os.remove, dst_path)
+                    return ConflictBehaviour.OVERRIDE
+
+            return ConflictBehaviour.KEEP_EXISTING
+
+        def skip_file(file_size: int) -> None:
+            skipped["files"] += 1
+            skipped["bytes"] += file_size
+            with progress_lock:
+                progress.value += file_size
+
+        async def copy_one_file(
+            src_path: pathlib.Path, dst_path: pathlib.Path, file_size: int
+        ) -> None:
+            nonlocal copied_count
+            async with copy_slots:
+                if not src_stats[src_path].exists:
+                    raise Exception(f"Source path {src_path} does not exists")
 
-                full_dst_path.append(dst_path)
+                await create_directory(dst_path.parent)
 
                 # Handle override of existing file
-                if dst_path.exists() and force:
+                conflict_behaviour = (
+                    await resolve_conflict(dst_path)
+                    if dst_stats[dst_path].exists
+                    else None
+                )
+                if conflict_behaviour is ConflictBehaviour.KEEP_EXISTING:
+                    skip_file(file_size)
+                    return
+                if conflict_behaviour is ConflictBehaviour.SYNC:
+                    manifest = await get_manifest(dst_path.parent)
+                    if await execute_in_thread(
+                        is_synced,
+                        src_path,
+                        dst_path,
+                        manifest.get(dst_path.name),
+                        sync_hash,
+                    ):
+                        skip_file(file_size)
+                        return
                     await execute_in_thread(os.remove, dst_path)
-                elif dst_path.exists():
-                    conflict_behaviour = action_query.store.get(
-                        "file_conflict_behaviour"
+
+                manifest_entry: Optional[Dict[str, Any]] = None
+                if verify:
+                    manifest_entry = await execute_in_thread(
+                        self.copy_verified,
+                        src_path,
+                        dst_path,
+                        progress,
+                        progress_lock,
+                        sync,
+                    )
+                else:
+                    await execute_in_thread(
+                        self.copy,
+                        src_path,
+                        dst_path,
+                        progress,
+                        progress_lock,
+                        range_threshold,
+                        sync,
                     )
-                    if conflict_behaviour is None:
-                        conflict_behaviour = await prompt_override(
-                            self, dst_path, action_query
+                    # Keep track of the state of the copy, for the next syncs
+                    if sync:
+                        manifest_entry = await execute_in_thread(
+                            create_manifest_entry, src_path, dst_path
                         )
-                    if conflict_behaviour in [
-                        ConflictBehaviour.ALWAYS_OVERRIDE,
-                        ConflictBehaviour.ALWAYS_KEEP_EXISTING,
-                    ]:
-                        action_query.store[
-                            "file_conflict_behaviour"
-                        ] = conflict_behaviour
-                    if conflict_behaviour in [
-                        ConflictBehaviour.OVERRIDE,
-                        ConflictBehaviour.ALWAYS_OVERRIDE,
-                    ]:
-                        force = True
-                        await execute_in_thread(os.remove, dst_path)
-                    if conflict_behaviour in [
-                        ConflictBehaviour.KEEP_EXISTING,
-                        ConflictBehaviour.ALWAYS_KEEP_EXISTING,
-                    ]:
-                        continue
-
-                await execute_in_thread(self.copy, src_path, dst_path, progress)
-
-                # Check if copy was done successfully
-                if not os.path.exists(dst_path):
-                    raise Exception(f"Fail to copy {src_path} to {dst_path}")
 
+                if manifest_entry is not None:
+                    manifest_entries.setdefault(dst_path.parent, {})[
+                        dst_path.name
+                    ] = manifest_entry
+
+                copied_count += 1
+                transferred["files"] += 1
+                transferred["bytes"] += file_size
+                self.command_buffer.label = f"{label} ({copied_count}/{len(src_paths)})"
+
+        async with UpdateProgress(
+            self.command_buffer, action_query, progress, total_file_size, 0.2
+        ):
+            copy_tasks = [
+                asyncio.ensure_future(copy_one_file(src_path, dst_path, file_size))
+                for src_path, dst_path, file_size in zip(
+                    src_paths, full_dst_path, file_sizes
+                )
+            ]
+            try:
+                await asyncio.gather(*copy_tasks)
+            finally:
+                # Stop the remaining copies if one of them failed
+                for copy_task in copy_tasks:
+                    copy_task.cancel()
+
+        # A single write per directory, the files of a directory are copied concurrently
+        for directory, entries in manifest_entries.items():
+            await execute_in_thread(update_manifest, directory, entries)
+
+        logger.info(
+            "Copied %s files (%s bytes), skipped %s files (%s bytes)",
+            transferred["files"],
+            transferred["bytes"],
+            skipped["files"],
+            skipped["bytes"],
+        )
         return {
             "source_paths": src_paths,
             "destination_dirs": [dst_path.parent for dst_path in full_dst_path],
             "destination_paths": full_dst_path,
+            "transferred_files": transferred["files"],
+            "transferred_bytes": transferred["bytes"],
+            "skipped_files": skipped["files"],
+            "skipped_bytes": skipped["bytes"],
         }
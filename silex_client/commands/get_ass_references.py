@@ -91,7 +91,11 @@ class GetAssReferences(CommandBase):
             temp_list = []
         
             # Add sequence to the references list
-            sequence =  files.expand_template_to_sequence(reference, constants.ARNOLD_MATCH_SEQUENCE)
+            sequence = await action_query.event_loop.run_in_process(
+                files.expand_template_to_sequence,
+                reference,
+                constants.ARNOLD_MATCH_SEQUENCE,
+            )
 
             if sequence:
                 for path in sequence:
@@ -6,10 +6,10 @@ import pathlib
 import typing
 from typing import Any, Dict
 
-import fileseq
-
 from silex_client.action.command_base import CommandBase
 from silex_client.utils.parameter_types import AnyParameter
+from silex_client.utils.parsing import find_sequences_in_list
+from silex_client.utils.path_sequence import PathSequence
 
 # Forward references
 if typing.TYPE_CHECKING:
@@ -72,8 +72,8 @@ class GetStoredValue(CommandBase):
 
         # Handle file_paths in key suffix
         with contextlib.suppress(OSError):
-            if isinstance(key_suffix, list):
-                sequences = fileseq.findSequencesInList(key_suffix)
+            if isinstance(key_suffix, (list, PathSequence)):
+                sequences = find_sequences_in_list(key_suffix)
                 key_suffix = pathlib.Path(str(sequences[0].dirname()))
             elif pathlib.Path(str(key_suffix)).is_file():
                 key_suffix = pathlib.Path(str(key_suffix)).parent
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 from typing import Any, Dict, List
 import logging
 import typing
@@ -10,7 +11,7 @@ from silex_client.action.command_base import CommandBase
 from silex_client.action.parameter_buffer import ParameterBuffer
 from silex_client.utils.parameter_types import PathParameterMeta, TextParameterMeta
 from silex_client.utils.files import expand_template_to_sequence, is_valid_pipeline_path
-from silex_client.utils.thread import execute_in_thread
+from silex_client.utils.thread import execute_in_sdk_thread
 from silex_client.utils.constants import VRAY_MATCH_SEQUENCE
 
 
@@ -72,18 +73,22 @@ class GetVrsceneReferences(CommandBase):
         skip_prompt: bool = parameters["skip_prompt"]
         
         # Get texture paths in the .vrscene file
-        plugins_references: Dict[str, pathlib.Path] = await execute_in_thread(
+        plugins_references: Dict[str, pathlib.Path] = await execute_in_sdk_thread(
             self._get_vrscene_references, vrscene_files[0], skip_pipeline_files
         )
 
         # Create two lists with corresponding indexes
         plugins_names = list(plugins_references.keys())
-        references = [
-            [
-                pathlib.Path(str(path))
-                for path in expand_template_to_sequence(item, VRAY_MATCH_SEQUENCE)
+        sequences = await asyncio.gather(
+            *[
+                action_query.event_loop.run_in_process(
+                    expand_template_to_sequence, item, VRAY_MATCH_SEQUENCE
+                )
+                for item in list(plugins_references.values())
             ]
-            for item in list(plugins_references.values())
+        )
+        references = [
+            [pathlib.Path(str(path)) for path in sequence] for sequence in sequences
         ]
 
         
@@ -147,6 +147,10 @@ class InsertAction(CommandBase):
         # patch = jsondiff.patch(action_query.buffer.serialize(), action_definition)
         action_query.buffer.deserialize(action_definition)
 
+        # Each insertion is a branch of this command, the branches of an IterateAction
+        # can be executed concurrently by the parallel scheduler
+        branch = (self.command_buffer.uuid, str(uuid.uuid4()))
+
         # Adapt the indexes, the parameter paths on the newly added steps
         last_index = current_step.index
         for old_step_name, step_name in step_name_mapping.items():
@@ -154,6 +158,7 @@ class InsertAction(CommandBase):
             # Change the index to make sure the new step in executed after the current step
             step.index += current_step.index
             last_index = step.index
+            step.branches = [*current_step.branches, branch]
 
             # Adapt the parameter_path to the new step's name
             if parameter_path.step == old_step_name:
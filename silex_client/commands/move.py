@@ -1,25 +1,45 @@
 from __future__ import annotations
 
+import asyncio
+import errno
 import logging
 import os
 import pathlib
 import shutil
+import threading
+import time
 import typing
-from typing import Any, Dict, List
-
-import fileseq
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
 from silex_client.action.command_base import CommandBase
 from silex_client.utils.datatypes import SharedVariable
 from silex_client.utils.enums import ConflictBehaviour
 from silex_client.utils.prompt import prompt_override, UpdateProgress
+from silex_client.utils.parsing import find_sequences_in_list
 from silex_client.utils.parameter_types import ListParameterMeta
+from silex_client.utils.scan import stat_paths
+from silex_client.utils.staging import commit_staging_directory, is_staging_directory
 from silex_client.utils.thread import execute_in_thread
+from silex_client.utils.transfer import copy_file_verified
 
 if typing.TYPE_CHECKING:
     from silex_client.action.action_query import ActionQuery
 
 
+class MovePlan(NamedTuple):
+    """
+    Operations needed to move the sources, computed before moving anything.
+    The renames are the moves on the same device, the transfers are the files
+    copied to another device, the overridden paths are the destinations of the transfers
+    that must be removed first, and the directories are the sources emptied by the transfers
+    """
+
+    renames: List[Tuple[pathlib.Path, pathlib.Path]]
+    transfers: List[Tuple[pathlib.Path, pathlib.Path]]
+    overridden: List[pathlib.Path]
+    directories: List[Tuple[pathlib.Path, pathlib.Path]]
+
+
 class Move(CommandBase):
     """
     Copy file and override if necessary
@@ -47,6 +67,13 @@ class Move(CommandBase):
             "type": bool,
             "value": False,
         },
+        "max_in_flight": {
+            "label": "Parallel transfers",
+            "type": int,
+            "value": 8,
+            "tooltip": "Amount of files copied at the same time when moving to another device",
+            "hide": True,
+        },
     }
 
     @staticmethod
@@ -57,21 +84,139 @@ class Move(CommandBase):
         if os.path.isfile(path):
             os.remove(path)
 
+    @staticmethod
+    def plan(
+        src_paths: List[pathlib.Path],
+        src_is_dir: Dict[pathlib.Path, bool],
+        dst: pathlib.Path,
+    ) -> MovePlan:
+        """
+        Split the moves into renames and transfers, by comparing the device of the
+        directories of the sources with the device of the destination.
+        The content of the source directories is moved, not the directories themselves
+        """
+        dst_device = os.stat(dst).st_dev
+        devices: Dict[pathlib.Path, int] = {}
+        plan = MovePlan([], [], [], [])
+
+        for src in src_paths:
+            # All the sources of a directory are on the same device, stat it once
+            parent = src if src_is_dir[src] else src.parent
+            if parent not in devices:
+                devices[parent] = os.stat(parent).st_dev
+
+            if src_is_dir[src]:
+                with os.scandir(src) as entries:
+                    moves = [
+                        (pathlib.Path(entry.path), dst / entry.name, entry.is_dir())
+                        for entry in entries
+                    ]
+            else:
+                moves = [(src, dst / src.name, False)]
+
+            if devices[parent] == dst_device:
+                plan.renames.extend((source, target) for source, target, _ in moves)
+                continue
+
+            # The directories moved to another device are copied file by file
+            for source, target, is_dir in moves:
+                plan.overridden.append(target)
+                if not is_dir:
+                    plan.transfers.append((source, target))
+                    continue
+                for root, directories, files in os.walk(source):
+                    root_path = pathlib.Path(root)
+                    relative_root = target / root_path.relative_to(source)
+                    plan.directories.append((root_path, relative_root))
+                    plan.transfers.extend(
+                        (root_path / name, relative_root / name) for name in files
+                    )
+
+        return plan
+
     @classmethod
-    def move(cls, src: str, dst: str):
+    def rename_batch(
+        cls, renames: List[Tuple[pathlib.Path, pathlib.Path]]
+    ) -> Dict[str, float]:
+        """
+        Move the given sources on the same device with os.replace, in a single call
+        so the whole batch is executed in one thread. The existing destinations are replaced.
+        Returns the duration of each rename
+        """
+        timings: Dict[str, float] = {}
 
-        os.makedirs(dst, exist_ok=True)
+        for src, dst in renames:
+            start = time.perf_counter()
+            try:
+                os.replace(src, dst)
+            except OSError as exception:
+                # The device id does not tell about the bind mounts
+                if exception.errno == errno.EXDEV:
+                    cls.remove(str(dst))
+                    shutil.move(str(src), str(dst))
+                # os.replace only overrides files and empty directories
+                elif os.path.lexists(dst):
+                    cls.remove(str(dst))
+                    os.replace(src, dst)
+                else:
+                    raise
+            timings[str(src)] = time.perf_counter() - start
 
-        # Move folder or file
-        if os.path.isdir(src):
-            # Move all file in dst folder
-            file_names = os.listdir(src)
-            for file_name in file_names:
-                if os.path.exists(os.path.join(dst, file_name)):
-                    cls.remove(os.path.join(dst, file_name))
-                shutil.move(os.path.join(src, file_name), dst)
-        else:
-            shutil.move(src, dst)
+        return timings
+
+    @staticmethod
+    def commit_staging(src: pathlib.Path, dst: pathlib.Path) -> Optional[float]:
+        """
+        Move the content of a staging directory with a single rename when possible,
+        the staging directory does not exist anymore once committed.
+        Returns the duration of the commit, or None if the staging directory is on another device
+        """
+        start = time.perf_counter()
+        if os.stat(src).st_dev != os.stat(dst).st_dev:
+            return None
+
+        commit_staging_directory(src, dst)
+        return time.perf_counter() - start
+
+    @staticmethod
+    def transfer(
+        src: pathlib.Path,
+        dst: pathlib.Path,
+        progress: SharedVariable,
+        progress_lock: threading.Lock,
+    ) -> float:
+        """
+        Move a file to another device: copy, verify the hash of the copy,
+        and only then remove the source. Returns the duration of the move
+        """
+        start = time.perf_counter()
+        copy_file_verified(src, dst, progress, progress_lock)
+        # Keep the modification time, like shutil.move
+        shutil.copystat(src, dst)
+        os.remove(src)
+        return time.perf_counter() - start
+
+    @classmethod
+    def prepare_transfers(cls, plan: MovePlan):
+        """
+        Remove the overridden destinations and create the destination directories once,
+        before the transfers start
+        """
+        for path in plan.overridden:
+            cls.remove(str(path))
+        for _, directory in plan.directories:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def remove_directories(plan: MovePlan):
+        """
+        Remove the source directories emptied by the transfers, the deepest first
+        """
+        for directory, _ in reversed(plan.directories):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                pass
 
     @CommandBase.conform_command()
     async def __call__(
@@ -84,36 +229,41 @@ class Move(CommandBase):
         dst_path: pathlib.Path = parameters["dst"]
         force: bool = parameters["force"]
         merge: bool = parameters["merge"]
+        max_in_flight: int = max(parameters["max_in_flight"], 1)
 
         os.makedirs(dst_path, exist_ok=True)
+        dst_exists = True
 
-        src_sequences = fileseq.findSequencesInList(src_paths)
+        src_sequences = await action_query.event_loop.run_in_process(
+            find_sequences_in_list, src_paths
+        )
         logger.info("Moving %s to %s", src_sequences, dst_path)
 
         label = self.command_buffer.label
         progress = SharedVariable(0)
+        progress_total = SharedVariable(len(src_paths))
+        src_stats = await execute_in_thread(stat_paths, src_paths, False)
 
         async with UpdateProgress(
             self.command_buffer,
             action_query,
             progress,
-            SharedVariable(len(src_paths)),
+            progress_total,
             0.2,
         ):
-            for index, src_path in enumerate(src_paths):
-                progress.value = index + 1
-                self.command_buffer.label = f"{label} ({index+1}/{len(src_paths)})"
-
+            moved_paths: List[pathlib.Path] = []
+            for src_path in src_paths:
                 # Check for file to copy
-                if not os.path.exists(src_path):
+                if not src_stats[src_path].exists:
                     raise Exception(f"{src_path} doesn't exist.")
 
                 new_path = dst_path
 
                 # Handle override of existing file
-                if new_path.exists() and force and not merge:
+                if dst_exists and force and not merge:
                     await execute_in_thread(self.remove, new_path)
-                elif new_path.exists() and not merge:
+                    dst_exists = False
+                elif dst_exists and not merge:
 
                     conflict_behaviour = action_query.store.get(
                         "file_conflict_behaviour"
@@ -135,6 +285,7 @@ class Move(CommandBase):
                     ]:
                         force = True
                         await execute_in_thread(self.remove, new_path)
+                        dst_exists = False
                     if conflict_behaviour in [
                         ConflictBehaviour.KEEP_EXISTING,
                         ConflictBehaviour.ALWAYS_KEEP_EXISTING,
@@ -142,5 +293,79 @@ class Move(CommandBase):
                         await execute_in_thread(self.remove, src_path)
                         continue
 
-                logger.info(f"Moving file from {src_path} to {dst_path}")
-                await execute_in_thread(self.move, str(src_path), str(dst_path))
+                moved_paths.append(src_path)
+
+            await execute_in_thread(os.makedirs, dst_path, exist_ok=True)
+
+            # The staging directories of the publishes are committed with a single rename
+            timings: Dict[str, float] = {}
+            for src_path in [
+                path for path in moved_paths if is_staging_directory(path)
+            ]:
+                commit_time = await execute_in_thread(
+                    self.commit_staging, src_path, dst_path
+                )
+                if commit_time is not None:
+                    timings[str(src_path)] = commit_time
+                    moved_paths.remove(src_path)
+
+            plan = await execute_in_thread(
+                self.plan,
+                moved_paths,
+                {path: src_stats[path].is_dir for path in moved_paths},
+                dst_path,
+            )
+            move_count = len(plan.renames) + len(plan.transfers)
+            progress_total.value = max(move_count, 1)
+
+            # All the renames are executed in a single thread call, they are quick
+            timings.update(await execute_in_thread(self.rename_batch, plan.renames))
+            progress.value = len(plan.renames)
+            self.command_buffer.label = f"{label} ({progress.value}/{move_count})"
+
+            # The transfers to another device are copied concurrently
+            await execute_in_thread(self.prepare_transfers, plan)
+            transfer_slots = asyncio.Semaphore(max_in_flight)
+            transferred_bytes = SharedVariable(0)
+            progress_lock = threading.Lock()
+
+            async def transfer_one_file(src: pathlib.Path, dst: pathlib.Path):
+                async with transfer_slots:
+                    timings[str(src)] = await execute_in_thread(
+                        self.transfer, src, dst, transferred_bytes, progress_lock
+                    )
+                    progress.value += 1
+                    self.command_buffer.label = (
+                        f"{label} ({progress.value}/{move_count})"
+                    )
+
+            transfer_tasks = [
+                asyncio.ensure_future(transfer_one_file(src, dst))
+                for src, dst in plan.transfers
+            ]
+            try:
+                await asyncio.gather(*transfer_tasks)
+            finally:
+                # Stop the remaining transfers if one of them failed
+                for transfer_task in transfer_tasks:
+                    transfer_task.cancel()
+
+            await execute_in_thread(self.remove_directories, plan)
+
+        logger.info(
+            "Moved %s files: %s renamed, %s transfered (%s bytes)",
+            move_count,
+            len(plan.renames),
+            len(plan.transfers),
+            transferred_bytes.value,
+        )
+        if timings:
+            slowest = max(timings, key=timings.__getitem__)
+            logger.info("Slowest move: %s (%.3f s)", slowest, timings[slowest])
+
+        return {
+            "renamed_files": len(plan.renames),
+            "transferred_files": len(plan.transfers),
+            "transferred_bytes": transferred_bytes.value,
+            "timings": timings,
+        }
@@ -1,19 +1,29 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import TYPE_CHECKING, Any, Dict, List
+import os
+import pathlib
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
 
 from silex_client.action.command_base import CommandBase
+from silex_client.utils.parameter_types import ListParameterMeta
+from silex_client.utils.scan import stat_paths
+from silex_client.utils.thread import execute_in_thread, get_thread_pool
+from silex_client.utils.trash import (
+    TRASH_NAME,
+    purge_trash,
+    restore_paths,
+    stage_paths,
+)
 
 if TYPE_CHECKING:
     from silex_client.action.action_query import ActionQuery
 
-import os
-import pathlib
-import shutil
-from typing import List
-
-from silex_client.utils.parameter_types import ListParameterMeta
+#: Max amount of files removed by a single thread call, the large directories
+#: are split so their files are removed concurrently too
+REMOVE_CHUNK_SIZE = 1000
 
 
 class Remove(CommandBase):
@@ -27,8 +37,63 @@ class Remove(CommandBase):
             "type": ListParameterMeta(pathlib.Path),
             "value": None,
         },
+        "stage": {
+            "label": "Move to the trash",
+            "type": bool,
+            "value": False,
+            "tooltip": "The files are moved to a trash directory and deleted later, the removal can be undone",
+        },
     }
 
+    @staticmethod
+    def list_removals(
+        paths: List[pathlib.Path],
+    ) -> Tuple[List[List[pathlib.Path]], List[pathlib.Path]]:
+        """
+        List the files to remove in chunks of the same directory, and the directories
+        to remove once emptied, the parents first
+        """
+        files_by_directory: Dict[pathlib.Path, List[pathlib.Path]] = defaultdict(list)
+        directories: List[pathlib.Path] = []
+
+        stack = []
+        for path in paths:
+            if os.path.isdir(path) and not os.path.islink(path):
+                stack.append(path)
+            else:
+                files_by_directory[path.parent].append(path)
+
+        while stack:
+            directory = stack.pop()
+            directories.append(directory)
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    # The symlinks to directories are removed like files
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(pathlib.Path(entry.path))
+                    else:
+                        files_by_directory[directory].append(pathlib.Path(entry.path))
+
+        file_chunks = [
+            files[index : index + REMOVE_CHUNK_SIZE]
+            for files in files_by_directory.values()
+            for index in range(0, len(files), REMOVE_CHUNK_SIZE)
+        ]
+        return file_chunks, directories
+
+    @staticmethod
+    def remove_files(file_paths: List[pathlib.Path]):
+        for file_path in file_paths:
+            os.remove(file_path)
+
+    @staticmethod
+    def remove_directories(directories: List[pathlib.Path]):
+        """
+        Remove the emptied directories, the children first
+        """
+        for directory in reversed(directories):
+            os.rmdir(directory)
+
     @CommandBase.conform_command()
     async def __call__(
         self,
@@ -36,17 +101,66 @@ class Remove(CommandBase):
         action_query: ActionQuery,
         logger: logging.Logger,
     ):
-
         file_path: List[pathlib.Path] = parameters["file_path"]
+        stage: bool = parameters["stage"]
 
+        # Test the existence of all the files at once, with one listing per directory
+        file_stats = await execute_in_thread(stat_paths, file_path, False)
         for item in file_path:
             # Check for file to copy
-            if not os.path.exists(item):
+            if not file_stats[item].exists:
                 raise Exception(f"{item} doesn't exist.")
 
-            if os.path.isfile(item):
-                os.remove(item)
-            else:
-                shutil.rmtree(item)
+        if stage:
+            # The renames are instant, the files are deleted in the background
+            staged_paths = await execute_in_thread(
+                stage_paths, file_path, action_query.buffer.uuid
+            )
+            logger.info("Moved %s paths to the trash", len(staged_paths))
+            trash_roots = {item.parent / TRASH_NAME for item in file_path}
+            # The trash of the action is purged once it can't be undone anymore
+            action_query.trash_roots.update(trash_roots)
+            # The trash left by the crashed sessions is purged after the retention
+            get_thread_pool("io").submit(purge_trash, trash_roots)
+            return {"staged_paths": staged_paths}
+
+        file_chunks, directories = await execute_in_thread(
+            self.list_removals, file_path
+        )
+        # The chunks are removed concurrently, the files of a chunk in sequence
+        remove_tasks = [
+            asyncio.ensure_future(execute_in_thread(self.remove_files, files))
+            for files in file_chunks
+        ]
+        try:
+            await asyncio.gather(*remove_tasks)
+        finally:
+            # Stop the remaining removals if one of them failed
+            for remove_task in remove_tasks:
+                remove_task.cancel()
+        await execute_in_thread(self.remove_directories, directories)
+
+        logger.info(
+            "Removed %s files and %s directories",
+            sum(len(files) for files in file_chunks),
+            len(directories),
+        )
+        return {"staged_paths": []}
+
+    async def undo(
+        self,
+        parameters: Dict[str, Any],
+        action_query: ActionQuery,
+        logger: logging.Logger,
+    ):
+        output = self.command_buffer.output_result or {}
+        staged_paths = output.get("staged_paths", [])
+        if not staged_paths:
+            logger.warning(
+                "Could not restore the removed files: They were not moved to the trash"
+            )
+            return
 
-            logger.info(f"OK remove {item}")
+        await execute_in_thread(restore_paths, staged_paths)
+        logger.info("Restored %s paths from the trash", len(staged_paths))
+        self.command_buffer.output_result = {"staged_paths": []}
@@ -6,17 +6,18 @@ import pathlib
 import typing
 from typing import Any, Dict, List, Tuple
 
-import fileseq
-
 from silex_client.action.command_base import CommandBase
 from silex_client.action.parameter_buffer import ParameterBuffer
 from silex_client.utils.datatypes import SharedVariable
 from silex_client.utils.enums import ConflictBehaviour
 from silex_client.utils.prompt import UpdateProgress
-from silex_client.utils.files import find_sequence_from_path
+from silex_client.utils.parsing import find_sequences_in_list
+from silex_client.utils.path_sequence import PathSequence
+from silex_client.utils.scan import stat_paths
+from silex_client.utils.sequence_index import SequenceIndex
 from silex_client.utils.parameter_types import (
     ListParameterMeta,
-    PathParameterMeta,
+    PathSequenceParameterMeta,
     RadioSelectParameterMeta,
     TextParameterMeta,
 )
@@ -78,7 +79,7 @@ class Rename(CommandBase):
     parameters = {
         "src": {
             "label": "Source path",
-            "type": PathParameterMeta(multiple=True),
+            "type": PathSequenceParameterMeta(),
             "value": None,
             "tooltip": "Select the file or the directory you want to rename",
         },
@@ -103,18 +104,43 @@ class Rename(CommandBase):
         action_query: ActionQuery,
         logger: logging.Logger,
     ):
-        src_paths: List[pathlib.Path] = parameters["src"]
+        src_paths: PathSequence = parameters["src"]
         new_names: List[str] = parameters["name"]
         force: bool = parameters["force"]
 
-        src_sequences = fileseq.findSequencesInList(src_paths)
-        name_sequences = fileseq.findSequencesInList(new_names)
-        logger.info("Renaming %s to %s", src_sequences, name_sequences)
+        # The sequences of the sources are known, they don't need to be detected again
+        name_sequences = await action_query.event_loop.run_in_process(
+            find_sequences_in_list, new_names
+        )
+        logger.info("Renaming %s to %s", src_paths, name_sequences)
 
         new_paths = []
         label = self.command_buffer.label
         progress = SharedVariable(0)
 
+        # Test the existence of all the files at once, with one listing per directory
+        src_stats = await execute_in_thread(stat_paths, src_paths, False)
+        for src_path in src_paths:
+            if not src_stats[src_path].exists:
+                raise Exception(f"Source path {src_path} does not exists")
+
+        # Construct the new names, the extension of the sequence is kept
+        extensions = []
+        for record in src_paths.records:
+            extensions.extend([record.extension] * len(record))
+        for index, src_path in enumerate(src_paths):
+            new_name = new_names[index % len(new_names)]
+            new_name = os.path.splitext(new_name)[0] + extensions[index]
+            new_paths.append(src_path.parent / new_name)
+
+        # The set of existing files is kept up to date with the renames
+        new_stats = await execute_in_thread(stat_paths, new_paths, False)
+        existing_paths = {
+            path
+            for path, file_stat in [*src_stats.items(), *new_stats.items()]
+            if file_stat.exists
+        }
+
         # Loop over all the files to rename
         async with UpdateProgress(
             self.command_buffer,
@@ -127,26 +153,15 @@ class Rename(CommandBase):
                 progress.value = index + 1
                 self.command_buffer.label = f"{label} ({index+1}/{len(src_paths)})"
 
-                new_name = new_names[index % len(new_names)]
-
-                if not src_path.exists():
-                    raise Exception(f"Source path {src_path} does not exists")
-
-                # Find the sequence this file belongs to
-                src_sequence = find_sequence_from_path(src_path)
-
-                # Construct the new name
-                extension = str(src_sequence.extension())
-                new_name = os.path.splitext(new_name)[0] + extension
-                new_path = src_path.parent / new_name
-
-                new_paths.append(new_path)
+                new_path = new_paths[index]
+                new_name = new_path.name
+                extension = extensions[index]
 
                 # Handle override of existing file
 
-                if new_path.exists() and force:
+                if new_path in existing_paths and force:
                     await execute_in_thread(os.remove, new_path)
-                elif new_path.exists():
+                elif new_path in existing_paths:
 
                     conflict_behaviour = action_query.store.get(
                         "file_conflict_behaviour"
@@ -158,7 +173,7 @@ class Rename(CommandBase):
                     if conflict_behaviour is ConflictBehaviour.RENAME:
                         new_name = new_name + extension
                         new_path = src_path.parent / new_name
-                        new_paths[-1] = new_path
+                        new_paths[index] = new_path
                     if conflict_behaviour in [
                         ConflictBehaviour.ALWAYS_OVERRIDE,
                         ConflictBehaviour.ALWAYS_KEEP_EXISTING,
@@ -177,9 +192,14 @@ class Rename(CommandBase):
                         ConflictBehaviour.ALWAYS_KEEP_EXISTING,
                     ]:
                         await execute_in_thread(os.remove, src_path)
+                        existing_paths.discard(src_path)
                         continue
 
                 await execute_in_thread(os.rename, src_path, new_path)
+                # The modification time of the directory might not change in the same tick
+                SequenceIndex.get().invalidate(src_path.parent)
+                existing_paths.discard(src_path)
+                existing_paths.add(new_path)
 
         return {
             "source_paths": src_paths,
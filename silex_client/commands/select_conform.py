@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-import copy
+import asyncio
 import logging
 import pathlib
 import typing
@@ -11,7 +11,14 @@ import fileseq
 from silex_client.action.command_base import CommandBase
 from silex_client.action.parameter_buffer import ParameterBuffer
 from silex_client.resolve.config import Config
+from silex_client.utils.datatypes import SharedVariable
+from silex_client.utils.parsing import find_sequences_in_list
 from silex_client.utils.parameter_types import PathParameterMeta, SelectParameterMeta
+from silex_client.utils.path_sequence import PathSequence
+from silex_client.utils.prompt import UpdateProgress
+from silex_client.utils.scan import SequenceRecord
+from silex_client.utils.sequence_index import SequenceIndex
+from silex_client.utils.thread import execute_in_thread
 
 # Forward references
 if typing.TYPE_CHECKING:
@@ -83,7 +90,10 @@ class SelectConform(CommandBase):
         conform_type: str = parameters["conform_type"]
         auto_select_type: bool = parameters["auto_select_type"]
 
-        sequences = fileseq.findSequencesInList(file_paths)
+        # The sequence detection can be slow for long lists of files
+        sequences = await action_query.event_loop.run_in_process(
+            find_sequences_in_list, file_paths
+        )
         conform_types = []
         frame_sets = [
             sequence.frameSet() or fileseq.FrameSet(0) for sequence in sequences
@@ -136,42 +146,73 @@ class SelectConform(CommandBase):
             conform_type = await self._prompt_new_type(action_query)
             conform_types.append(conform_type)
 
-        # Convert the fileseq's sequences into list of pathlib.Path
-        sequences_copy = copy.deepcopy(sequences)
+        # Convert the fileseq's sequences into lazy lists of pathlib.Path
+        file_sequences = sequences
         sequences = []
-        for sequence in sequences_copy:
+        for sequence in file_sequences:
             # For sequences of one item, don't return a list
             if len(sequence) > 1:
-                sequences.append([pathlib.Path(str(path)) for path in list(sequence)])
+                sequences.append(PathSequence(sequence))
                 continue
 
             sequences.append(pathlib.Path(str(sequence[0])))
 
         # Simply return what was sent if find_sequence not set
         if find_sequence:
-            # Handle file sequences
-            for index, sequence in enumerate(sequences):
-                if not sequence:
-                    continue
-                file_path = sequence if not isinstance(sequence, list) else sequence[0]
-                for file_sequence in fileseq.findSequencesOnDisk(str(file_path.parent)):
-                    # Find the file sequence that correspond the to file we are looking for
-                    sequence_list = [pathlib.Path(str(file)) for file in file_sequence]
-                    if file_path in sequence_list and len(sequence_list) > 1:
+            loop = asyncio.get_running_loop()
+            label = self.command_buffer.label
+            progress = SharedVariable(0)
+            progress_total = SharedVariable(max(len(sequences), 1))
+
+            def set_scan_label(records: List[SequenceRecord]) -> None:
+                # Called from the scanning thread, the buffer is modified from the loop
+                file_count = sum(len(record) for record in records)
+                loop.call_soon_threadsafe(
+                    setattr,
+                    self.command_buffer,
+                    "label",
+                    f"{label} ({file_count} files scanned)",
+                )
+
+            # The large directories take a while to scan, the amount of files
+            # scanned so far is displayed in the label of the command
+            async with UpdateProgress(
+                self.command_buffer, action_query, progress, progress_total, 0.2
+            ):
+                # Handle file sequences
+                for index, sequence in enumerate(sequences):
+                    progress.value = index
+                    if not sequence:
+                        continue
+                    file_path = (
+                        sequence if isinstance(sequence, pathlib.Path) else sequence[0]
+                    )
+                    # Find the file sequence that correspond the to file we are looking for,
+                    # the directories are only listed once
+                    file_sequence = await execute_in_thread(
+                        SequenceIndex.get().find_sequence_of_file,
+                        file_path,
+                        set_scan_label,
+                    )
+                    if file_sequence is not None and len(file_sequence) > 1:
                         frame_sets[index] = file_sequence.frameSet()
-                        sequences[index] = sequence_list
+                        sequences[index] = PathSequence(file_sequence)
                         paddings[index] = file_sequence._zfill
-                        break
-
-            # Finding sequences might result in duplicates
-            sequences_copy = copy.deepcopy(sequences)
-            for index, sequence in enumerate(sequences_copy):
-                offset = len(sequences_copy) - len(sequences)
-                if sequence in sequences[: index - offset]:
-                    sequences.pop(index - offset)
-                    frame_sets.pop(index - offset)
-                    paddings.pop(index - offset)
-                    conform_types.pop(index - offset)
+            self.command_buffer.label = label
+
+            # Finding sequences might result in duplicates, only the first one is kept
+            found_sequences = set()
+            unique_indexes = []
+            for index, sequence in enumerate(sequences):
+                key = sequence if isinstance(sequence, pathlib.Path) else str(sequence)
+                if key in found_sequences:
+                    continue
+                found_sequences.add(key)
+                unique_indexes.append(index)
+            sequences = [sequences[index] for index in unique_indexes]
+            frame_sets = [frame_sets[index] for index in unique_indexes]
+            paddings = [paddings[index] for index in unique_indexes]
+            conform_types = [conform_types[index] for index in unique_indexes]
 
         return {
             "files": [
@@ -181,8 +222,6 @@ class SelectConform(CommandBase):
             "types": conform_types,
         }
 
-    
-
     async def setup(
         self,
         parameters: Dict[str, Any],
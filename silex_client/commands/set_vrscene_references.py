@@ -9,7 +9,7 @@ import fileseq
 from silex_client.action.command_base import CommandBase
 from silex_client.utils.files import format_sequence_string
 from silex_client.utils.constants import VRAY_MATCH_SEQUENCE
-from silex_client.utils.thread import execute_in_thread
+from silex_client.utils.thread import execute_in_sdk_thread
 from silex_client.utils.parameter_types import (
     ListParameterMeta,
     PathParameterMeta,
@@ -96,7 +96,7 @@ class SetVrsceneReferences(CommandBase):
         
         # set references paths
         for vrscene_src, vrscene_dst in zip(vrscenes_src, vrscenes_dst):
-            await execute_in_thread(
+            await execute_in_sdk_thread(
                 self._set_vrscene_references,
                 vrscene_src,
                 vrscene_dst,
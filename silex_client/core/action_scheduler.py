@@ -0,0 +1,219 @@
+"""
+@author: TD gang
+
+Limit the amount of actions running at the same time, the other actions wait in a queue
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import threading
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Set, Tuple
+
+from silex_client.utils.log import logger
+
+# Forward references
+if TYPE_CHECKING:
+    from silex_client.action.action_query import ActionQuery
+
+#: The interactive actions are admitted before the batch actions
+INTERACTIVE_PRIORITY = 0
+BATCH_PRIORITY = 1
+
+
+class ActionScheduler:
+    """
+    Admission control for the actions, only max_running actions can run at the same time.
+    When no slot is available, the action waits in a queue, the interactive actions
+    are admitted before the batch actions, and in the order they were queued.
+    All the methods must be called from the loop that executes the actions,
+    except stats which can be called from any thread
+
+    :ivar max_running: Max amount of actions running at the same time, 0 means no limit
+    """
+
+    def __init__(self, max_running: int = 4):
+        self.max_running = max_running
+
+        self._running: Dict[str, ActionQuery] = {}
+        self._queued: Dict[str, Tuple[ActionQuery, asyncio.Future, float]] = {}
+        self._queue: List[Tuple[int, int, str]] = []
+        self._counter = itertools.count()
+        # Amount of commands of each action waiting for the user
+        self._suspended: Dict[str, int] = {}
+        # The actions that gave their slot away while waiting for the user
+        self._released: Set[str] = set()
+        # The stats are read from the control loop, while the actions can be
+        # executed in the command loop
+        self._lock = threading.Lock()
+
+        self.admitted = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    @property
+    def has_capacity(self) -> bool:
+        return self.max_running <= 0 or len(self._running) < self.max_running
+
+    def is_queued(self, action: ActionQuery) -> bool:
+        return action.buffer.uuid in self._queued
+
+    def _admit(self, action: ActionQuery, wait_time: float) -> None:
+        with self._lock:
+            self._running[action.buffer.uuid] = action
+            self.admitted += 1
+            self.total_wait_time += wait_time
+            self.max_wait_time = max(self.max_wait_time, wait_time)
+
+    def _admit_next(self) -> None:
+        """
+        Give the free slots to the queued actions by order of priority
+        """
+        while self.has_capacity and self._queue:
+            _, _, uuid = heapq.heappop(self._queue)
+            # The action might have been cancelled while waiting
+            if uuid not in self._queued:
+                continue
+
+            with self._lock:
+                action, future, queued_time = self._queued.pop(uuid)
+            if future.done():
+                continue
+
+            self._admit(action, time.perf_counter() - queued_time)
+            future.set_result(None)
+
+    async def acquire(self, action: ActionQuery) -> None:
+        """
+        Wait until a slot is available for the given action
+        """
+        uuid = action.buffer.uuid
+        if uuid in self._running:
+            return
+        # An other command of the action is already waiting for the slot
+        if uuid in self._queued:
+            await asyncio.shield(self._queued[uuid][1])
+            return
+
+        if self.has_capacity and not self._queue:
+            self._admit(action, 0.0)
+            return
+
+        priority = BATCH_PRIORITY if action.batch else INTERACTIVE_PRIORITY
+        future = asyncio.get_event_loop().create_future()
+        with self._lock:
+            self._queued[uuid] = (action, future, time.perf_counter())
+        heapq.heappush(self._queue, (priority, next(self._counter), uuid))
+        logger.info(
+            "Action %s queued: %s actions are already running",
+            action.name,
+            len(self._running),
+        )
+
+        try:
+            self._admit_next()
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                self._queued.pop(uuid, None)
+            # The slot might have been given right before the cancellation
+            if future.done() and not future.cancelled():
+                self.release(action)
+            raise
+
+    def release(self, action: ActionQuery) -> None:
+        """
+        Free the slot of the given action and give it to the next queued action
+        """
+        with self._lock:
+            self._running.pop(action.buffer.uuid, None)
+        self._admit_next()
+
+    @contextlib.asynccontextmanager
+    async def running(self, action: ActionQuery) -> AsyncIterator[None]:
+        """
+        Hold a slot for the given action during the context
+        """
+        await self.acquire(action)
+        try:
+            yield
+        finally:
+            self._released.discard(action.buffer.uuid)
+            self.release(action)
+
+    @contextlib.asynccontextmanager
+    async def suspend(self, action: ActionQuery) -> AsyncIterator[None]:
+        """
+        Free the slot of the given action during the context, used when an action
+        waits for the user so it does not prevent the other actions from running.
+        With the parallel scheduler, the slot is only freed once all the running
+        commands of the action are waiting for the user
+        """
+        uuid = action.buffer.uuid
+        self._suspended[uuid] = self._suspended.get(uuid, 0) + 1
+        try:
+            self.release_if_suspended(action)
+            yield
+        finally:
+            self._suspended[uuid] -= 1
+            if not self._suspended[uuid]:
+                del self._suspended[uuid]
+        # If the action is cancelled while waiting, the slot is not taken back
+        await self.resume(action)
+
+    async def resume(self, action: ActionQuery) -> None:
+        """
+        Take back the slot the given action gave away while waiting for the user
+        """
+        uuid = action.buffer.uuid
+        if uuid in self._released:
+            await self.acquire(action)
+            self._released.discard(uuid)
+
+    def release_if_suspended(self, action: ActionQuery) -> None:
+        """
+        Free the slot of the given action if all its running commands wait for the user.
+        Must be called by the parallel scheduler before waiting for its running commands
+        """
+        uuid = action.buffer.uuid
+        if uuid not in self._running or not self._suspended.get(uuid):
+            return
+        if self._suspended[uuid] >= action.active_commands:
+            self._released.add(uuid)
+            self.release(action)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of the running and queued actions, the times are in seconds
+        """
+        now = time.perf_counter()
+        with self._lock:
+            running = list(self._running.items())
+            queued = list(self._queued.items())
+            admitted = self.admitted
+            total_wait_time = self.total_wait_time
+            max_wait_time = self.max_wait_time
+
+        return {
+            "max_running": self.max_running,
+            "running": [
+                {"uuid": uuid, "name": action.name, "batch": action.batch}
+                for uuid, action in running
+            ],
+            "queued": [
+                {
+                    "uuid": uuid,
+                    "name": action.name,
+                    "batch": action.batch,
+                    "wait_time": now - queued_time,
+                }
+                for uuid, (action, _, queued_time) in queued
+            ],
+            "admitted": admitted,
+            "average_wait_time": total_wait_time / max(admitted, 1),
+            "max_wait_time": max_wait_time,
+        }
@@ -13,7 +13,6 @@ import os
 import sys
 import uuid
 from concurrent import futures
-from queue import Queue
 from typing import TYPE_CHECKING, Any, Callable, Dict, ItemsView, KeysView, ValuesView
 
 import gazu
@@ -23,10 +22,12 @@ import gazu.files
 import gazu.shot
 import gazu.task
 import gazu.user
+from silex_client.core.action_scheduler import ActionScheduler
 from silex_client.core.event_loop import EventLoop
 from silex_client.network.websocket import WebsocketConnection
 from silex_client.utils.authentification import authentificate_gazu
 from silex_client.utils.log import logger
+from silex_client.utils.thread import MainThreadDispatcher, shutdown_thread_pools
 
 # Forward references
 if TYPE_CHECKING:
@@ -51,9 +52,13 @@ class Context:
         self.ws_connection = WebsocketConnection("ws://127.0.0.1:5118", self)
 
         self._actions: Dict[str, ActionQuery] = {}
-        # The event queue is used to pass callable between threads
-        # the tuple is meant to store kwargs and args
-        self.callback_queue: "Queue[Callable]" = Queue()
+        # Limit the amount of actions running at the same time
+        max_running_actions = os.getenv("SILEX_MAX_RUNNING_ACTIONS", "4")
+        self.action_scheduler = ActionScheduler(
+            int(max_running_actions) if max_running_actions.isdigit() else 4
+        )
+        # The dispatcher is used to pass callables to the main thread
+        self.main_thread_dispatcher = MainThreadDispatcher()
 
     def start_services(self):
         self.compute_metadata()
@@ -63,15 +68,40 @@ class Context:
     def stop_services(self):
         futures.wait([self.ws_connection.stop()], timeout=None)
         self.event_loop.stop()
+        shutdown_thread_pools(timeout=self.event_loop.JOIN_THREAD_TIMEOUT)
+
+    @property
+    def callback_queue(self) -> MainThreadDispatcher:
+        """
+        Kept for the integrations that still use the queue interface (put/get/empty)
+        """
+        return self.main_thread_dispatcher
+
+    async def execute_in_main_thread(self, function: Callable, *args, **kwargs) -> Any:
+        """
+        Execute the given function in the main thread and await its result,
+        the main thread must be running main_thread_dispatcher.run_until_complete()
+        """
+        return await self.main_thread_dispatcher.execute(function, *args, **kwargs)
 
     @property
     def actions(self) -> Dict[str, ActionQuery]:
         return self._actions
 
+    @property
+    def queued_actions(self):
+        return {
+            key: action
+            for key, action in self.actions.items()
+            if self.action_scheduler.is_queued(action)
+        }
+
     @property
     def running_actions(self):
         return {
-            key: action for key, action in self.actions.items() if action.is_running
+            key: action
+            for key, action in self.actions.items()
+            if action.is_running and not action.is_queued
         }
 
     def register_action(self, action: ActionQuery):
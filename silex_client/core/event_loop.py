@@ -3,17 +3,41 @@
 
 The event loop is running in a different thread, to add a task, use
 register_task() with a coroutine as a parameter
+
+The actions can optionally be executed in a second loop (the command loop), so a
+command that keeps its loop busy does not delay the websocket traffic of the main loop
 """
 
 import asyncio
+import functools
 import gc
+import os
 import traceback
 from concurrent import futures
 from contextlib import suppress
-from threading import Thread
-from typing import Coroutine
+from threading import Thread, current_thread
+from typing import Any, Callable, Coroutine, Dict, Optional
 
+from silex_client.core.loop_monitor import LoopMonitor
 from silex_client.utils.log import logger
+from silex_client.utils.thread import execute_in_thread
+
+
+class _CommandLoopView:
+    """
+    The command loop and its thread, as seen by its monitor
+    """
+
+    def __init__(self, event_loop: "EventLoop"):
+        self._event_loop = event_loop
+
+    @property
+    def loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        return self._event_loop.command_loop
+
+    @property
+    def thread(self) -> Thread:
+        return self._event_loop.command_thread
 
 
 class EventLoop:
@@ -22,6 +46,14 @@ class EventLoop:
     connection, and action execution
 
     :ivar JOIN_THREAD_TIMEOUT: How long in second to wait for the thread to join before returning an error
+    :ivar process_pool_size: Amount of worker processes for CPU heavy helpers,
+    the process pool is disabled when set to 0 (opt-in with SILEX_PROCESS_POOL=<size>)
+    :ivar monitor: Watchdog of the loop, reports the slow callbacks (threshold in ms set
+    with SILEX_SLOW_CALLBACK_MS) and the latencies of the tasks, it wraps every task
+    so it is disabled by default (opt-in with SILEX_LOOP_MONITOR=1)
+    :ivar command_monitor: Same watchdog for the command loop, when it is enabled
+    :ivar command_loop_enabled: Execute the actions in a dedicated loop, running in its own
+    thread (opt-in with SILEX_COMMAND_LOOP=1)
     """
 
     JOIN_THREAD_TIMEOUT = 2
@@ -30,17 +62,67 @@ class EventLoop:
         self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
         self.thread: Thread = Thread()
 
+        process_pool_size = os.getenv("SILEX_PROCESS_POOL", "0")
+        self.process_pool_size = (
+            int(process_pool_size) if process_pool_size.isdigit() else 0
+        )
+        self._process_pool: Optional[futures.ProcessPoolExecutor] = None
+
+        self.monitor: Optional[LoopMonitor] = None
+        if os.getenv("SILEX_LOOP_MONITOR", "0") == "1":
+            slow_callback = os.getenv("SILEX_SLOW_CALLBACK_MS", "100")
+            threshold = int(slow_callback) / 1000 if slow_callback.isdigit() else 0.1
+            self.monitor = LoopMonitor(self, threshold)
+
+        self.command_loop_enabled = os.getenv("SILEX_COMMAND_LOOP", "0") == "1"
+        self.command_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.command_thread: Thread = Thread()
+
+        self.command_monitor: Optional[LoopMonitor] = None
+        if self.monitor is not None and self.command_loop_enabled:
+            self.command_monitor = LoopMonitor(
+                _CommandLoopView(self),
+                self.monitor.slow_callback_threshold,
+                "command loop",
+            )
+
     @property
     def is_running(self) -> bool:
         return self.loop.is_running()
 
+    @property
+    def is_command_loop_running(self) -> bool:
+        return self.command_loop is not None and self.command_loop.is_running()
+
+    @staticmethod
+    def _install_monitor(
+        loop: asyncio.AbstractEventLoop, monitor: Optional[LoopMonitor]
+    ) -> None:
+        if monitor is not None:
+            loop.set_task_factory(monitor.task_factory)
+            # Used by asyncio when running in debug mode (PYTHONASYNCIODEBUG=1)
+            loop.slow_callback_duration = monitor.slow_callback_threshold
+
     def _start_event_loop(self) -> None:
         asyncio.set_event_loop(self.loop)
+        self._install_monitor(self.loop, self.monitor)
         self.loop.run_forever()
 
         # Clear it once completed
         self._clear_event_loop()
 
+    def _start_command_loop(self, command_loop: asyncio.AbstractEventLoop) -> None:
+        asyncio.set_event_loop(command_loop)
+        self._install_monitor(command_loop, self.command_monitor)
+        command_loop.run_forever()
+
+        # Cancel the remaining actions once completed
+        for task in asyncio.all_tasks(command_loop):
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                command_loop.run_until_complete(task)
+        command_loop.close()
+
     def _clear_event_loop(self) -> None:
         if self.is_running:
             logger.info(
@@ -75,12 +157,48 @@ class EventLoop:
         logger.info("Starting the event loop")
         self.thread = Thread(target=self._start_event_loop, daemon=True)
         self.thread.start()
+        if self.monitor is not None:
+            self.monitor.start()
+
+        if self.command_loop_enabled and not self.is_command_loop_running:
+            logger.info("Starting the command loop")
+            self.command_loop = asyncio.new_event_loop()
+            self.command_thread = Thread(
+                target=self._start_command_loop, args=(self.command_loop,), daemon=True
+            )
+            self.command_thread.start()
+            if self.command_monitor is not None:
+                self.command_monitor.start()
 
     def stop(self) -> None:
         """
         Ask to all the event loop's tasks to stop and join the thread to the main thread
         if there is one running
         """
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False)
+            self._process_pool = None
+
+        if self.monitor is not None:
+            self.monitor.stop()
+            # The stats are only dumped on request, the loop is stopped on each reload
+            stats_file = os.getenv("SILEX_LOOP_STATS_FILE")
+            if stats_file:
+                self.monitor.dump(stats_file)
+
+        if self.command_monitor is not None:
+            self.command_monitor.stop()
+            stats_file = os.getenv("SILEX_LOOP_STATS_FILE")
+            if stats_file:
+                stats_root, stats_extension = os.path.splitext(stats_file)
+                self.command_monitor.dump(f"{stats_root}_command{stats_extension}")
+
+        if self.command_loop is not None:
+            if self.command_loop.is_running():
+                self.command_loop.call_soon_threadsafe(self.command_loop.stop)
+                self.command_thread.join(self.JOIN_THREAD_TIMEOUT)
+            self.command_loop = None
+
         if not self.loop.is_running():
             return
 
@@ -91,6 +209,66 @@ class EventLoop:
         else:
             logger.info("Event loop stopped")
 
+    def stats(self) -> Dict[str, Any]:
+        """
+        Measures of the loop monitor, empty if the monitor is disabled.
+        The measures of the command loop are under the key command_loop
+        """
+        if self.monitor is None:
+            return {}
+
+        stats = self.monitor.stats()
+        if self.command_monitor is not None:
+            stats["command_loop"] = self.command_monitor.stats()
+        return stats
+
+    @property
+    def process_pool(self) -> Optional[futures.ProcessPoolExecutor]:
+        """
+        Lazy loaded pool of worker processes, None if the process pool is disabled
+        """
+        if self.process_pool_size <= 0:
+            return None
+
+        if self._process_pool is None:
+            logger.info(
+                "Starting the process pool with %s workers", self.process_pool_size
+            )
+            self._process_pool = futures.ProcessPoolExecutor(self.process_pool_size)
+
+        return self._process_pool
+
+    async def run_in_process(self, function: Callable, *args, **kwargs) -> Any:
+        """
+        Execute a CPU heavy function in the process pool and await its result,
+        so it does not block the event loop or the DCC's thread.
+
+        The function, its arguments and its result must be picklable.
+        If the process pool is disabled, the function is executed in a thread instead.
+        Cancelling the awaiting task only cancels the function if it has not started yet
+        """
+        process_pool = self.process_pool
+        if process_pool is None:
+            return await execute_in_thread(function, *args, **kwargs)
+
+        try:
+            concurrent_future = process_pool.submit(
+                functools.partial(function, *args, **kwargs)
+            )
+        except futures.process.BrokenProcessPool:
+            # A worker died (killed, crashed...), the pool is unusable and must be recreated
+            logger.warning("The process pool is broken, restarting it")
+            # Release the remaining workers and the management thread of the broken pool
+            process_pool.shutdown(wait=False)
+            process_pool = futures.ProcessPoolExecutor(self.process_pool_size)
+            self._process_pool = process_pool
+            concurrent_future = process_pool.submit(
+                functools.partial(function, *args, **kwargs)
+            )
+
+        # The cancellation of the awaited future is propagated to the concurrent future
+        return await asyncio.wrap_future(concurrent_future)
+
     def register_task(self, coroutine: Coroutine) -> futures.Future:
         """
         Helper to add tasks to the event loop from a different thread
@@ -104,7 +282,35 @@ class EventLoop:
             future.set_result(None)
             return future
 
-        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        scheduled_coroutine = coroutine
+        if self.monitor is not None:
+            scheduled_coroutine = self.monitor.time_registered_coroutine(coroutine)
+
+        return self._run_coroutine(coroutine, scheduled_coroutine, self.loop)
+
+    def register_command_task(self, coroutine: Coroutine) -> futures.Future:
+        """
+        Helper to add the execution of an action to the command loop from a different thread,
+        the task is added to the main loop if the command loop is disabled
+        """
+        if self.command_loop is None or not self.command_loop.is_running():
+            return self.register_task(coroutine)
+
+        scheduled_coroutine = coroutine
+        if self.command_monitor is not None:
+            scheduled_coroutine = self.command_monitor.time_registered_coroutine(
+                coroutine
+            )
+
+        return self._run_coroutine(coroutine, scheduled_coroutine, self.command_loop)
+
+    @staticmethod
+    def _run_coroutine(
+        coroutine: Coroutine,
+        scheduled_coroutine: Coroutine,
+        loop: asyncio.AbstractEventLoop,
+    ) -> futures.Future:
+        future = asyncio.run_coroutine_threadsafe(scheduled_coroutine, loop)
 
         def callback(task_result: futures.Future):
             if task_result.cancelled():
@@ -119,3 +325,48 @@ class EventLoop:
 
         future.add_done_callback(callback)
         return future
+
+    async def run_in_control_loop(self, coroutine: Coroutine) -> Any:
+        """
+        Await the given coroutine in the main loop, used to reach the websocket
+        connection from the command loop. The coroutine is awaited directly when
+        the caller is already in the main loop
+        """
+        if asyncio.get_event_loop() is self.loop:
+            return await coroutine
+
+        return await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        )
+
+    async def run_in_command_loop(self, coroutine: Coroutine) -> Any:
+        """
+        Await the given coroutine in the command loop, the coroutine is awaited
+        directly when the command loop is disabled or if the caller is already in it
+        """
+        command_loop = self.command_loop
+        if (
+            command_loop is None
+            or not command_loop.is_running()
+            or asyncio.get_event_loop() is command_loop
+        ):
+            return await coroutine
+
+        return await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(coroutine, command_loop)
+        )
+
+    def call_in_command_loop(self, callback: Callable, *args) -> None:
+        """
+        Call the given callback from the thread of the loop that runs the actions,
+        the callback is called directly if the caller is already in this thread
+        """
+        if self.command_loop is None or not self.command_loop.is_running():
+            loop, thread = self.loop, self.thread
+        else:
+            loop, thread = self.command_loop, self.command_thread
+
+        if current_thread() is thread or not loop.is_running():
+            callback(*args)
+        else:
+            loop.call_soon_threadsafe(callback, *args)
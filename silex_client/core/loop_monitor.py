@@ -0,0 +1,266 @@
+"""
+@author: TD gang
+
+Instrumentation of the event loop, to find the coroutines that block it
+and measure how long the tasks wait before being executed
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import inspect
+import json
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import TYPE_CHECKING, Any, Coroutine, Deque, Dict, List, Optional
+
+from silex_client.utils.log import logger
+
+# Forward references
+if TYPE_CHECKING:
+    from silex_client.core.event_loop import EventLoop
+
+#: Upper bounds of the histogram buckets, in seconds, the last bucket has no upper bound
+LATENCY_BUCKETS = [0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0]
+
+
+class LatencyHistogram:
+    """
+    Count the latencies in fixed buckets, and keep track of the total and max latency
+    """
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, latency: float) -> None:
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+        self.count += 1
+        self.total += latency
+        self.max = max(self.max, latency)
+
+    def stats(self) -> Dict[str, Any]:
+        bucket_names = [f"<={bound}" for bound in LATENCY_BUCKETS]
+        bucket_names.append(f">{LATENCY_BUCKETS[-1]}")
+        return {
+            "count": self.count,
+            "average": self.total / max(self.count, 1),
+            "max": self.max,
+            "buckets": dict(zip(bucket_names, self.buckets)),
+        }
+
+
+class LoopMonitor:
+    """
+    Watch the event loop from a separate thread. The watchdog schedules a heartbeat
+    on the loop at each interval, if the heartbeat is not executed before the threshold
+    the loop is blocked, and the stack of the loop's thread is logged.
+
+    :ivar HEARTBEAT_INTERVAL: Time in seconds between two heartbeats
+    :ivar MAX_SLOW_CALLBACKS: Amount of slow callbacks kept for the stats
+    :ivar slow_callback_threshold: Time in seconds after which the loop is considered blocked
+    """
+
+    HEARTBEAT_INTERVAL = 0.1
+    MAX_SLOW_CALLBACKS = 20
+
+    def __init__(
+        self,
+        event_loop: EventLoop,
+        slow_callback_threshold: float = 0.1,
+        name: str = "event loop",
+    ):
+        self.event_loop = event_loop
+        self.slow_callback_threshold = slow_callback_threshold
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.loop_lag = LatencyHistogram()
+        self.register_latency = LatencyHistogram()
+        self.task_latencies: Dict[str, LatencyHistogram] = {}
+        self.slow_callbacks: Deque[Dict[str, Any]] = deque(
+            maxlen=self.MAX_SLOW_CALLBACKS
+        )
+        self.slow_callback_count = 0
+
+    def _record(self, histogram: LatencyHistogram, latency: float) -> None:
+        with self._lock:
+            histogram.record(latency)
+
+    def record_register_latency(self, latency: float) -> None:
+        """
+        Time between the call to EventLoop.register_task and the start of the coroutine
+        """
+        self._record(self.register_latency, latency)
+
+    def record_task_latency(self, name: str, latency: float) -> None:
+        """
+        Time between the creation of a task and its first execution
+        """
+        with self._lock:
+            histogram = self.task_latencies.setdefault(name, LatencyHistogram())
+            histogram.record(latency)
+
+    def task_factory(
+        self, loop: asyncio.AbstractEventLoop, coroutine: Coroutine, **kwargs
+    ) -> asyncio.Task:
+        """
+        Task factory that measures the scheduling latency of every task of the loop.
+        The other arguments of the task (context, name...) depend on the python version
+        """
+        name = getattr(coroutine, "__qualname__", type(coroutine).__name__)
+        created_time = time.perf_counter()
+
+        async def timed_coroutine():
+            self.record_task_latency(name, time.perf_counter() - created_time)
+            return await coroutine
+
+        wrapped_coroutine = timed_coroutine()
+        wrapped_coroutine.__qualname__ = name
+        return asyncio.Task(wrapped_coroutine, loop=loop, **kwargs)
+
+    def time_registered_coroutine(self, coroutine: Coroutine) -> Coroutine:
+        """
+        Wrap a coroutine given to EventLoop.register_task to measure its queue time
+        """
+        name = getattr(coroutine, "__qualname__", type(coroutine).__name__)
+        queued_time = time.perf_counter()
+
+        async def timed_coroutine():
+            self.record_register_latency(time.perf_counter() - queued_time)
+            return await coroutine
+
+        wrapped_coroutine = timed_coroutine()
+        wrapped_coroutine.__qualname__ = name
+        return wrapped_coroutine
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._watch, name="silex_loop_monitor", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(self.HEARTBEAT_INTERVAL * 2)
+            self._thread = None
+
+    def _watch(self) -> None:
+        while not self._stop_event.wait(self.HEARTBEAT_INTERVAL):
+            loop = self.event_loop.loop
+            # The command loop only exists while the event loop is started
+            if loop is None or not loop.is_running():
+                continue
+
+            heartbeat = threading.Event()
+            sent_time = time.perf_counter()
+            try:
+                loop.call_soon_threadsafe(heartbeat.set)
+            except RuntimeError:
+                # The loop has been closed in the meantime
+                continue
+
+            if not heartbeat.wait(self.slow_callback_threshold):
+                self._report_slow_callback(loop)
+                while not heartbeat.wait(self.HEARTBEAT_INTERVAL):
+                    if self._stop_event.is_set() or not loop.is_running():
+                        break
+
+            self._record(self.loop_lag, time.perf_counter() - sent_time)
+
+    def _report_slow_callback(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Log the task and the stack that are currently blocking the loop
+        """
+        task = asyncio.current_task(loop)
+        frame = sys._current_frames().get(self.event_loop.thread.ident or -1)
+        stack = traceback.format_stack(frame, limit=8) if frame is not None else []
+
+        # The offending coroutine is the innermost coroutine of the stack
+        coroutine = None
+        while frame is not None:
+            if frame.f_code.co_flags & inspect.CO_COROUTINE:
+                coroutine = getattr(frame.f_code, "co_qualname", frame.f_code.co_name)
+                break
+            frame = frame.f_back
+
+        slow_callback = {
+            "time": time.time(),
+            "coroutine": coroutine,
+            "task": repr(task) if task is not None else None,
+            "stack": "".join(stack),
+        }
+
+        with self._lock:
+            self.slow_callback_count += 1
+            self.slow_callbacks.append(slow_callback)
+
+        logger.warning(
+            "The %s is blocked for more than %ss by %s\n%s",
+            self.name,
+            self.slow_callback_threshold,
+            slow_callback["coroutine"] or "a callback",
+            slow_callback["stack"],
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of the measures, the times are in seconds
+        """
+        with self._lock:
+            task_latencies = {
+                name: histogram.stats()
+                for name, histogram in self.task_latencies.items()
+            }
+            return {
+                "slow_callback_threshold": self.slow_callback_threshold,
+                "slow_callback_count": self.slow_callback_count,
+                "slow_callbacks": list(self.slow_callbacks),
+                "loop_lag": self.loop_lag.stats(),
+                "register_latency": self.register_latency.stats(),
+                "task_latencies": task_latencies,
+            }
+
+    def dump(self, file_path: Optional[str] = None) -> None:
+        """
+        Log a summary of the measures, and write all of them to the given file as json
+        """
+        stats = self.stats()
+        slowest_tasks: List[str] = sorted(
+            stats["task_latencies"],
+            key=lambda name: stats["task_latencies"][name]["max"],
+            reverse=True,
+        )[:5]
+        logger.info(
+            "%s stats: %s slow callbacks, max lag %.3fs, max register latency %.3fs, slowest tasks to start: %s",
+            self.name.capitalize(),
+            stats["slow_callback_count"],
+            stats["loop_lag"]["max"],
+            stats["register_latency"]["max"],
+            ", ".join(slowest_tasks),
+        )
+
+        if file_path is None:
+            return
+
+        try:
+            with open(file_path, "w", encoding="utf-8") as stats_file:
+                json.dump(stats, stats_file, indent=2)
+        except OSError as exception:
+            logger.error(
+                "Could not dump the event loop stats to %s: %s", file_path, exception
+            )
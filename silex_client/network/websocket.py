@@ -10,14 +10,20 @@ from __future__ import annotations
 import asyncio
 import json
 from concurrent import futures
-from typing import TYPE_CHECKING, Any, Dict
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional, Set
 
 import socketio
 from silex_client.network.websocket_action import WebsocketActionNamespace
 from silex_client.network.websocket_dcc import WebsocketDCCNamespace
 from silex_client.network.websocket_front_event import WebsocketFrontEventNamespace
 from silex_client.utils.log import logger
-from silex_client.utils.serialiser import silex_encoder
+from silex_client.utils.serialiser import (
+    LOG_STREAM_CAPABILITY,
+    PATH_SEQUENCE_CAPABILITY,
+    PathSequenceStats,
+    compress_paths,
+    silex_encoder,
+)
 from socketio.exceptions import ConnectionError
 
 # Forward references
@@ -33,12 +39,17 @@ class WebsocketConnection:
 
     #: How long to wait for a confirmation fom every messages sent
     MESSAGE_CALLBACK_TIMEOUT = 1
+    #: The optional features of the protocol, only used if the UI announces them too
+    CAPABILITIES = [PATH_SEQUENCE_CAPABILITY, LOG_STREAM_CAPABILITY]
 
     def __init__(self, url: str, context: Context):
         self.url = url
 
         self.socketio = socketio.AsyncClient()
         self.event_loop = context.event_loop
+        # The capabilities are negociated at each connection, the old UIs have none
+        self.capabilities: Set[str] = set()
+        self.path_sequence_stats = PathSequenceStats()
 
         # Register the different namespaces
         self.dcc_namespace = WebsocketDCCNamespace("/dcc", context, self)
@@ -54,6 +65,13 @@ class WebsocketConnection:
     def is_running(self):
         return self.socketio.connected
 
+    def set_capabilities(self, capabilities: Optional[Iterable[str]]) -> None:
+        """
+        Enable the optional features supported by both the UI and the client
+        """
+        self.capabilities = set(capabilities or []) & set(self.CAPABILITIES)
+        logger.debug("Websocket capabilities enabled: %s", self.capabilities)
+
     async def _connect_socketio(self) -> None:
         try:
             await asyncio.wait_for(self.socketio.connect(self.url), 2)
@@ -112,6 +130,13 @@ class WebsocketConnection:
         """
         Send a message using websocket from within the event loop
         """
+        # The socketio client belongs to the event loop, the commands executed
+        # in the command loop must send their messages from there
+        if asyncio.get_event_loop() is not self.event_loop.loop:
+            return await self.event_loop.run_in_control_loop(
+                self.async_send(namespace, event, data)
+            )
+
         future = self.event_loop.loop.create_future()
 
         def callback(response):
@@ -119,6 +144,9 @@ class WebsocketConnection:
                 future.set_result(response)
 
         try:
+            # The long lists of paths are sent as sequences to the UIs that support it
+            if PATH_SEQUENCE_CAPABILITY in self.capabilities:
+                data = compress_paths(data, self.path_sequence_stats)
             data = json.loads(json.dumps(data, default=silex_encoder))
         except TypeError:
             # TODO: Set this log as an error, but make sure it works with the WebsocketLog context
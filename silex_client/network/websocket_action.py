@@ -12,6 +12,7 @@ from typing import TYPE_CHECKING, Any, Callable, Dict, List
 
 from silex_client.network.websocket_namespace import WebsocketNamespace
 from silex_client.utils.log import logger
+from silex_client.utils.serialiser import expand_paths
 
 # Forward references
 if TYPE_CHECKING:
@@ -49,6 +50,7 @@ class WebsocketActionNamespace(WebsocketNamespace):
         Create an new action query
         """
         logger.info("Query request received: %s from %s", data, self.url)
+        data = expand_paths(data)
 
         for future in self.query_futures:
             if not future.cancelled():
@@ -61,6 +63,8 @@ class WebsocketActionNamespace(WebsocketNamespace):
         Update an already executing action
         """
         logger.debug("Action update received: %s from %s", data, self.url)
+        # The UI can send back the path lists the way it received them
+        data = expand_paths(data)
 
         uuid = data.get("uuid")
         future = self.update_futures.get(uuid)
@@ -76,10 +80,11 @@ class WebsocketActionNamespace(WebsocketNamespace):
             future.set_result(data)
             del self.update_futures[uuid]
 
-        # Make sure the action is executing in forward mode
+        # Make sure the action is executing in forward mode, the state of
+        # the action is only modified from the loop that executes it
         action = self.context.actions.get(data.get("uuid"))
         if action is not None:
-            action.redo()
+            action.event_loop.call_in_command_loop(action.redo)
 
     async def on_clear(self, data):
         """
@@ -112,6 +117,38 @@ class WebsocketActionNamespace(WebsocketNamespace):
 
         await action.async_undo(all_commands=data.get("full", False))
 
+    async def on_logs(self, data):
+        """
+        Send back the logs of a command, from the given cursor. Only the new logs are sent
+        with the updates, the UI requests the previous ones when it needs them
+        """
+        logger.debug("Logs request received: %s from %s", data, self.url)
+        action = self.context.actions.get(data.get("uuid"))
+        if action is None:
+            logger.error(
+                "Could not get the logs of the action %s: The action does not exists",
+                data.get("uuid"),
+            )
+            return None
+
+        command_uuid = data.get("command")
+        for command in action.commands:
+            if command.uuid != command_uuid:
+                continue
+            return {
+                "uuid": action.buffer.uuid,
+                "command": command.uuid,
+                "start": command.logs.start,
+                "cursor": command.logs.cursor,
+                "logs": command.logs.since(data.get("cursor") or 0),
+            }
+
+        logger.error(
+            "Could not get the logs of the command %s: The command does not exists",
+            command_uuid,
+        )
+        return None
+
     async def register_query_callback(
         self, coroutine: Callable[[asyncio.Future], Any]
     ) -> asyncio.Future:
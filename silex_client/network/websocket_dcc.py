@@ -6,6 +6,7 @@ This namespace is used to register the dcc into the silex service
 """
 
 from silex_client.network.websocket_namespace import WebsocketNamespace
+from silex_client.utils.thread import thread_pools_stats
 
 
 class WebsocketDCCNamespace(WebsocketNamespace):
@@ -27,11 +28,46 @@ class WebsocketDCCNamespace(WebsocketNamespace):
             key: value.buffer.serialize() for key, value in running_actions.items()
         }
 
+        # The capabilities of the UI are disabled until it announces them
+        self.ws_connection.set_capabilities(None)
         initialisation_data = {
             "context": self.context.metadata,
             "runningActions": running_actions,
+            "capabilities": self.ws_connection.CAPABILITIES,
         }
 
-        await self.ws_connection.async_send(
+        confirm = await self.ws_connection.async_send(
             self.namespace, "initialization", initialisation_data
         )
+        # The UI can reply with its capabilities, the old UIs just confirm
+        response = confirm.result() if confirm.done() else None
+        if isinstance(response, dict):
+            self.ws_connection.set_capabilities(response.get("capabilities"))
+
+    async def on_capabilities(self, data=None):
+        """
+        Enable the optional features of the protocol announced by the UI
+        """
+        capabilities = data.get("capabilities") if isinstance(data, dict) else None
+        self.ws_connection.set_capabilities(capabilities)
+
+    async def on_disconnect(self):
+        """
+        The next UI might not support the same capabilities
+        """
+        await super().on_disconnect()
+        self.ws_connection.set_capabilities(None)
+
+    async def on_stats(self, data=None):
+        """
+        Send the state of the action scheduler, the event loop and the thread pools
+        to monitor the performances of the client
+        """
+        stats = {
+            "actions": self.context.action_scheduler.stats(),
+            "event_loop": self.context.event_loop.stats(),
+            "thread_pools": thread_pools_stats(),
+            "main_thread": self.context.main_thread_dispatcher.stats(),
+            "path_sequences": self.ws_connection.path_sequence_stats.to_dict(),
+        }
+        await self.ws_connection.async_send(self.namespace, "stats", stats)
@@ -1,11 +1,16 @@
 import asyncio
+import collections
+import contextlib
 import logging
 import os
+import threading
 import traceback
 from concurrent import futures
+from typing import Any, Deque, Dict, Optional
 
 import logzero
 
+from silex_client.utils.datatypes import get_log_buffer_size
 from silex_client.utils.enums import Status
 from silex_client.utils.log import formatter, logger
 
@@ -15,10 +20,25 @@ __LOG_FORMAT__ = "[SILEX]\
     [%(module)s.%(funcName)s] %(message)-50s (%(lineno)d)"
 websocket_formatter = logzero.LogFormatter(fmt=__LOG_FORMAT__)
 
+#: Amount of milliseconds the logs are gathered before being sent, the value can be
+#: overriden with the environment variable SILEX_LOG_FLUSH_INTERVAL
+LOG_FLUSH_INTERVAL = 100
+#: The logs are sent without waiting once this amount of logs is pending
+LOG_BATCH_SIZE = 100
+
+
+def get_log_flush_interval() -> float:
+    flush_interval = os.getenv("SILEX_LOG_FLUSH_INTERVAL", str(LOG_FLUSH_INTERVAL))
+    if not flush_interval.isdigit():
+        return LOG_FLUSH_INTERVAL / 1000
+    return int(flush_interval) / 1000
+
 
 class WebsocketLogHandler(logging.Handler):
     """
-    Handler to send all the logs to the given namespace and event through websocket
+    Handler to send all the logs to the given namespace and event through websocket.
+    The records are queued and sent together, in one update of the action,
+    after a short interval or once enough of them are pending
     """
 
     def __init__(self, action_query, command):
@@ -26,17 +46,65 @@ class WebsocketLogHandler(logging.Handler):
         self.silex_command = command
         super().__init__()
 
+        # The records come from the event loop, the threads and the DCC callbacks,
+        # appending and popping a deque is thread safe
+        self.queue: Deque[Dict[str, Any]] = collections.deque(
+            maxlen=get_log_buffer_size() or None
+        )
+        self.flush_interval = get_log_flush_interval()
+        self.batch_size = LOG_BATCH_SIZE
+        # Delay of the flush that is already scheduled, None if there is none
+        self._flush_delay: Optional[float] = None
+        self._flush_lock = threading.Lock()
+
     def emit(self, record):
         """
-        Capture the record and append it to the action logs
+        Capture the record and queue it for the action logs
         """
         if record.levelname == "DEBUG" or self.action_query.buffer.simplify:
             return
 
         log = {"level": record.levelname, "message": websocket_formatter.format(record)}
-        self.silex_command.logs.append(log)
+        self.queue.append(log)
+
+        event_loop = self.action_query.event_loop
+        if not event_loop.is_running:
+            self.flush(update=False)
+            return
+
+        delay = 0.0 if len(self.queue) >= self.batch_size else self.flush_interval
+        with self._flush_lock:
+            if self._flush_delay is not None and self._flush_delay <= delay:
+                return
+            self._flush_delay = delay
+        # The logs are only modified from the loop that executes the action
+        event_loop.call_in_command_loop(self._schedule_flush, delay)
+
+    def _schedule_flush(self, delay: float) -> None:
+        if delay <= 0:
+            self.flush()
+            return
+        asyncio.get_event_loop().call_later(delay, self.flush)
+
+    def flush(self, update=True) -> None:
+        """
+        Append the pending records to the action logs, and send them in one update
+        """
+        with self._flush_lock:
+            self._flush_delay = None
+
+        logs = []
+        with contextlib.suppress(IndexError):
+            while True:
+                logs.append(self.queue.popleft())
+        if not logs:
+            return
+
+        for log in logs:
+            self.silex_command.logs.append(log)
         self.silex_command.outdated_cache = True
-        self.action_query.update_websocket()
+        if update:
+            self.action_query.update_websocket()
 
 
 class RedirectWebsocketLogs(object):
@@ -66,6 +134,8 @@ class RedirectWebsocketLogs(object):
             )
             self.silex_command.status = Status.ERROR
             self.silex_command.hide = False
+            # The pending logs are sent with the traceback
+            self.handler.flush(update=False)
 
             traceback.print_tb(exc_traceback)
             exception = traceback.format_exception(exc_type, exc_value, exc_traceback)
@@ -76,4 +146,5 @@ class RedirectWebsocketLogs(object):
             await self.action_query.async_update_websocket()
 
         self.logger.handlers.remove(self.handler)
+        self.handler.flush()
         return True
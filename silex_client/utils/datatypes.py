@@ -8,12 +8,23 @@ to add specific behaviour
 from __future__ import annotations
 
 import copy
-from typing import TYPE_CHECKING, Any
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List
 
 # Forward references
 if TYPE_CHECKING:
     from silex_client.action.action_query import ActionQuery
 
+#: Amount of log entries kept per command, the value can be overriden
+#: with the environment variable SILEX_LOG_BUFFER_SIZE
+LOG_BUFFER_SIZE = 1000
+
+
+def get_log_buffer_size() -> int:
+    log_buffer_size = os.getenv("SILEX_LOG_BUFFER_SIZE", str(LOG_BUFFER_SIZE))
+    return int(log_buffer_size) if log_buffer_size.isdigit() else LOG_BUFFER_SIZE
+
 
 class ReadOnlyError(Exception):
     """
@@ -47,6 +58,53 @@ class ReadOnlyDict(dict):
     update = __readonly__
 
 
+class CommandLogs(list):
+    """
+    Append only list of log entries, bounded to the last entries. Each entry is numbered,
+    the cursor is the number of the next entry, so the entries added since a previous
+    cursor can be sent alone
+    """
+
+    def __init__(self, entries: Iterable[Dict[str, Any]] = (), start: int = 0):
+        super().__init__(entries)
+        self.start = start
+        self.max_size = get_log_buffer_size()
+        self._lock = threading.Lock()
+
+    @property
+    def cursor(self) -> int:
+        return self.start + len(self)
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        # The loggers of the commands are also used from the threads
+        with self._lock:
+            entry["index"] = self.cursor
+            super().append(entry)
+            overflow = len(self) - self.max_size
+            if self.max_size and overflow > 0:
+                del self[:overflow]
+                self.start += overflow
+
+    def since(self, cursor: int) -> List[Dict[str, Any]]:
+        """
+        Get the entries added since the given cursor, that are still kept
+        """
+        with self._lock:
+            return list(self[max(cursor - self.start, 0) :])
+
+    def __copy__(self) -> CommandLogs:
+        with self._lock:
+            return type(self)(self, self.start)
+
+    def __deepcopy__(self, memo) -> CommandLogs:
+        with self._lock:
+            entries = list(self)
+        return type(self)(copy.deepcopy(entries, memo), self.start)
+
+    def __reduce__(self):
+        return type(self), (list(self), self.start)
+
+
 class SharedVariable:
     """
     Simple container for a variable to share the value between threads without any
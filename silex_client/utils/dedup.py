@@ -0,0 +1,262 @@
+"""
+@author: TD gang
+
+Content addressed store of the conformed files. The same textures and HDRIs are often
+conformed into many tasks, the store keeps one copy of each content, keyed by its hash,
+and the conformed files are materialized as reflinks or hardlinks to that copy.
+
+The contents of the store are read-only. A hardlinked file shares its inode with the store
+and with the files of the other tasks, so it is read-only too: it must be replaced,
+never modified in place
+"""
+
+import contextlib
+import os
+import pathlib
+import stat
+import threading
+import time
+import uuid
+from typing import ContextManager, Optional, Tuple, Union
+
+from silex_client.utils.datatypes import SharedVariable
+from silex_client.utils.log import logger
+from silex_client.utils.transfer import (
+    copy_file,
+    copy_file_hashed,
+    copy_file_reflink,
+    hash_file,
+)
+
+#: Name of the store directory, created at the root of the project
+STORE_NAME = ".silex_store"
+#: Amount of seconds an unused content is kept in the store, the value can be overriden
+#: with the environment variable SILEX_STORE_RETENTION
+STORE_RETENTION = 7 * 24 * 60 * 60
+#: Minimum amount of seconds between two automatic garbage collections
+GC_INTERVAL = 24 * 60 * 60
+
+PathLike = Union[str, pathlib.Path]
+
+
+def get_store_retention() -> int:
+    store_retention = os.getenv("SILEX_STORE_RETENTION", str(STORE_RETENTION))
+    return int(store_retention) if store_retention.isdigit() else STORE_RETENTION
+
+
+def _make_read_only(path: PathLike) -> None:
+    mode = stat.S_IMODE(os.stat(path).st_mode)
+    os.chmod(path, mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+
+
+def _remove_read_only(path: PathLike) -> None:
+    try:
+        os.remove(path)
+    except PermissionError:
+        # Windows does not remove the read-only files
+        os.chmod(path, stat.S_IWRITE)
+        os.remove(path)
+
+
+def find_project_store(path: PathLike, project: str) -> Optional[pathlib.Path]:
+    """
+    Get the store of the project the given path belongs to,
+    the store is next to the first parent named like the project
+    """
+    store_path = os.getenv("SILEX_DEDUP_STORE")
+    if store_path:
+        return pathlib.Path(store_path)
+
+    for parent in pathlib.Path(path).parents:
+        if project and parent.name.lower() == project.lower():
+            return parent / STORE_NAME
+    return None
+
+
+class ContentStore:
+    """
+    Store of file contents keyed by their hash. The contents are materialized as reflinks
+    when the filesystem supports it, as hardlinks otherwise, and copied as a last resort.
+    The contents are read-only, and so are the hardlinked files.
+    A content is unused when no hardlink points to it anymore, it is then garbage collected
+    """
+
+    def __init__(self, root: PathLike):
+        self.root = pathlib.Path(root)
+        self.hits = 0
+        self.misses = 0
+        self.saved_bytes = 0
+        self._lock = threading.Lock()
+
+    def get_object_path(self, key: str) -> pathlib.Path:
+        return self.root / "objects" / key[:2] / key[2:]
+
+    def _get_temp_path(self) -> pathlib.Path:
+        return self.root / "tmp" / uuid.uuid4().hex
+
+    def _store_temp(self, temp_path: pathlib.Path, key: str) -> pathlib.Path:
+        """
+        Move a temporary file of the store to the object of its content, read-only
+        """
+        object_path = self.get_object_path(key)
+        _make_read_only(temp_path)
+        os.makedirs(object_path.parent, exist_ok=True)
+        # Another process might have added the same content meanwhile
+        os.replace(temp_path, object_path)
+        return object_path
+
+    def _copy(
+        self,
+        src: PathLike,
+        progress: SharedVariable,
+        progress_lock: Optional[threading.Lock] = None,
+    ) -> str:
+        """
+        Copy the given file into the store, returns the key of its content
+        """
+        temp_path = self._get_temp_path()
+        os.makedirs(temp_path.parent, exist_ok=True)
+        try:
+            key = copy_file_hashed(src, temp_path, progress, progress_lock)
+            self._store_temp(temp_path, key)
+        finally:
+            if os.path.lexists(temp_path):
+                _remove_read_only(temp_path)
+        return key
+
+    def materialize(self, key: str, dst: PathLike) -> str:
+        """
+        Create the given file from the content in the store.
+        Returns the method used: reflink, hardlink or copy
+        """
+        object_path = self.get_object_path(key)
+        dst = pathlib.Path(dst)
+        temp_path = dst.with_name(f".{dst.name}.{uuid.uuid4().hex[:8]}.tmp")
+
+        try:
+            with open(object_path, "rb") as fsrc, open(temp_path, "wb") as fdst:
+                method = "reflink" if copy_file_reflink(fsrc, fdst) else ""
+            if not method:
+                os.remove(temp_path)
+                try:
+                    os.link(object_path, temp_path)
+                    method = "hardlink"
+                except OSError:
+                    copy_file(object_path, temp_path, SharedVariable(0))
+                    # The copy is not shared, it does not need to be read-only
+                    os.chmod(
+                        temp_path,
+                        stat.S_IMODE(os.stat(temp_path).st_mode) | stat.S_IWUSR,
+                    )
+                    method = "copy"
+            os.replace(temp_path, dst)
+        finally:
+            if os.path.lexists(temp_path):
+                _remove_read_only(temp_path)
+
+        # The store is not referenced by the reflinks and the copies, keep track
+        # of the last use. The hardlinks share the modification time, it must not change
+        if method != "hardlink":
+            with contextlib.suppress(OSError):
+                os.utime(object_path)
+        return method
+
+    def publish(
+        self,
+        src: PathLike,
+        dst: PathLike,
+        progress: SharedVariable,
+        progress_lock: Optional[threading.Lock] = None,
+    ) -> Tuple[str, bool]:
+        """
+        Publish the source to the destination through the store. The source is hashed first,
+        and only copied into the store if its content is not stored yet.
+        Returns the method used to materialize the file, and if the content was already stored
+        """
+        size = os.path.getsize(src)
+        key = hash_file(src)
+        hit = os.path.exists(self.get_object_path(key))
+        if not hit:
+            # The source might have changed since it was hashed, the key of the copy is used
+            key = self._copy(src, progress, progress_lock)
+
+        try:
+            method = self.materialize(key, dst)
+        except FileNotFoundError:
+            # The garbage collector might have deleted the content meanwhile,
+            # the source is stored again
+            if not hit:
+                raise
+            key = self._copy(src, progress, progress_lock)
+            hit = False
+            method = self.materialize(key, dst)
+
+        if hit:
+            # Nothing was copied, the whole file is done at once
+            lock: ContextManager = (
+                progress_lock if progress_lock is not None else contextlib.nullcontext()
+            )
+            with lock:
+                progress.value += size
+
+        with self._lock:
+            if hit:
+                self.hits += 1
+                self.saved_bytes += size
+            else:
+                self.misses += 1
+        return method, hit
+
+    def collect_garbage(self, retention: Optional[int] = None) -> Tuple[int, int]:
+        """
+        Delete the contents that are not hardlinked anymore and not used for longer
+        than the retention. The reflinked files do not need the store, their content
+        is kept by the filesystem. Returns the amount of files and bytes deleted
+        """
+        retention = get_store_retention() if retention is None else retention
+        limit = time.time() - retention
+        removed_files, removed_bytes = 0, 0
+
+        for root, _, files in os.walk(self.root / "objects"):
+            for name in files:
+                object_path = os.path.join(root, name)
+                try:
+                    object_stat = os.stat(object_path)
+                    if object_stat.st_nlink > 1 or object_stat.st_mtime > limit:
+                        continue
+                    _remove_read_only(object_path)
+                except OSError as exception:
+                    logger.warning("Could not collect %s: %s", object_path, exception)
+                    continue
+                removed_files += 1
+                removed_bytes += object_stat.st_size
+
+        # The temporary files of the crashed copies
+        with contextlib.suppress(OSError), os.scandir(self.root / "tmp") as entries:
+            for entry in entries:
+                if entry.stat().st_mtime < limit:
+                    _remove_read_only(entry.path)
+        return removed_files, removed_bytes
+
+    def collect_garbage_if_due(self, interval: int = GC_INTERVAL) -> None:
+        """
+        Collect the garbage if the last collection is older than the interval.
+        Meant to be executed in the background, the errors are only logged
+        """
+        marker_path = self.root / ".last_gc"
+        with contextlib.suppress(OSError):
+            if time.time() - os.stat(marker_path).st_mtime < interval:
+                return
+
+        try:
+            marker_path.touch()
+            removed_files, removed_bytes = self.collect_garbage()
+        except OSError as exception:
+            logger.warning("Could not collect the store %s: %s", self.root, exception)
+            return
+        logger.info(
+            "Collected %s files (%s bytes) from the store %s",
+            removed_files,
+            removed_bytes,
+            self.root,
+        )
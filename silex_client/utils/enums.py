@@ -40,6 +40,8 @@ class ConflictBehaviour(IntEnum):
     KEEP_EXISTING = 2
     ALWAYS_KEEP_EXISTING = 3
     RENAME = 4
+    #: Skip the identical files, override the others
+    SYNC = 5
 
 
 class NotFoundBehaviour(IntEnum):
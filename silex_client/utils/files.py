@@ -16,6 +16,12 @@ from silex_client.utils.constants import ENV_VARIABLE_FORMAT
 
 import fileseq
 from silex_client.core.context import Context
+from silex_client.utils.scan import stat_paths
+from silex_client.utils.sequence_index import SequenceIndex
+from silex_client.utils.parsing import (  # pylint: disable=unused-import
+    expand_template_to_sequence,
+    match_path_templates,
+)
 
 # Sadly, Python fails to provide the following magic number for us.
 ERROR_INVALID_NAME = 123
@@ -73,27 +79,8 @@ def expand_path(file_path: pathlib.Path, mode: str = "output") -> Dict[str, str]
              'Version': '000',
              'template': 'shot'}
     """
-    path_variable = {}
     mode_templates = Context.get()["project_file_tree"].get(mode, {})
-    template_var = re.compile(r"<(\w+)>")
-    # The path can be a path of asset, shot, sequence...
-    for template_name, path_template in mode_templates.get("folder_path", {}).items():
-        path_template = re.escape(str(pathlib.Path(path_template)))
-        regex = template_var.sub(r"([0-9a-zA-Z_]+)", path_template)
-        file_match = re.search(regex, str(file_path))
-        if file_match is None:
-            continue
-
-        # Find the relations between the template and the given path
-        path_variable["template"] = template_name
-        for index, match in enumerate(template_var.finditer(path_template)):
-            if not match.groups():
-                continue
-
-            path_variable[match.groups()[0]] = file_match.group(index + 1)
-        return path_variable
-
-    return path_variable
+    return match_path_templates(file_path, mode_templates.get("folder_path", {}))
 
 
 def is_valid_path(pathname: str) -> bool:
@@ -173,10 +160,10 @@ def find_sequence_from_path(file_path: pathlib.Path) -> fileseq.FileSequence:
 
     # We don't take the index in consideration
     _, basename, _, ext = match.groups()
-    for file_sequence in fileseq.findSequencesOnDisk(str(file_path.parent)):
-        # Find the file sequence that correspond the to file we are looking for
-        if basename == file_sequence.basename() and ext == file_sequence.extension():
-            return file_sequence
+    # The sequences of the directory are only listed once for all its files
+    file_sequence = SequenceIndex.get().find_sequence(file_path, basename, ext)
+    if file_sequence is not None:
+        return file_sequence
 
     return default_sequence
 
@@ -210,42 +197,10 @@ def format_sequence_string(
     return pathlib.Path(str(sequence.index(0))).as_posix()
 
 
-def expand_template_to_sequence(
-    path_template: pathlib.Path, regexes: List[re.Pattern]
-) -> fileseq.FileSequence:
-    """
-    Find the sequence related to the template path given. Used to find sequences of
-    path like /foo/bar.<UDIM>.png.
-
-    Each regex in the list must contain a single capturing group that will capture the expression
-    """
-    if not os.path.exists(path_template.parent):
-        return fileseq.FileSequence(path_template)
-
-    file_matches = []
-    for regex in regexes:
-        match = regex.match(str(path_template))
-
-        if match is None:
-            continue
-
-        template_format = re.escape(
-            str(path_template).replace(match.group(1), r"__INDEX__")
-        )
-        regex_format = re.compile(template_format.replace("__INDEX__", r"\d+"))
-        for child in path_template.parent.iterdir():
-            if regex_format.search(str(child)):
-                file_matches.append(child)
-
-        match_sequence = fileseq.findSequencesInList(file_matches)
-        if match_sequence:
-            return match_sequence[0]
-
-    return fileseq.FileSequence(path_template)
-
-
 def sequence_exists(sequence: fileseq.FileSequence) -> bool:
     """
     Test if every files in the given sequence exists
     """
-    return all(pathlib.Path(str(path)).exists() for path in sequence)
+    # The files of a sequence are in the same directory, a single listing is enough
+    file_stats = stat_paths([str(path) for path in sequence], with_stat=False)
+    return all(file_stat.exists for file_stat in file_stats.values())
@@ -0,0 +1,127 @@
+"""
+@author: TD gang
+
+Per directory manifests of the files copied with verification.
+Each manifest stores the hash of the files, and the state of the source they were copied from,
+so the next actions can tell if a file needs to be copied again without reading it
+"""
+
+import contextlib
+import json
+import os
+import pathlib
+import threading
+import uuid
+from typing import Any, Dict, Optional, Union
+
+from silex_client.utils.log import logger
+
+#: Name of the manifest file, stored in the directory of the files it describes
+MANIFEST_NAME = ".silex_manifest.json"
+MANIFEST_VERSION = 1
+
+PathLike = Union[str, pathlib.Path]
+
+#: Locks of the manifests being updated, by manifest path
+_manifest_locks: Dict[str, threading.Lock] = {}
+_manifest_locks_lock = threading.Lock()
+
+
+def get_manifest_path(directory: PathLike) -> pathlib.Path:
+    return pathlib.Path(directory) / MANIFEST_NAME
+
+
+def get_manifest_lock(directory: PathLike) -> threading.Lock:
+    """
+    Get the lock that serializes the updates of the manifest of the given directory
+    """
+    manifest_path = os.path.normcase(os.path.abspath(get_manifest_path(directory)))
+    with _manifest_locks_lock:
+        return _manifest_locks.setdefault(manifest_path, threading.Lock())
+
+
+def read_manifest(directory: PathLike) -> Dict[str, Dict[str, Any]]:
+    """
+    Get the entries of the manifest of the given directory, by file name.
+    Returns an empty dict if the manifest does not exists or is invalid
+    """
+    manifest_path = get_manifest_path(directory)
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as exception:
+        logger.warning("Could not read the manifest %s: %s", manifest_path, exception)
+        return {}
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest.get("files", {})
+
+
+def update_manifest(directory: PathLike, entries: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Add or replace the given entries in the manifest of the given directory.
+    The manifest is written in a temporary file first, so a reader never gets a partial file.
+    The updates of a manifest are serialized within the process, so no entries are lost
+    """
+    manifest_path = get_manifest_path(directory)
+    with get_manifest_lock(directory):
+        files = read_manifest(directory)
+        files.update(entries)
+
+        temp_path = manifest_path.with_name(f"{MANIFEST_NAME}.{uuid.uuid4()}.tmp")
+        try:
+            with open(temp_path, "w", encoding="utf-8") as manifest_file:
+                json.dump({"version": MANIFEST_VERSION, "files": files}, manifest_file)
+            os.replace(temp_path, manifest_path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(temp_path)
+            raise
+
+
+def create_manifest_entry(
+    src: PathLike,
+    dst: PathLike,
+    file_hash: Optional[str] = None,
+    algorithm: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Describe a copied file, with the state of its source at the time of the copy.
+    The hash is optional, the copies that are not verified are not hashed
+    """
+    src_stat, dst_stat = os.stat(src), os.stat(dst)
+    return {
+        "hash": file_hash,
+        "algorithm": algorithm,
+        "size": dst_stat.st_size,
+        "mtime": dst_stat.st_mtime_ns,
+        "source": str(src),
+        "source_size": src_stat.st_size,
+        "source_mtime": src_stat.st_mtime_ns,
+    }
+
+
+def is_entry_current(
+    entry: Optional[Dict[str, Any]], src: PathLike, dst: PathLike
+) -> bool:
+    """
+    Test if the destination is still the copy of the source described by the entry:
+    the source and the destination have not been modified since the copy
+    """
+    if entry is None:
+        return False
+
+    try:
+        src_stat, dst_stat = os.stat(src), os.stat(dst)
+    except OSError:
+        return False
+
+    return (
+        entry.get("source_size") == src_stat.st_size
+        and entry.get("source_mtime") == src_stat.st_mtime_ns
+        and entry.get("size") == dst_stat.st_size
+        and entry.get("mtime") == dst_stat.st_mtime_ns
+    )
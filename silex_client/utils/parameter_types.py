@@ -4,6 +4,7 @@ import pathlib
 from typing import Dict, List, Optional, Type, Union
 
 from silex_client.utils.log import logger
+from silex_client.utils.path_sequence import PathSequence
 
 
 class CommandParameterMeta(type):
@@ -33,7 +34,9 @@ class ListParameter(list):
         )
         data = value
 
-        if not isinstance(value, list):
+        if isinstance(value, PathSequence):
+            data = list(value)
+        elif not isinstance(value, list):
             data = [value]
         self.extend(data)
 
@@ -172,6 +175,8 @@ def TaskFileParameterMeta(
     directory: bool = False,
 ):
     def __init__(self, value):
+        if isinstance(value, PathSequence):
+            value = list(value)
         if not isinstance(value, list):
             value = [value]
 
@@ -211,6 +216,8 @@ def PathParameterMeta(extensions: List[str] = ["*"], multiple: bool = False):
         extensions = ["*"]
 
     def __init__(self, value):
+        if isinstance(value, PathSequence):
+            value = list(value)
         if not isinstance(value, list):
             value = [value]
 
@@ -242,8 +249,35 @@ def PathParameterMeta(extensions: List[str] = ["*"], multiple: bool = False):
     return CommandParameterMeta("PathParameter", (type(pathlib.Path()),), attributes)
 
 
+# Multiple paths stored as file sequences, the paths are only built when iterated.
+# Displayed like a PathParameterMeta with multiple=True
+def PathSequenceParameterMeta(extensions: Optional[List[str]] = None):
+    if extensions is None:
+        extensions = ["*"]
+
+    def serialize():
+        return {
+            "name": "Path",
+            "extensions": extensions,
+            "multiple": True,
+        }
+
+    def get_default():
+        return None
+
+    attributes = {
+        "serialize": serialize,
+        "get_default": get_default,
+        "rebuild": PathSequenceParameterMeta,
+    }
+
+    return CommandParameterMeta("PathSequenceParameter", (PathSequence,), attributes)
+
+
 def ListParameterMeta(parameter_type: Type):
     def __init__(self, value):
+        if isinstance(value, PathSequence):
+            value = list(value)
         if not isinstance(value, list):
             value = [value]
 
@@ -277,6 +311,8 @@ def ListParameterMeta(parameter_type: Type):
 
 def EditableListParameterMeta(parameter_type: Type):
     def __init__(self, value):
+        if isinstance(value, PathSequence):
+            value = list(value)
         if not isinstance(value, list):
             value = [value]
 
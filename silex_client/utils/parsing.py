@@ -0,0 +1,97 @@
+"""
+@author: TD gang
+
+Pure parsing helpers for paths and file sequences
+
+These functions don't depend on the silex context and only take and return
+picklable values, so they can be offloaded to the process pool with
+EventLoop.run_in_process
+"""
+
+import pathlib
+import re
+from typing import Dict, List, Union
+
+import fileseq
+
+from silex_client.utils.path_sequence import PathSequence
+from silex_client.utils.sequence_index import SequenceIndex
+
+PathLike = Union[str, pathlib.Path]
+
+
+def find_sequences_in_list(
+    file_paths: Union[List[PathLike], PathSequence],
+) -> List[fileseq.FileSequence]:
+    """
+    Group the given paths into file sequences, the PathSequence already know theirs
+    """
+    if isinstance(file_paths, PathSequence):
+        return file_paths.sequences()
+    return fileseq.findSequencesInList([str(file_path) for file_path in file_paths])
+
+
+def match_path_templates(
+    file_path: PathLike, folder_templates: Dict[str, str]
+) -> Dict[str, str]:
+    """
+    Convert a path into a dict of variables, by finding the first template
+    of the file tree that matches it
+    """
+    path_variable = {}
+    template_var = re.compile(r"<(\w+)>")
+    # The path can be a path of asset, shot, sequence...
+    for template_name, path_template in folder_templates.items():
+        path_template = re.escape(str(pathlib.Path(path_template)))
+        regex = template_var.sub(r"([0-9a-zA-Z_]+)", path_template)
+        file_match = re.search(regex, str(file_path))
+        if file_match is None:
+            continue
+
+        # Find the relations between the template and the given path
+        path_variable["template"] = template_name
+        for index, match in enumerate(template_var.finditer(path_template)):
+            if not match.groups():
+                continue
+
+            path_variable[match.groups()[0]] = file_match.group(index + 1)
+        return path_variable
+
+    return path_variable
+
+
+def expand_template_to_sequence(
+    path_template: pathlib.Path, regexes: List[re.Pattern]
+) -> fileseq.FileSequence:
+    """
+    Find the sequence related to the template path given. Used to find sequences of
+    path like /foo/bar.<UDIM>.png.
+
+    Each regex in the list must contain a single capturing group that will capture the expression
+    """
+    # The directory is only listed once, and again when it is modified
+    entries = SequenceIndex.get().get_entries(path_template.parent)
+    if not entries:
+        return fileseq.FileSequence(path_template)
+
+    file_matches = []
+    for regex in regexes:
+        match = regex.match(str(path_template))
+
+        if match is None:
+            continue
+
+        template_format = re.escape(
+            str(path_template).replace(match.group(1), r"__INDEX__")
+        )
+        regex_format = re.compile(template_format.replace("__INDEX__", r"\d+"))
+        for name in entries:
+            child = path_template.parent / name
+            if regex_format.search(str(child)):
+                file_matches.append(child)
+
+        match_sequence = fileseq.findSequencesInList(file_matches)
+        if match_sequence:
+            return match_sequence[0]
+
+    return fileseq.FileSequence(path_template)
@@ -0,0 +1,177 @@
+"""
+@author: TD gang
+
+Lazy list of paths, stored as file sequences. The conforms and the publishes of long
+frame ranges pass the same paths from command to command, a list of paths costs a string
+and a Path per frame, and each command had to find the sequences in it again.
+A PathSequence only stores a record per sequence, the paths are built when iterated
+"""
+
+import bisect
+import itertools
+import os
+import pathlib
+from collections.abc import Sequence
+from typing import Any, Iterable, Iterator, List, Optional, Tuple, Union
+
+import fileseq
+
+from silex_client.utils.scan import SEQUENCE_NAME_RE, SequenceRecord
+
+PathLike = Union[str, pathlib.Path]
+
+
+def _get_padding_range(frame: str) -> Tuple[int, int]:
+    """
+    Get the paddings that format the given frame back to the same string
+    """
+    digits = frame.lstrip("-")
+    if len(digits) > 1 and digits.startswith("0"):
+        return len(frame), len(frame)
+    return 1, len(frame)
+
+
+def group_paths(paths: Iterable[PathLike]) -> List[SequenceRecord]:
+    """
+    Group the given paths into sequence records, keeping their order: a record only
+    contains consecutive paths of the same sequence, with increasing frames.
+    Unlike fileseq.findSequencesInList, the paths of the records are the given paths,
+    in the same order
+    """
+    return group_names(os.path.split(str(path)) for path in paths)
+
+
+def group_names(names: Iterable[Tuple[str, str]]) -> List[SequenceRecord]:
+    """
+    Same as group_paths, with the paths already split into a directory and a name
+    """
+    records: List[SequenceRecord] = []
+    # The sequence being grouped: its name, its frames and the paddings that fit all of them
+    run_key: Optional[Tuple[str, str, str]] = None
+    run_frames: List[int] = []
+    run_padding = (1, 0)
+
+    def flush_run():
+        if run_key is not None and run_frames:
+            directory, basename, extension = run_key
+            frame_set = fileseq.FrameSet.from_iterable(run_frames, sort=True)
+            # Like fileseq and the scans, the unpadded frames are padded
+            # to the width of their smallest frame
+            records.append(
+                SequenceRecord(
+                    directory, basename, run_padding[1], extension, frame_set
+                )
+            )
+
+    for directory, name in names:
+        match = SEQUENCE_NAME_RE.match(name)
+        frame = match.group("frame") if match is not None else None
+        if match is None or frame is None:
+            flush_run()
+            run_key, run_frames = None, []
+            basename, extension = (
+                (name, "") if match is None else match.group("basename", "extension")
+            )
+            records.append(SequenceRecord(directory, basename, 0, extension, None))
+            continue
+
+        key = (directory, match.group("basename"), match.group("extension"))
+        padding = _get_padding_range(frame)
+        padding = (max(padding[0], run_padding[0]), min(padding[1], run_padding[1]))
+        if key == run_key and int(frame) > run_frames[-1] and padding[0] <= padding[1]:
+            run_frames.append(int(frame))
+            run_padding = padding
+            continue
+
+        flush_run()
+        run_key, run_frames = key, [int(frame)]
+        run_padding = _get_padding_range(frame)
+
+    flush_run()
+    return records
+
+
+def _record_from_sequence(sequence: fileseq.FileSequence) -> SequenceRecord:
+    frame_set = sequence.frameSet()
+    return SequenceRecord(
+        str(sequence.dirname()),
+        str(sequence.basename()),
+        sequence.zfill() if frame_set is not None else 0,
+        str(sequence.extension()),
+        frame_set,
+    )
+
+
+class PathSequence:
+    """
+    Immutable list of paths stored as sequence records. It can be built from a list of paths,
+    a fileseq.FileSequence, a single path or an other PathSequence.
+    Iterating or indexing it returns pathlib.Path, like the lists of paths it replaces
+    """
+
+    def __init__(self, value: Any = ()):
+        if isinstance(value, PathSequence):
+            records = list(value.records)
+        elif isinstance(value, fileseq.FileSequence):
+            records = [_record_from_sequence(value)]
+        elif isinstance(value, SequenceRecord):
+            records = [value]
+        elif isinstance(value, (str, os.PathLike)):
+            records = group_paths([pathlib.Path(value)])
+        else:
+            records = group_paths(pathlib.Path(path) for path in value)
+
+        self.records: Tuple[SequenceRecord, ...] = tuple(records)
+        # Index of the first path of each record, to find the record of an index
+        self._offsets = [0, *itertools.accumulate(len(record) for record in records)]
+
+    def __len__(self) -> int:
+        return self._offsets[-1]
+
+    def __iter__(self) -> Iterator[pathlib.Path]:
+        for record in self.records:
+            yield from record.paths()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[item] for item in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("PathSequence index out of range")
+
+        record_index = bisect.bisect_right(self._offsets, index) - 1
+        record = self.records[record_index]
+        if record.frame_set is None:
+            return next(record.paths())
+        return record.path(record.frame_set[index - self._offsets[record_index]])
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, PathSequence):
+            return list(self) == list(other)
+        if isinstance(other, (list, tuple)):
+            return len(self) == len(other) and all(
+                path == pathlib.Path(other_path)
+                for path, other_path in zip(self, other)
+            )
+        return NotImplemented
+
+    __hash__ = None  # type: ignore
+
+    def __str__(self) -> str:
+        return ", ".join(str(sequence) for sequence in self.sequences())
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({str(self)!r})"
+
+    def sequences(self) -> List[fileseq.FileSequence]:
+        """
+        Get the file sequences of the paths, without detecting them again
+        """
+        return [record.to_file_sequence() for record in self.records]
+
+
+# The parameter types are built with their own metaclass, PathSequence can't inherit
+# from the abstract class, it is only registered as a sequence
+Sequence.register(PathSequence)
@@ -16,11 +16,25 @@ from silex_client.utils.parameter_types import (
 
 
 async def prompt_override(
-    command: CommandBase, file_path: pathlib.Path, action_query: ActionQuery
+    command: CommandBase,
+    file_path: pathlib.Path,
+    action_query: ActionQuery,
+    sync: bool = False,
 ) -> ConflictBehaviour:
     """
-    Helper to prompt the user for cases when we must override a file and wait for its response
+    Helper to prompt the user for cases when we must override a file and wait for its response.
+    With sync, the user can also choose to skip the identical files, only the commands that
+    handle ConflictBehaviour.SYNC should offer it
     """
+    behaviours = {
+        "Override": 0,
+        "Keep existing": 2,
+        "Always override": 1,
+        "Always keep existing": 3,
+    }
+    if sync:
+        behaviours["Always skip identical files"] = 5
+
     # Create a new parameter to prompt for the new file path
     info_parameter = ParameterBuffer(
         type=TextParameterMeta("info"),
@@ -29,14 +43,7 @@ async def prompt_override(
         value=f"The path:\n{file_path}\nAlready exists",
     )
     new_parameter = ParameterBuffer(
-        type=RadioSelectParameterMeta(
-            **{
-                "Override": 0,
-                "Keep existing": 2,
-                "Always override": 1,
-                "Always keep existing": 3,
-            }
-        ),
+        type=RadioSelectParameterMeta(**behaviours),
         name="conflict_behaviour",
         label="Conflict behaviour",
     )
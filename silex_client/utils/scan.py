@@ -0,0 +1,376 @@
+"""
+@author: TD gang
+
+Helpers to get the metadata of many files at once. On network shares every stat
+is a round trip to the server, listing the directory once with os.scandir is much
+cheaper than testing each file separately.
+
+The sequences of large directories can also be found as the directory is listed,
+without building the list of all their paths
+"""
+
+import os
+import pathlib
+import re
+import stat
+import sys
+from collections import defaultdict
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+import fileseq
+
+PathLike = Union[str, pathlib.Path]
+
+#: Under this amount of files in a directory, the files are tested separately,
+#: listing a large directory for a few files would be slower
+SCANDIR_MIN_ENTRIES = 4
+
+
+class FileStat(NamedTuple):
+    """
+    Metadata of a file, the size and the modification time are only set if requested
+    """
+
+    exists: bool
+    is_dir: bool = False
+    size: int = 0
+    mtime: float = 0.0
+
+
+MISSING = FileStat(exists=False)
+
+
+def _stat_path(path: pathlib.Path, with_stat: bool) -> FileStat:
+    try:
+        file_stat = os.stat(path)
+    except (OSError, ValueError):
+        return MISSING
+
+    is_dir = stat.S_ISDIR(file_stat.st_mode)
+    if not with_stat:
+        return FileStat(exists=True, is_dir=is_dir)
+    return FileStat(True, is_dir, file_stat.st_size, file_stat.st_mtime)
+
+
+def _stat_entry(entry: os.DirEntry, with_stat: bool) -> FileStat:
+    try:
+        # The type of the entry is given by the listing on most platforms
+        is_dir = entry.is_dir()
+        if not with_stat:
+            # A broken symlink does not exist for os.path.exists
+            if entry.is_symlink() and not os.path.exists(entry.path):
+                return MISSING
+            return FileStat(exists=True, is_dir=is_dir)
+        # The stat is also given by the listing on windows
+        file_stat = entry.stat()
+    except OSError:
+        return MISSING
+
+    return FileStat(True, is_dir, file_stat.st_size, file_stat.st_mtime)
+
+
+def stat_paths(
+    paths: Iterable[PathLike], with_stat: bool = True
+) -> Dict[pathlib.Path, FileStat]:
+    """
+    Get the metadata of all the given paths, with one listing per directory.
+    The result is a dict of FileStat by path, the missing files are set to MISSING.
+    Use with_stat=False when only the existence and the type are needed,
+    it avoids a stat per file on linux
+    """
+    paths_by_directory: Dict[pathlib.Path, List[pathlib.Path]] = defaultdict(list)
+    for path in paths:
+        path = pathlib.Path(path)
+        paths_by_directory[path.parent].append(path)
+
+    file_stats: Dict[pathlib.Path, FileStat] = {}
+    for directory, directory_paths in paths_by_directory.items():
+        if len(directory_paths) < SCANDIR_MIN_ENTRIES:
+            for path in directory_paths:
+                file_stats[path] = _stat_path(path, with_stat)
+            continue
+
+        try:
+            with os.scandir(directory) as directory_entries:
+                entries = {
+                    os.path.normcase(entry.name): entry for entry in directory_entries
+                }
+        except (FileNotFoundError, NotADirectoryError):
+            file_stats.update({path: MISSING for path in directory_paths})
+            continue
+        except OSError:
+            # The directory can't be listed but its files might still be readable
+            for path in directory_paths:
+                file_stats[path] = _stat_path(path, with_stat)
+            continue
+
+        folded_names: Optional[Set[str]] = None
+        for path in directory_paths:
+            # The special names like .. are not listed
+            if path.name in ("", ".", ".."):
+                file_stats[path] = _stat_path(path, with_stat)
+                continue
+
+            entry = entries.get(os.path.normcase(path.name))
+            if entry is None and sys.platform == "darwin":
+                # The volumes of macOS are usually case insensitive but normcase
+                # does not fold the case there, only the file system can tell
+                if folded_names is None:
+                    folded_names = {name.lower() for name in entries}
+                if path.name.lower() in folded_names:
+                    file_stats[path] = _stat_path(path, with_stat)
+                    continue
+            file_stats[path] = (
+                MISSING if entry is None else _stat_entry(entry, with_stat)
+            )
+
+    return file_stats
+
+
+#: Amount of directory entries scanned between two yields of scan_sequences
+SCAN_CHUNK_SIZE = 10000
+#: Same split as fileseq: basename, frame and extension of a file name
+SEQUENCE_NAME_RE = re.compile(
+    r"""
+    \A
+    (?P<basename>.*?)
+    (?P<frame>-?\d+)?
+    (?P<extension>(?:\.\w*[a-zA-Z]\w?)*(?:\.[^.]+)?)
+    \Z
+    """,
+    re.VERBOSE,
+)
+
+
+class SequenceRecord(NamedTuple):
+    """
+    Compact description of a file sequence, the frames are stored as a FrameSet
+    instead of a list of paths. The frame set is None for the files without frame
+    """
+
+    directory: str
+    basename: str
+    padding: int
+    extension: str
+    frame_set: Optional[fileseq.FrameSet]
+
+    def __len__(self) -> int:
+        return len(self.frame_set) if self.frame_set is not None else 1
+
+    def paths(self) -> Iterator[pathlib.Path]:
+        """
+        Expand the sequence into paths, lazily
+        """
+        if self.frame_set is None:
+            yield pathlib.Path(self.directory, self.basename + self.extension)
+            return
+
+        for frame in self.frame_set:
+            yield self.path(frame)
+
+    def path(self, frame: int) -> pathlib.Path:
+        """
+        Get the path of the given frame of the sequence
+        """
+        # Like fileseq, the sign is part of the padding
+        return pathlib.Path(
+            self.directory,
+            f"{self.basename}{frame:0{self.padding}d}{self.extension}",
+        )
+
+    def to_file_sequence(self) -> fileseq.FileSequence:
+        if self.frame_set is None:
+            return fileseq.FileSequence(
+                os.path.join(self.directory, self.basename + self.extension)
+            )
+
+        padding = fileseq.getPaddingChars(self.padding)
+        return fileseq.FileSequence(
+            os.path.join(
+                self.directory,
+                f"{self.basename}{self.frame_set}{padding}{self.extension}",
+            )
+        )
+
+
+class _SequenceGroup:
+    """
+    Frames of a basename and an extension found so far, by padding
+    """
+
+    __slots__ = ("padded", "unpadded", "single", "cached_records")
+
+    def __init__(self):
+        self.padded: Dict[int, Set[int]] = defaultdict(set)
+        self.unpadded: Set[int] = set()
+        self.single = False
+        # The records are only built again when new frames are added
+        self.cached_records: Optional[List[SequenceRecord]] = None
+
+    def add(self, frame: Optional[str]) -> None:
+        self.cached_records = None
+        if frame is None:
+            self.single = True
+            return
+
+        digits = frame.lstrip("-")
+        if len(digits) > 1 and digits.startswith("0"):
+            # Like fileseq, the sign is part of the padding
+            self.padded[len(frame)].add(int(frame))
+        else:
+            self.unpadded.add(int(frame))
+
+    def records(
+        self, directory: str, basename: str, extension: str
+    ) -> List[SequenceRecord]:
+        if self.cached_records is None:
+            self.cached_records = self._build_records(directory, basename, extension)
+        return self.cached_records
+
+    def _build_records(
+        self, directory: str, basename: str, extension: str
+    ) -> List[SequenceRecord]:
+        # Like fileseq, the frames without leading zeros join the sequence of their width
+        padded = {width: set(frames) for width, frames in self.padded.items()}
+        unpadded = set()
+        for frame in self.unpadded:
+            width = len(str(frame))
+            if width in padded:
+                padded[width].add(frame)
+            else:
+                unpadded.add(frame)
+
+        records = [
+            SequenceRecord(
+                directory,
+                basename,
+                width,
+                extension,
+                fileseq.FrameSet.from_iterable(frames, sort=True),
+            )
+            for width, frames in padded.items()
+        ]
+        if unpadded:
+            width = min(len(str(frame)) for frame in unpadded)
+            records.append(
+                SequenceRecord(
+                    directory,
+                    basename,
+                    width,
+                    extension,
+                    fileseq.FrameSet.from_iterable(unpadded, sort=True),
+                )
+            )
+        if self.single:
+            records.append(SequenceRecord(directory, basename, 0, extension, None))
+        return records
+
+
+def _group_name(groups: Dict[Tuple[str, str], _SequenceGroup], name: str) -> bool:
+    match = SEQUENCE_NAME_RE.match(name)
+    if match is None:
+        return False
+    key = (match.group("basename"), match.group("extension"))
+    group = groups.get(key)
+    if group is None:
+        group = groups[key] = _SequenceGroup()
+    group.add(match.group("frame"))
+    return True
+
+
+def _get_records(
+    directory: str, groups: Dict[Tuple[str, str], _SequenceGroup]
+) -> List[SequenceRecord]:
+    return [
+        record
+        for (basename, extension), group in groups.items()
+        for record in group.records(directory, basename, extension)
+    ]
+
+
+def group_sequences(
+    directory: PathLike, names: Iterable[str], chunk_size: int = SCAN_CHUNK_SIZE
+) -> Iterator[List[SequenceRecord]]:
+    """
+    Group the given file names of a directory into sequences as they are iterated,
+    without building the list of all the paths. The sequences found so far are yielded
+    after chunk_size files, and then each time the amount of grouped files doubles,
+    so they can be displayed before the end of the scan. The last yielded list is complete
+    """
+    directory = str(directory)
+    groups: Dict[Tuple[str, str], _SequenceGroup] = {}
+
+    grouped = 0
+    next_yield = chunk_size
+    for name in names:
+        if not _group_name(groups, name):
+            continue
+
+        grouped += 1
+        if grouped >= next_yield:
+            # Building the frame sets of the large sequences is not free,
+            # the yields get rarer as the scan goes
+            next_yield = grouped * 2
+            yield _get_records(directory, groups)
+
+    yield _get_records(directory, groups)
+
+
+def group_all_sequences(
+    directory: PathLike, names: Iterable[str]
+) -> List[SequenceRecord]:
+    """
+    Group all the given file names of a directory into sequences at once,
+    when the sequences found during the scan are not needed
+    """
+    groups: Dict[Tuple[str, str], _SequenceGroup] = {}
+    for name in names:
+        _group_name(groups, name)
+    return _get_records(str(directory), groups)
+
+
+def _iter_file_names(directory: PathLike, include_hidden: bool) -> Iterator[str]:
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not include_hidden and entry.name.startswith("."):
+                    continue
+                try:
+                    if entry.is_dir():
+                        continue
+                except OSError:
+                    continue
+                yield entry.name
+    except (FileNotFoundError, NotADirectoryError):
+        return
+
+
+def scan_sequences(
+    directory: PathLike,
+    chunk_size: int = SCAN_CHUNK_SIZE,
+    include_hidden: bool = False,
+) -> Iterator[List[SequenceRecord]]:
+    """
+    Group the files of the given directory into sequences as the directory is listed,
+    see group_sequences
+    """
+    return group_sequences(
+        directory, _iter_file_names(directory, include_hidden), chunk_size
+    )
+
+
+def find_sequences_on_disk(directory: PathLike) -> List[SequenceRecord]:
+    """
+    Get all the sequences of the given directory, like fileseq.findSequencesOnDisk
+    """
+    return group_all_sequences(directory, _iter_file_names(directory, False))
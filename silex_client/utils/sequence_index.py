@@ -0,0 +1,235 @@
+"""
+@author: TD gang
+
+Cache of the entries and the file sequences found in a directory. Listing a directory and
+grouping its files into sequences is slow on large directories, the commands that look for
+the sequence of each file of a sequence would list the same directory for every file.
+Each directory is listed once, and all the queries are answered from memory
+"""
+
+from __future__ import annotations
+
+import os
+import pathlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import fileseq
+
+from silex_client.utils.scan import (
+    SCAN_CHUNK_SIZE,
+    SEQUENCE_NAME_RE,
+    SequenceRecord,
+    group_all_sequences,
+    group_sequences,
+)
+
+PathLike = Union[str, pathlib.Path]
+
+#: Amount of directories kept in the cache, the least recently used are dropped first
+SEQUENCE_INDEX_SIZE = 256
+#: Some filesystems only store the modification time in seconds, a directory modified
+#: this amount of seconds before being listed might be modified again without changing
+#: its modification time, its listing can't be trusted
+RACY_MTIME_DELAY = 2.0
+
+
+class DirectoryIndex(NamedTuple):
+    """
+    Entries and sequences of a directory, with the lookups used to find the sequence of a file
+    """
+
+    mtime: int
+    trusted: bool
+    entries: List[str]
+    sequences: List[fileseq.FileSequence]
+    by_name: Dict[Tuple[str, str], List[Tuple[SequenceRecord, fileseq.FileSequence]]]
+
+
+class SequenceIndex:
+    """
+    Index of the file sequences by directory. The index of a directory is computed once
+    and reused until the modification time of the directory changes, or until
+    a command invalidates it after modifying the directory.
+    The returned sequences are shared, they must not be modified
+    """
+
+    def __init__(self, size: int = SEQUENCE_INDEX_SIZE):
+        self.size = size
+        self._directories: OrderedDict[str, DirectoryIndex] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def get() -> SequenceIndex:
+        """
+        Return a globaly instanciated sequence index. This static method is just for conveniance
+        """
+        return getattr(sys.modules[__name__], "sequence_index")
+
+    @staticmethod
+    def _build(
+        directory: str,
+        mtime: int,
+        trusted: bool,
+        on_progress: Optional[Callable[[List[SequenceRecord]], None]] = None,
+    ) -> DirectoryIndex:
+        entries: List[str] = []
+
+        def iter_file_names() -> Iterator[str]:
+            # The files are grouped as the directory is listed
+            with os.scandir(directory) as directory_entries:
+                for entry in directory_entries:
+                    entries.append(entry.name)
+                    if not entry.is_dir() and not entry.name.startswith("."):
+                        yield entry.name
+
+        # Same as fileseq.findSequencesOnDisk, without listing the directory again.
+        # The frames are grouped into records, no path is built per file
+        records: List[SequenceRecord] = []
+        try:
+            if on_progress is None:
+                records = group_all_sequences(directory, iter_file_names())
+            else:
+                # The sequences found so far are reported during the scan
+                for records in group_sequences(
+                    directory, iter_file_names(), SCAN_CHUNK_SIZE
+                ):
+                    on_progress(records)
+        except OSError:
+            entries, records = [], []
+
+        sequences: List[fileseq.FileSequence] = []
+        by_name: Dict[
+            Tuple[str, str], List[Tuple[SequenceRecord, fileseq.FileSequence]]
+        ] = {}
+        for record in records:
+            sequence = record.to_file_sequence()
+            sequences.append(sequence)
+            key = (
+                os.path.normcase(record.basename),
+                os.path.normcase(record.extension),
+            )
+            by_name.setdefault(key, []).append((record, sequence))
+
+        return DirectoryIndex(mtime, trusted, entries, sequences, by_name)
+
+    def get_index(
+        self,
+        directory: PathLike,
+        on_progress: Optional[Callable[[List[SequenceRecord]], None]] = None,
+    ) -> DirectoryIndex:
+        """
+        Get the index of the given directory, computed only if the directory changed.
+        While the directory is scanned, the sequences found so far are given to on_progress
+        """
+        key = os.path.normcase(os.path.abspath(directory))
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            self.invalidate(directory)
+            return DirectoryIndex(0, False, [], [], {})
+
+        with self._lock:
+            index = self._directories.get(key)
+            if index is not None and index.trusted and index.mtime == mtime:
+                self._directories.move_to_end(key)
+                self.hits += 1
+                return index
+            self.misses += 1
+
+        trusted = (
+            mtime % 1_000_000_000 != 0 or time.time() - mtime / 1e9 > RACY_MTIME_DELAY
+        )
+        # The paths of the sequences keep the case of the given directory
+        index = self._build(str(directory), mtime, trusted, on_progress)
+        with self._lock:
+            self._directories[key] = index
+            self._directories.move_to_end(key)
+            while len(self._directories) > self.size:
+                self._directories.popitem(last=False)
+
+        return index
+
+    def get_sequences(self, directory: PathLike) -> List[fileseq.FileSequence]:
+        """
+        Get all the file sequences of the given directory, like fileseq.findSequencesOnDisk
+        """
+        return self.get_index(directory).sequences
+
+    def get_entries(self, directory: PathLike) -> List[str]:
+        """
+        Get the names of all the entries of the given directory, like os.listdir
+        """
+        return self.get_index(directory).entries
+
+    def find_sequence(
+        self, file_path: PathLike, basename: str, extension: str
+    ) -> Optional[fileseq.FileSequence]:
+        """
+        Find the sequence with the given basename and extension in the directory of the file
+        """
+        file_path = pathlib.Path(file_path)
+        key = (os.path.normcase(basename), os.path.normcase(extension))
+        candidates = self.get_index(file_path.parent).by_name.get(key)
+        return candidates[0][1] if candidates else None
+
+    def find_sequence_of_file(
+        self,
+        file_path: PathLike,
+        on_progress: Optional[Callable[[List[SequenceRecord]], None]] = None,
+    ) -> Optional[fileseq.FileSequence]:
+        """
+        Find the sequence that contains the given file, see get_index for on_progress
+        """
+        file_path = pathlib.Path(file_path)
+        match = SEQUENCE_NAME_RE.match(file_path.name)
+        if match is None:
+            return None
+
+        key = (
+            os.path.normcase(match.group("basename")),
+            os.path.normcase(match.group("extension")),
+        )
+        frame = match.group("frame")
+        index = self.get_index(file_path.parent, on_progress)
+        for record, sequence in index.by_name.get(key, []):
+            if frame is None and record.frame_set is None:
+                return sequence
+            # The padding must match too, 1 and 0001 are different files
+            if (
+                frame is not None
+                and record.frame_set is not None
+                and int(frame) in record.frame_set
+                and frame == f"{int(frame):0{record.padding}d}"
+            ):
+                return sequence
+        return None
+
+    def invalidate(self, directory: PathLike) -> None:
+        """
+        Drop the index of the given directory, the modification time
+        is not reliable enough after a modification made by ourselves
+        """
+        directory = os.path.normcase(os.path.abspath(directory))
+        with self._lock:
+            self._directories.pop(directory, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._directories.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "directories": len(self._directories),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+sequence_index = SequenceIndex()
@@ -4,15 +4,33 @@
 Helpers to encode or decode the json stream
 """
 
+import json
+import os
 import uuid
 
 import pathlib
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
 import jsondiff
 import fileseq
 
 from silex_client.action.action_buffer import ActionBuffer
 from silex_client.action.command_buffer import CommandBuffer
+from silex_client.utils.datatypes import CommandLogs
 from silex_client.utils.parameter_types import CommandParameterMeta
+from silex_client.utils.path_sequence import PathSequence, group_names
+from silex_client.utils.scan import SequenceRecord
+
+#: Name of the capability announced by the UIs that can read the compressed path lists
+PATH_SEQUENCE_CAPABILITY = "path_sequence"
+#: Name of the capability announced by the UIs that can append the new logs to the previous ones
+LOG_STREAM_CAPABILITY = "log_stream"
+#: Key of the compressed path lists in the json payloads
+PATH_SEQUENCE_KEY = "__path_sequence__"
+#: The lists shorter than this are sent as they are
+PATH_SEQUENCE_MIN_LENGTH = 8
+#: A list is only compressed if it has at least this amount of paths per sequence
+PATH_SEQUENCE_MIN_RATIO = 4
 
 
 def silex_encoder(obj):
@@ -31,6 +49,10 @@ def silex_encoder(obj):
     if isinstance(obj, (fileseq.FrameSet, pathlib.Path)):
         return str(obj)
 
+    # Expand the lazy paths into a list of string
+    if isinstance(obj, PathSequence):
+        return [str(path) for path in obj]
+
     # Convert types into string
     if isinstance(obj, type):
         return {"name": obj.__name__}
@@ -58,16 +80,188 @@ class CustomDiffSyntax(jsondiff.CompactJsonDiffSyntax):
 
 
 class CustomJsonDiffer(jsondiff.JsonDiffer):
-    def __init__(self, marshal=False):
+    def __init__(self, marshal=False, log_stream=False):
         super().__init__(marshal=marshal)
         self.options.syntax = CustomDiffSyntax()
+        self.log_stream = log_stream
 
     def _list_diff(self, X, Y):
+        if isinstance(X, CommandLogs) and isinstance(Y, CommandLogs):
+            return self._logs_diff(X, Y)
         return Y, 0.0
 
+    def _logs_diff(self, X: CommandLogs, Y: CommandLogs):
+        """
+        The logs are only appended, they are unchanged if no entry was added.
+        The UIs that support it only receive the new entries, the others the whole list
+        """
+        if X.cursor == Y.cursor and X.start == Y.start:
+            return {}, 1.0
+        if not self.log_stream:
+            return Y, 0.0
+        return {"start": Y.start, "cursor": Y.cursor, "logs": Y.since(X.cursor)}, 0.0
+
 
-def silex_diff(a, b, marshal=False):
+def silex_diff(a, b, marshal=False, log_stream=False):
     """
     Helper to make a diff with right configuration to make it json serializable
     """
-    return jsondiff.diff(a, b, cls=CustomJsonDiffer, marshal=marshal)
+    return jsondiff.diff(
+        a, b, cls=CustomJsonDiffer, marshal=marshal, log_stream=log_stream
+    )
+
+
+class PathSequenceStats:
+    """
+    Size of the path lists sent compressed, and the size they would have had as json lists
+    """
+
+    def __init__(self):
+        self.lists = 0
+        self.paths = 0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+
+    def add(self, paths: int, raw_bytes: int, compressed_bytes: int) -> None:
+        self.lists += 1
+        self.paths += paths
+        self.raw_bytes += raw_bytes
+        self.compressed_bytes += compressed_bytes
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "lists": self.lists,
+            "paths": self.paths,
+            "raw_bytes": self.raw_bytes,
+            "compressed_bytes": self.compressed_bytes,
+            "saved_bytes": self.raw_bytes - self.compressed_bytes,
+        }
+
+
+def _split_path(path: str) -> Tuple[str, str]:
+    # The separator stays in the directory, the paths are rebuilt by concatenation
+    index = max(path.rfind("/"), path.rfind("\\")) + 1
+    return path[:index], path[index:]
+
+
+def _get_wire_record(record: SequenceRecord) -> SequenceRecord:
+    # Same directory as the str of the pathlib.Path of the paths, with its separator
+    directory = str(pathlib.Path(record.directory))
+    if directory == ".":
+        directory = ""
+    elif not directory.endswith(("/", "\\")):
+        directory += os.sep
+    return SequenceRecord(
+        directory, record.basename, record.padding, record.extension, record.frame_set
+    )
+
+
+def _get_raw_size(record: SequenceRecord) -> int:
+    # Same as the size of the paths of the record in a json list
+    name_size = len(record.directory) + record.directory.count("\\") + 4
+    name_size += len(record.basename) + len(record.extension)
+    if record.frame_set is None:
+        return name_size
+    return sum(
+        name_size + max(len(str(frame)), record.padding) for frame in record.frame_set
+    )
+
+
+def compress_path_list(
+    values: Sequence[Any], stats: Optional[PathSequenceStats] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Compress a list of paths that form frame sequences into
+    {"__path_sequence__": [{"directory": ..., "pattern": ..., "frames": ...}, ...]}.
+    The directory ends with its separator, the pattern is a printf format of the name
+    and the frames are a fileseq frame range: the paths are directory + pattern % frame
+    for each frame, or directory + pattern % () when the frames are null.
+    Returns None if the list does not contain paths or is not worth compressing
+    """
+    if len(values) < PATH_SEQUENCE_MIN_LENGTH:
+        return None
+    if not isinstance(values, PathSequence) and not all(
+        isinstance(value, (str, pathlib.PurePath)) for value in values
+    ):
+        return None
+
+    raw_bytes = 0
+
+    def split_paths() -> Iterator[Tuple[str, str]]:
+        nonlocal raw_bytes
+        for value in values:
+            path = str(value)
+            # The size of the path in a json list: the quotes, the escapes and the separator
+            raw_bytes += len(path) + path.count("\\") + 4
+            yield _split_path(path)
+
+    if isinstance(values, PathSequence):
+        # The sequences are already known, the paths are not built
+        records = [_get_wire_record(record) for record in values.records]
+        raw_bytes = sum(_get_raw_size(record) for record in records)
+    else:
+        records = group_names(split_paths())
+    if len(records) * PATH_SEQUENCE_MIN_RATIO > len(values):
+        return None
+
+    sequences = []
+    for record in records:
+        pattern = record.basename.replace("%", "%%")
+        if record.frame_set is not None:
+            pattern += f"%0{record.padding}d"
+        pattern += record.extension.replace("%", "%%")
+        frames = str(record.frame_set) if record.frame_set is not None else None
+        sequences.append(
+            {"directory": record.directory, "pattern": pattern, "frames": frames}
+        )
+
+    compressed = {PATH_SEQUENCE_KEY: sequences}
+    if stats is not None:
+        stats.add(len(values), raw_bytes, len(json.dumps(compressed)))
+    return compressed
+
+
+def expand_path_list(compressed: Dict[str, Any]) -> List[str]:
+    """
+    Expand a path list compressed with compress_path_list
+    """
+    paths = []
+    for sequence in compressed[PATH_SEQUENCE_KEY]:
+        directory, pattern = sequence["directory"], sequence["pattern"]
+        if sequence["frames"] is None:
+            paths.append(directory + pattern % ())
+            continue
+        for frame in fileseq.FrameSet(sequence["frames"]):
+            paths.append(directory + pattern % frame)
+    return paths
+
+
+def compress_paths(data: Any, stats: Optional[PathSequenceStats] = None) -> Any:
+    """
+    Compress all the path lists of the given json data, the data is not modified.
+    Only for the UIs that announced the path_sequence capability
+    """
+    if isinstance(data, dict):
+        return {key: compress_paths(value, stats) for key, value in data.items()}
+    if isinstance(data, (list, PathSequence)):
+        compressed = compress_path_list(data, stats)
+        if compressed is not None:
+            return compressed
+        # The PathSequence are expanded by the encoder
+        if isinstance(data, PathSequence):
+            return data
+        return [compress_paths(item, stats) for item in data]
+    return data
+
+
+def expand_paths(data: Any) -> Any:
+    """
+    Expand all the compressed path lists of the given json data
+    """
+    if isinstance(data, dict):
+        if PATH_SEQUENCE_KEY in data:
+            return expand_path_list(data)
+        return {key: expand_paths(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [expand_paths(item) for item in data]
+    return data
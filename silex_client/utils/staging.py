@@ -0,0 +1,166 @@
+"""
+@author: TD gang
+
+Staging directories of the conforms and the publishes. The files are written into
+a staging directory next to the final directory, and the staging directory is renamed
+to the final directory once complete. A cancelled or crashed action only leaves a staging
+directory behind, that is cleaned by the next actions
+"""
+
+import contextlib
+import json
+import os
+import pathlib
+import shutil
+import socket
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Union
+
+from silex_client.utils.log import logger
+
+#: Prefix of the staging directories, used to recognize them during the cleanup
+STAGING_PREFIX = ".silex_staging_"
+#: File written in each staging directory, with the process that owns it
+STAGING_MARKER = ".silex_staging.json"
+#: Amount of seconds after which a staging directory is stale, even if its process
+#: could not be checked, the value can be overriden with SILEX_STAGING_RETENTION
+STAGING_RETENTION = 24 * 60 * 60
+
+PathLike = Union[str, pathlib.Path]
+
+
+def get_staging_retention() -> int:
+    staging_retention = os.getenv("SILEX_STAGING_RETENTION", str(STAGING_RETENTION))
+    return int(staging_retention) if staging_retention.isdigit() else STAGING_RETENTION
+
+
+def is_staging_directory(path: PathLike) -> bool:
+    return pathlib.Path(path).name.startswith(STAGING_PREFIX)
+
+
+def get_staging_path(parent: PathLike) -> pathlib.Path:
+    return pathlib.Path(parent) / f"{STAGING_PREFIX}{uuid.uuid4()}"
+
+
+def create_staging_directory(path: PathLike) -> pathlib.Path:
+    """
+    Create the given staging directory with its marker, if it does not exists already
+    """
+    path = pathlib.Path(path)
+    os.makedirs(path, exist_ok=True)
+    marker = {"pid": os.getpid(), "host": socket.gethostname(), "time": time.time()}
+    with open(path / STAGING_MARKER, "w", encoding="utf-8") as marker_file:
+        json.dump(marker, marker_file)
+    return path
+
+
+def _read_marker(path: pathlib.Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path / STAGING_MARKER, "r", encoding="utf-8") as marker_file:
+            return json.load(marker_file)
+    except (OSError, ValueError):
+        return None
+
+
+def _is_process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (OSError, ValueError):
+        # The process exists but belongs to someone else, or can't be checked here
+        return True
+    return True
+
+
+def is_staging_stale(path: PathLike, retention: Optional[int] = None) -> bool:
+    """
+    A staging directory is stale when the process that created it on this host is dead,
+    or when it has not been modified for longer than the retention
+    """
+    path = pathlib.Path(path)
+    retention = get_staging_retention() if retention is None else retention
+
+    marker = _read_marker(path)
+    if (
+        marker is not None
+        and marker.get("host") == socket.gethostname()
+        and os.name != "nt"
+        and marker.get("pid") != os.getpid()
+        and not _is_process_alive(marker.get("pid", 0))
+    ):
+        return True
+
+    try:
+        return time.time() - os.stat(path).st_mtime > retention
+    except OSError:
+        return False
+
+
+def clean_stale_staging(parent: PathLike, retention: Optional[int] = None) -> None:
+    """
+    Delete the stale staging directories left in the given directory by the previous actions.
+    Meant to be executed in the background, the errors are only logged
+    """
+    try:
+        with os.scandir(parent) as entries:
+            staging_paths = [
+                pathlib.Path(entry.path)
+                for entry in entries
+                if entry.name.startswith(STAGING_PREFIX)
+            ]
+    except OSError:
+        return
+
+    for staging_path in staging_paths:
+        if not is_staging_stale(staging_path, retention):
+            continue
+        logger.info("Cleaning the stale staging directory %s", staging_path)
+        shutil.rmtree(
+            staging_path,
+            onerror=lambda _, path, error: logger.warning(
+                "Could not clean %s: %s", path, error[1]
+            ),
+        )
+
+
+def commit_staging_directory(
+    staging_path: PathLike, directory: PathLike
+) -> List[pathlib.Path]:
+    """
+    Move the content of the staging directory into the final directory.
+    When the final directory does not exists or is empty, the staging directory is renamed,
+    the whole content appears at once. Otherwise each entry is renamed into the final directory.
+    Returns the committed paths
+    """
+    staging_path, directory = pathlib.Path(staging_path), pathlib.Path(directory)
+    marker_path = staging_path / STAGING_MARKER
+    if os.path.lexists(marker_path):
+        os.remove(marker_path)
+
+    names = os.listdir(staging_path)
+    # An empty final directory is replaced by the staging directory
+    with contextlib.suppress(OSError):
+        os.rmdir(directory)
+
+    if not os.path.lexists(directory):
+        directory.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(staging_path, directory)
+        return [directory / name for name in names]
+
+    for name in names:
+        target = directory / name
+        try:
+            os.replace(staging_path / name, target)
+        except OSError:
+            # os.replace only overrides files and empty directories
+            if not os.path.lexists(target):
+                raise
+            if os.path.isdir(target) and not os.path.islink(target):
+                shutil.rmtree(target)
+            else:
+                os.remove(target)
+            os.replace(staging_path / name, target)
+    os.rmdir(staging_path)
+    return [directory / name for name in names]
@@ -1,29 +1,386 @@
+"""
+@author: TD gang
+
+Helpers to run blocking functions in shared pools of worker threads
+and await their result from the event loop
+"""
+
+from __future__ import annotations
+
 import asyncio
+import functools
+import os
 import threading
-from typing import Callable, TypeVar
+import time
+from collections import deque
+from concurrent import futures
+from typing import Any, Callable, Deque, Dict, Optional, Tuple, TypeVar
 
-from silex_client.core.context import Context
 from silex_client.utils.log import logger
 
 ReturnType = TypeVar("ReturnType")
 
+#: Default amount of workers of each named pool. The value can be overriden
+#: with the environment variable SILEX_THREAD_POOL_<NAME> (ex: SILEX_THREAD_POOL_IO=32)
+THREAD_POOL_SIZES = {
+    # Disk operations, mostly waiting on the file system / network shares
+    "io": 16,
+    # The DCC and render engines SDK are rarely thread safe
+    "sdk": 1,
+    # Byte ranges of the large files, copied concurrently
+    "range_copy": 8,
+}
+#: Amount of workers for the pools that are not listed in THREAD_POOL_SIZES
+DEFAULT_THREAD_POOL_SIZE = 4
+
+
+class ThreadPool:
+    """
+    Wrapper around a ThreadPoolExecutor that keeps track of the queue depth
+    and of the time the tasks spend waiting in the queue and running
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor: Optional[futures.ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+        self.submitted = 0
+        self.completed = 0
+        self.queued = 0
+        self.running = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.total_run_time = 0.0
+        self.max_run_time = 0.0
+
+    @property
+    def executor(self) -> futures.ThreadPoolExecutor:
+        """
+        The executor is created lazily, and recreated if the pool has been shutdown
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = futures.ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=f"silex_{self.name}",
+                )
+            return self._executor
+
+    def submit(
+        self, function: Callable[..., ReturnType], *args, **kwargs
+    ) -> futures.Future:
+        """
+        Queue the given function in the pool and return a concurrent future
+        """
+        queued_time = time.perf_counter()
+
+        def timed_function() -> ReturnType:
+            start_time = time.perf_counter()
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+                self.total_wait_time += start_time - queued_time
+                self.max_wait_time = max(self.max_wait_time, start_time - queued_time)
+
+            try:
+                return function(*args, **kwargs)
+            finally:
+                run_time = time.perf_counter() - start_time
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+                    self.total_run_time += run_time
+                    self.max_run_time = max(self.max_run_time, run_time)
+
+        def on_done(future: futures.Future) -> None:
+            # A cancelled task never reached the timed function
+            if future.cancelled():
+                with self._lock:
+                    self.queued -= 1
+
+        with self._lock:
+            self.submitted += 1
+            self.queued += 1
+
+        future = self.executor.submit(timed_function)
+        future.add_done_callback(on_done)
+        return future
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of the pool's counters, the times are in seconds
+        """
+        with self._lock:
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "queue_depth": self.queued,
+                "running": self.running,
+                "average_wait_time": self.total_wait_time / max(self.completed, 1),
+                "max_wait_time": self.max_wait_time,
+                "average_run_time": self.total_run_time / max(self.completed, 1),
+                "max_run_time": self.max_run_time,
+            }
+
+    def shutdown(self, wait: bool = True, timeout: Optional[float] = None) -> None:
+        """
+        Stop the worker threads, the pool can still be used after, a new executor
+        will be created on the next submit. With a timeout, the threads still running
+        after it are left behind
+        """
+        with self._lock:
+            executor = self._executor
+            self._executor = None
+
+        if executor is None:
+            return
+
+        executor.shutdown(wait=False)
+        if not wait:
+            return
+
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        # The executor does not expose its threads, and its shutdown can't time out
+        for thread in list(getattr(executor, "_threads", [])):
+            thread.join(
+                None if deadline is None else max(deadline - time.perf_counter(), 0)
+            )
+            if thread.is_alive():
+                logger.warning(
+                    "The thread %s of the pool %s is still running after the shutdown",
+                    thread.name,
+                    self.name,
+                )
+
+
+_thread_pools: Dict[str, ThreadPool] = {}
+_thread_pools_lock = threading.Lock()
+
+
+def get_thread_pool(name: str = "io") -> ThreadPool:
+    """
+    Get the shared pool with the given name, it is created on the first call
+    """
+    with _thread_pools_lock:
+        thread_pool = _thread_pools.get(name)
+        if thread_pool is None:
+            max_workers = THREAD_POOL_SIZES.get(name, DEFAULT_THREAD_POOL_SIZE)
+            env_max_workers = os.getenv(f"SILEX_THREAD_POOL_{name.upper()}", "")
+            if env_max_workers.isdigit() and int(env_max_workers) > 0:
+                max_workers = int(env_max_workers)
+
+            thread_pool = ThreadPool(name, max_workers)
+            _thread_pools[name] = thread_pool
+
+        return thread_pool
+
+
+def thread_pools_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Get the stats of all the pools that have been created
+    """
+    with _thread_pools_lock:
+        thread_pools = list(_thread_pools.values())
+
+    return {thread_pool.name: thread_pool.stats() for thread_pool in thread_pools}
+
+
+def shutdown_thread_pools(wait: bool = True, timeout: Optional[float] = None) -> None:
+    """
+    Stop the worker threads of all the pools, waiting at most the given timeout for all of them.
+
+    The worker threads are not daemon threads: concurrent.futures joins them when the
+    interpreter exits, so a function stuck in a pool (ex: a call to an unreachable
+    network share) delays the exit until it returns
+    """
+    with _thread_pools_lock:
+        thread_pools = list(_thread_pools.values())
+
+    deadline = None if timeout is None else time.perf_counter() + timeout
+    for thread_pool in thread_pools:
+        remaining = None if deadline is None else max(deadline - time.perf_counter(), 0)
+        thread_pool.shutdown(wait=wait, timeout=remaining)
+
+
+class MainThreadDispatcher:
+    """
+    Pass callables from any thread to the thread that owns the dispatcher
+    (the main thread, or the DCC's UI thread). The owner thread sleeps until
+    some work is posted and executes all the queued callables at each wake up
+
+    :ivar WAIT_TIMEOUT: Max time in second of a single wait, some platforms can't
+    interrupt a blocking wait with a KeyboardInterrupt
+    """
+
+    WAIT_TIMEOUT = 0.5
+
+    def __init__(self):
+        self._queue: Deque[Tuple[Callable, futures.Future, float]] = deque()
+        self._condition = threading.Condition()
+        self._wake_requested = False
+
+        self.posted = 0
+        self.executed = 0
+        self.batches = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def post(
+        self, function: Callable[..., ReturnType], *args, **kwargs
+    ) -> futures.Future:
+        """
+        Queue the given function and wake up the owner thread, this method is thread safe.
+        The returned future is set with the result of the function once executed
+        """
+        future: futures.Future = futures.Future()
+        with self._condition:
+            self._queue.append(
+                (
+                    functools.partial(function, *args, **kwargs),
+                    future,
+                    time.perf_counter(),
+                )
+            )
+            self.posted += 1
+            self._condition.notify_all()
+        return future
+
+    async def execute(
+        self, function: Callable[..., ReturnType], *args, **kwargs
+    ) -> ReturnType:
+        """
+        Execute the given function in the owner thread and await its result from the event loop
+        """
+        return await asyncio.wrap_future(self.post(function, *args, **kwargs))
+
+    def wake(self) -> None:
+        """
+        Wake up the owner thread even if no work has been posted
+        """
+        with self._condition:
+            self._wake_requested = True
+            self._condition.notify_all()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until some work is posted, wake() is called or the timeout is reached.
+        Returns True if some work is pending
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._queue or self._wake_requested, timeout
+            )
+            self._wake_requested = False
+            return bool(self._queue)
+
+    def run_pending(self) -> int:
+        """
+        Execute all the callables queued at the time of the call, must be called
+        from the owner thread. Returns the amount of callables executed
+        """
+        with self._condition:
+            batch = list(self._queue)
+            self._queue.clear()
+
+        if not batch:
+            return 0
+
+        for function, future, queued_time in batch:
+            latency = time.perf_counter() - queued_time
+            with self._condition:
+                self.total_latency += latency
+                self.max_latency = max(self.max_latency, latency)
+
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                future.set_result(function())
+            except Exception as exception:
+                logger.error("Exception raised in main thread call: %s", exception)
+                future.set_exception(exception)
+
+        with self._condition:
+            self.executed += len(batch)
+            self.batches += 1
+        return len(batch)
+
+    def run_until_complete(self, future: futures.Future) -> None:
+        """
+        Execute the posted callables as soon as they arrive, until the given future is done
+        """
+        future.add_done_callback(lambda _: self.wake())
+        while not future.done():
+            self.wait(self.WAIT_TIMEOUT)
+            self.run_pending()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of the dispatcher's counters, the latencies are in seconds
+        """
+        with self._condition:
+            return {
+                "posted": self.posted,
+                "executed": self.executed,
+                "batches": self.batches,
+                "queue_depth": len(self._queue),
+                "average_latency": self.total_latency / max(self.executed, 1),
+                "max_latency": self.max_latency,
+            }
+
+    # Queue like interface, for the integrations that use Context.callback_queue
+
+    def put(self, function: Callable) -> None:
+        self.post(function)
+
+    def empty(self) -> bool:
+        with self._condition:
+            return not self._queue
+
+    def get(self) -> Callable:
+        """
+        Pop the next callable, calling it will execute it and set its future
+        """
+        with self._condition:
+            function, future, _ = self._queue.popleft()
+
+        def run_function():
+            if not future.set_running_or_notify_cancel():
+                return None
+            try:
+                result = function()
+            except Exception as exception:
+                future.set_exception(exception)
+                raise
+            future.set_result(result)
+            return result
+
+        return run_function
+
 
 class ExecutionInThread:
     """
     Some functions are not awaitable but we need them to be.
     This callable class will run the given function in a different thread
     And make the result awaitable
+
+    :ivar pool_name: The name of the shared thread pool the function will be executed in
     """
 
-    @staticmethod
-    def execute_wrapped_function(wrapped_function: Callable):
+    def __init__(self, pool_name: str = "io"):
+        self.pool_name = pool_name
+
+    def execute_wrapped_function(self, wrapped_function: Callable) -> None:
         """
         This method method can be overriden to customise the behaviour of the call
         Like choose to execute the function in a specific thread,
-        instead of creating a new one
+        instead of using the shared thread pool
         """
-        thread = threading.Thread(target=wrapped_function, daemon=True)
-        thread.start()
+        get_thread_pool(self.pool_name).submit(wrapped_function)
 
     async def __call__(
         self, function: Callable[..., ReturnType], *args, **kwargs
@@ -31,24 +388,24 @@ class ExecutionInThread:
         """
         Execute the given function in a different thread and wait for its result
         """
-
-        future = Context.get().event_loop.loop.create_future()
+        concurrent_future: futures.Future = futures.Future()
 
         def wrapped_function():
-            async def set_future_result(result):
-                future.set_result(result)
-
-            async def set_future_exception(exception):
-                future.set_exception(exception)
+            # The future is cancelled when the awaiting task is cancelled
+            if not concurrent_future.set_running_or_notify_cancel():
+                return
 
             try:
-                result = function(*args, **kwargs)
-                Context.get().event_loop.register_task(set_future_result(result))
-            except Exception as ex:
-                Context.get().event_loop.register_task(set_future_exception(ex))
+                concurrent_future.set_result(function(*args, **kwargs))
+            # Even a KeyboardInterrupt or a SystemExit must not leave the caller waiting
+            except BaseException as exception:
+                concurrent_future.set_exception(exception)
 
         self.execute_wrapped_function(wrapped_function)
 
+        # The result is chained back to the event loop with call_soon_threadsafe
+        future = asyncio.wrap_future(concurrent_future)
+
         def callback(task_result: asyncio.Future):
             if task_result.cancelled():
                 return
@@ -56,12 +413,10 @@ class ExecutionInThread:
             exception = task_result.exception()
             if exception:
                 logger.error("Exception raised in wrapped execute call: %s", exception)
-                raise Exception(
-                    f"Exception raised in wrapped execute call: {exception}"
-                )
 
         future.add_done_callback(callback)
         return await future
 
 
-execute_in_thread = ExecutionInThread()
+execute_in_thread = ExecutionInThread("io")
+execute_in_sdk_thread = ExecutionInThread("sdk")
@@ -0,0 +1,470 @@
+"""
+@author: TD gang
+
+Low level file copy primitives used by the commands that transfer files.
+The copy is delegated to the kernel when possible, the data then never goes through python
+"""
+
+import contextlib
+import ctypes
+import ctypes.util
+import errno
+import functools
+import hashlib
+import os
+import shutil
+import sys
+import threading
+from concurrent import futures
+from typing import Any, BinaryIO, Callable, ContextManager, Dict, List, Optional, Tuple
+
+from silex_client.utils.datatypes import SharedVariable
+from silex_client.utils.manifest import create_manifest_entry, is_entry_current
+from silex_client.utils.thread import get_thread_pool
+
+#: Size of the chunks of the buffered copy, the data goes through python
+BUFFER_SIZE = 64 * 1024
+#: Size of the chunks of the kernel copy, small enough to report the progress regularly
+KERNEL_CHUNK_SIZE = 8 * 1024 * 1024
+#: Size of the byte ranges copied concurrently for the large files
+RANGE_SIZE = 64 * 1024 * 1024
+#: Size of the buffer of a range copy, when the kernel copy is not available
+RANGE_BUFFER_SIZE = 1024 * 1024
+#: Hash used to verify the copies, fast and available in the standard library
+HASH_ALGORITHM = "blake2b"
+#: Max difference in seconds between two modification times considered equal,
+#: the filesystems don't all have the same precision
+MTIME_TOLERANCE = 0.01
+#: ioctl request to clone a file on linux filesystems that support it (btrfs, xfs...)
+FICLONE = 0x40049409
+
+#: The kernel can't copy between these files, the buffered copy must be used instead
+_KERNEL_COPY_ERRORS = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EBADF,
+    errno.EOPNOTSUPP,
+    errno.ETXTBSY,
+}
+
+
+def copy_file_reflink(fsrc: BinaryIO, fdst: BinaryIO) -> bool:
+    """
+    Clone the source into the destination, the two files then share the same blocks
+    on the disk until one of them is modified. Returns False if the filesystem
+    does not support it
+    """
+    if not sys.platform.startswith("linux"):
+        return False
+
+    try:
+        import fcntl  # pylint: disable=import-outside-toplevel
+
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    except (ImportError, OSError):
+        return False
+    return True
+
+
+def copy_file_kernel(
+    fsrc: BinaryIO, fdst: BinaryIO, size: int, report: Callable[[int], None]
+) -> int:
+    """
+    Copy the source into the destination with copy_file_range or sendfile.
+    Returns the amount of bytes copied, the rest must be copied with the buffered copy
+    """
+    src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+    copy_file_range = getattr(os, "copy_file_range", None)
+    # The sendfile of the other platforms only accept sockets as output
+    sendfile = (
+        getattr(os, "sendfile", None) if sys.platform.startswith("linux") else None
+    )
+
+    offset = 0
+    while offset < size:
+        count = min(KERNEL_CHUNK_SIZE, size - offset)
+        try:
+            if copy_file_range is not None:
+                copied = copy_file_range(src_fd, dst_fd, count, offset, offset)
+            elif sendfile is not None:
+                os.lseek(dst_fd, offset, os.SEEK_SET)
+                copied = sendfile(dst_fd, src_fd, offset, count)
+            else:
+                break
+        except OSError as exception:
+            if exception.errno not in _KERNEL_COPY_ERRORS:
+                raise
+            # Some filesystems only support one of the two
+            if copy_file_range is not None:
+                copy_file_range = None
+                continue
+            break
+
+        # The file has been truncated during the copy
+        if copied == 0:
+            break
+
+        offset += copied
+        report(copied)
+
+    return offset
+
+
+def copy_file_buffered(
+    fsrc: BinaryIO, fdst: BinaryIO, report: Callable[[int], None]
+) -> None:
+    """
+    Copy the source into the destination from the current positions,
+    with a single buffer reused for all the chunks
+    """
+    buffer = bytearray(BUFFER_SIZE)
+    view = memoryview(buffer)
+    while True:
+        read = fsrc.readinto(buffer)  # type: ignore
+        if not read:
+            break
+        report(fdst.write(view[:read]))
+
+
+def _get_reporter(
+    progress: SharedVariable, progress_lock: Optional[threading.Lock]
+) -> Callable[[int], None]:
+    lock: ContextManager = (
+        progress_lock if progress_lock is not None else contextlib.nullcontext()
+    )
+
+    def report(size: int) -> None:
+        with lock:
+            progress.value += size
+
+    return report
+
+
+def copy_range(
+    src: os.PathLike,
+    dst: os.PathLike,
+    start: int,
+    end: int,
+    report: Callable[[int], None],
+) -> int:
+    """
+    Copy the bytes from start to end of the source at the same position in the destination.
+    Each range has its own file handles, so the ranges can be copied concurrently.
+    Returns the amount of bytes copied
+    """
+    with open(src, "rb") as fsrc:
+        with open(dst, "r+b") as fdst:
+            src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+            copy_file_range = getattr(os, "copy_file_range", None)
+
+            offset = start
+            # Positional kernel copy, the file offsets of the handles are not used
+            while copy_file_range is not None and offset < end:
+                count = min(KERNEL_CHUNK_SIZE, end - offset)
+                try:
+                    copied = copy_file_range(src_fd, dst_fd, count, offset, offset)
+                except OSError as exception:
+                    if exception.errno not in _KERNEL_COPY_ERRORS:
+                        raise
+                    break
+                if copied == 0:
+                    return offset - start
+                offset += copied
+                report(copied)
+
+            buffer = bytearray(RANGE_BUFFER_SIZE)
+            view = memoryview(buffer)
+            fsrc.seek(offset)
+            fdst.seek(offset)
+            while offset < end:
+                read = fsrc.readinto(view[: min(RANGE_BUFFER_SIZE, end - offset)])  # type: ignore
+                if not read:
+                    break
+                fdst.write(view[:read])
+                offset += read
+                report(read)
+
+    return offset - start
+
+
+def hash_range(path: os.PathLike, start: int, end: int) -> str:
+    """
+    Hash the bytes from start to end of the given file with the verification hash
+    """
+    range_hash = new_hash()
+    buffer = bytearray(RANGE_BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(path, "rb") as file:
+        file.seek(start)
+        offset = start
+        while offset < end:
+            read = file.readinto(view[: min(RANGE_BUFFER_SIZE, end - offset)])  # type: ignore
+            if not read:
+                break
+            range_hash.update(view[:read])
+            offset += read
+    return range_hash.hexdigest()
+
+
+def verify_ranges(
+    src: os.PathLike, dst: os.PathLike, ranges: List[Tuple[int, int]]
+) -> bool:
+    """
+    Compare the size of the files, and the hash of each range of the source and the destination.
+    The ranges are hashed concurrently in the range_copy thread pool
+    """
+    if os.path.getsize(src) != os.path.getsize(dst):
+        return False
+
+    thread_pool = get_thread_pool("range_copy")
+    hash_futures = [
+        (
+            thread_pool.submit(hash_range, src, start, end),
+            thread_pool.submit(hash_range, dst, start, end),
+        )
+        for start, end in ranges
+    ]
+    try:
+        return all(
+            src_future.result() == dst_future.result()
+            for src_future, dst_future in hash_futures
+        )
+    finally:
+        for src_future, dst_future in hash_futures:
+            src_future.cancel()
+            dst_future.cancel()
+
+
+@functools.lru_cache(maxsize=None)
+def _get_native_fallocate() -> Optional[Callable[..., int]]:
+    """
+    Get the fallocate of the libc, only linux has it
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fallocate = libc.fallocate64
+    except (OSError, AttributeError, TypeError):
+        return None
+
+    fallocate.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int64, ctypes.c_int64]
+    fallocate.restype = ctypes.c_int
+    return fallocate
+
+
+def preallocate(fd: int, size: int) -> bool:
+    """
+    Reserve the blocks of the file on the disk, if the filesystem supports it natively.
+    posix_fallocate is not used: when the filesystem does not support it (NFS, SMB...)
+    the libc emulates it by writing every block, which costs as much as the copy.
+    Returns False if the blocks could not be reserved
+    """
+    fallocate = _get_native_fallocate()
+    if fallocate is None or size <= 0:
+        return False
+    return fallocate(fd, 0, 0, size) == 0
+
+
+def copy_file_ranges(
+    src: os.PathLike,
+    dst: os.PathLike,
+    progress: SharedVariable,
+    progress_lock: Optional[threading.Lock] = None,
+    range_size: int = RANGE_SIZE,
+) -> None:
+    """
+    Copy a large file by splitting it into byte ranges copied concurrently
+    in the range_copy thread pool. The destination is preallocated, and flushed
+    to the disk and verified once all the ranges are copied.
+    Used to saturate the high latency network shares, that a single stream can't
+
+    The progress lock must be given when several files are copied at the same time
+    """
+    report = _get_reporter(progress, progress_lock or threading.Lock())
+    size = os.path.getsize(src)
+    ranges = [
+        (start, min(start + range_size, size)) for start in range(0, size, range_size)
+    ]
+
+    # Preallocate the destination, so the ranges can be written in any order
+    # and the file is not fragmented
+    dst_fd = os.open(
+        dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+    )
+    try:
+        if not preallocate(dst_fd, size):
+            os.ftruncate(dst_fd, size)
+    finally:
+        os.close(dst_fd)
+
+    thread_pool = get_thread_pool("range_copy")
+    range_futures = [
+        thread_pool.submit(copy_range, src, dst, start, end, report)
+        for start, end in ranges
+    ]
+    try:
+        for (start, end), range_future in zip(ranges, range_futures):
+            if range_future.result() != end - start:
+                raise OSError(
+                    f"Could not copy the bytes {start}-{end} of {src}: The file has been truncated"
+                )
+    finally:
+        # Stop the remaining ranges if one of them failed
+        for range_future in range_futures:
+            range_future.cancel()
+        futures.wait(range_futures)
+
+    with open(dst, "rb+") as fdst:
+        os.fsync(fdst.fileno())
+
+    if not verify_ranges(src, dst, ranges):
+        raise OSError(f"The copy of {src} to {dst} is corrupted")
+
+    shutil.copymode(src, dst)
+
+
+def copy_file(
+    src: os.PathLike,
+    dst: os.PathLike,
+    progress: SharedVariable,
+    progress_lock: Optional[threading.Lock] = None,
+    range_threshold: int = 0,
+) -> None:
+    """
+    Copy the content and the permissions of the source into the destination,
+    with the fastest method available: clone, kernel copy, and buffered copy.
+    The amount of bytes copied is added to the progress as the copy goes.
+    The files bigger than the range threshold are copied with copy_file_ranges,
+    set the threshold to 0 to disable it.
+
+    The progress lock must be given when several files are copied at the same time
+    """
+    if range_threshold > 0 and os.path.getsize(src) >= range_threshold:
+        copy_file_ranges(src, dst, progress, progress_lock)
+        return
+
+    report = _get_reporter(progress, progress_lock)
+
+    with open(src, "rb") as fsrc:
+        with open(dst, "wb") as fdst:
+            size = os.fstat(fsrc.fileno()).st_size
+            if size and copy_file_reflink(fsrc, fdst):
+                report(size)
+            else:
+                copied = copy_file_kernel(fsrc, fdst, size, report)
+                # Copy the rest, if the kernel copy is not supported or if the file grew
+                fsrc.seek(copied)
+                fdst.seek(copied)
+                copy_file_buffered(fsrc, fdst, report)
+
+    shutil.copymode(src, dst)
+
+
+def new_hash() -> Any:
+    return hashlib.blake2b(digest_size=20)
+
+
+def hash_file(path: os.PathLike) -> str:
+    """
+    Hash the content of the given file with the verification hash
+    """
+    file_hash = new_hash()
+    buffer = bytearray(RANGE_BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(path, "rb") as file:
+        while True:
+            read = file.readinto(buffer)  # type: ignore
+            if not read:
+                break
+            file_hash.update(view[:read])
+    return file_hash.hexdigest()
+
+
+def copy_file_hashed(
+    src: os.PathLike,
+    dst: os.PathLike,
+    progress: SharedVariable,
+    progress_lock: Optional[threading.Lock] = None,
+) -> str:
+    """
+    Copy the source into the destination and hash the data as it goes through,
+    so the source is only read once. The destination is flushed to the disk
+    before returning the hash of the source
+    """
+    report = _get_reporter(progress, progress_lock)
+    file_hash = new_hash()
+    buffer = bytearray(RANGE_BUFFER_SIZE)
+    view = memoryview(buffer)
+
+    with open(src, "rb") as fsrc:
+        with open(dst, "wb") as fdst:
+            while True:
+                read = fsrc.readinto(buffer)  # type: ignore
+                if not read:
+                    break
+                file_hash.update(view[:read])
+                fdst.write(view[:read])
+                report(read)
+
+            fdst.flush()
+            os.fsync(fdst.fileno())
+
+    shutil.copymode(src, dst)
+    return file_hash.hexdigest()
+
+
+def copy_file_verified(
+    src: os.PathLike,
+    dst: os.PathLike,
+    progress: SharedVariable,
+    progress_lock: Optional[threading.Lock] = None,
+) -> Dict[str, Any]:
+    """
+    Copy the source into the destination, and compare the hash of the destination
+    with the hash of the source computed during the copy.
+    Returns the manifest entry of the copied file
+    """
+    src_hash = copy_file_hashed(src, dst, progress, progress_lock)
+    if hash_file(dst) != src_hash:
+        raise OSError(f"The copy of {src} to {dst} is corrupted: The hashes differ")
+
+    return create_manifest_entry(src, dst, src_hash, HASH_ALGORITHM)
+
+
+def is_synced(
+    src: os.PathLike,
+    dst: os.PathLike,
+    manifest_entry: Optional[Dict[str, Any]] = None,
+    compare_hash: bool = False,
+) -> bool:
+    """
+    Test if the destination already holds the content of the source:
+    the manifest says so, or the sizes and the modification times are the same.
+    With compare_hash, the files that have the same size but not the same modification time
+    are compared by hash, the hash of the destination is taken from the manifest if still valid
+    """
+    src_stat, dst_stat = os.stat(src), os.stat(dst)
+    if src_stat.st_size != dst_stat.st_size:
+        return False
+    if is_entry_current(manifest_entry, src, dst):
+        return True
+    if abs(src_stat.st_mtime - dst_stat.st_mtime) <= MTIME_TOLERANCE:
+        return True
+    if not compare_hash:
+        return False
+
+    dst_hash = None
+    if (
+        manifest_entry is not None
+        and manifest_entry.get("algorithm") == HASH_ALGORITHM
+        and manifest_entry.get("size") == dst_stat.st_size
+        and manifest_entry.get("mtime") == dst_stat.st_mtime_ns
+    ):
+        dst_hash = manifest_entry.get("hash")
+    if dst_hash is None:
+        dst_hash = hash_file(dst)
+
+    return hash_file(src) == dst_hash
@@ -0,0 +1,143 @@
+"""
+@author: TD gang
+
+Staging of the removed files into a trash directory. The files are renamed into a trash
+directory next to them, the rename is instant and atomic since it stays on the same filesystem.
+The removal can be undone until the trash of the action is purged, once the action
+is closed. The trash left behind by the crashed sessions is purged after a retention
+"""
+
+import os
+import pathlib
+import shutil
+import time
+from typing import Iterable, List, Optional, Tuple, Union
+
+from silex_client.utils.log import logger
+
+#: Name of the trash directories, created in the directory of the removed files
+TRASH_NAME = ".silex_trash"
+#: Amount of seconds the staged files are kept, the value can be overriden
+#: with the environment variable SILEX_TRASH_RETENTION
+TRASH_RETENTION = 24 * 60 * 60
+
+PathLike = Union[str, pathlib.Path]
+
+
+def get_trash_retention() -> int:
+    trash_retention = os.getenv("SILEX_TRASH_RETENTION", str(TRASH_RETENTION))
+    return int(trash_retention) if trash_retention.isdigit() else TRASH_RETENTION
+
+
+def get_trash_directory(path: PathLike, trash_id: str) -> pathlib.Path:
+    """
+    Get the trash directory of the given file, each action has its own
+    """
+    return pathlib.Path(path).parent / TRASH_NAME / trash_id
+
+
+def stage_paths(
+    paths: Iterable[PathLike], trash_id: str
+) -> List[Tuple[pathlib.Path, pathlib.Path]]:
+    """
+    Move the given files or directories into their trash directory.
+    Returns the original and the staged path of each file, to restore them
+    """
+    staged_paths: List[Tuple[pathlib.Path, pathlib.Path]] = []
+    for path in paths:
+        path = pathlib.Path(path)
+        trash_directory = get_trash_directory(path, trash_id)
+        os.makedirs(trash_directory, exist_ok=True)
+
+        staged_path = trash_directory / path.name
+        # The same name can be removed twice by the same action
+        index = 1
+        while os.path.lexists(staged_path):
+            staged_path = trash_directory / f"{path.name}.{index}"
+            index += 1
+
+        os.replace(path, staged_path)
+        staged_paths.append((path, staged_path))
+
+    return staged_paths
+
+
+def restore_paths(staged_paths: Iterable[Tuple[PathLike, PathLike]]) -> None:
+    """
+    Move the staged files back to their original location,
+    the trash directories are removed once empty
+    """
+    trash_directories = set()
+    for path, staged_path in staged_paths:
+        if os.path.lexists(path):
+            raise FileExistsError(f"Could not restore {path}: The path already exists")
+
+        os.replace(staged_path, path)
+        trash_directories.add(pathlib.Path(staged_path).parent)
+
+    for trash_directory in trash_directories:
+        for directory in [trash_directory, trash_directory.parent]:
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+
+
+def purge_trash(
+    trash_roots: Iterable[PathLike], retention: Optional[int] = None
+) -> None:
+    """
+    Delete the content of the given trash directories older than the retention.
+    Meant to be executed in the background, the errors are only logged
+    """
+    retention = get_trash_retention() if retention is None else retention
+    limit = time.time() - retention
+
+    for trash_root in trash_roots:
+        try:
+            with os.scandir(trash_root) as entries:
+                expired = [
+                    entry.path
+                    for entry in entries
+                    if entry.stat(follow_symlinks=False).st_mtime < limit
+                ]
+        except OSError:
+            continue
+
+        for trash_directory in expired:
+            logger.debug("Purging the trash directory %s", trash_directory)
+            shutil.rmtree(
+                trash_directory,
+                onerror=lambda _, path, error: logger.warning(
+                    "Could not purge %s: %s", path, error[1]
+                ),
+            )
+
+        try:
+            os.rmdir(trash_root)
+        except OSError:
+            pass
+
+
+def purge_action_trash(trash_roots: Iterable[PathLike], trash_id: str) -> None:
+    """
+    Delete the trash directories of the given action, once its removals can't be undone.
+    Meant to be executed in the background, the errors are only logged
+    """
+    for trash_root in trash_roots:
+        trash_directory = pathlib.Path(trash_root) / trash_id
+        if not os.path.lexists(trash_directory):
+            continue
+
+        logger.debug("Purging the trash directory %s", trash_directory)
+        shutil.rmtree(
+            trash_directory,
+            onerror=lambda _, path, error: logger.warning(
+                "Could not purge %s: %s", path, error[1]
+            ),
+        )
+
+        try:
+            os.rmdir(trash_root)
+        except OSError:
+            pass
@@ -2,6 +2,10 @@
 Test commands
 """
 
+import asyncio
+import time
+
+from silex_client.action.command_base import CommandBase
 from silex_client.utils.log import logger
 
 
@@ -17,3 +21,22 @@ def log(string="testing test.command.log"):
     Simple logger that just print
     """
     logger.info(string)
+
+
+class Sleep(CommandBase):
+    """
+    Wait for the given time, and record in the action's store when the command was executed
+    """
+
+    parameters = {
+        "duration": {"label": "Duration", "type": float, "value": 0.1},
+    }
+
+    @CommandBase.conform_command()
+    async def __call__(self, parameters, action_query, logger):
+        start_time = time.perf_counter()
+        await asyncio.sleep(parameters["duration"])
+        step = self.command_buffer.parent
+        action_query.store.setdefault("sleep_intervals", []).append(
+            (step.branches, self.command_buffer.label, start_time, time.perf_counter())
+        )
@@ -0,0 +1,59 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+
+
+def create_command(command_class):
+    """
+    Create a command without action, its buffer only has what the command reads
+    """
+    command_buffer = SimpleNamespace(
+        label=command_class.__name__,
+        parameters={},
+        require_prompt=lambda: False,
+        status=None,
+        output_result=None,
+        progress=None,
+    )
+    return command_class(command_buffer)
+
+
+def create_action_query():
+    """
+    Fake action query, the updates of the websocket are ignored
+    and the functions sent to the process pool are called directly
+    """
+
+    async def async_update_websocket(*args, **kwargs):
+        return None
+
+    async def run_in_process(function, *args, **kwargs):
+        return function(*args, **kwargs)
+
+    return SimpleNamespace(
+        buffer=SimpleNamespace(uuid="action"),
+        context_metadata={},
+        store={},
+        trash_roots=set(),
+        async_update_websocket=async_update_websocket,
+        event_loop=SimpleNamespace(run_in_process=run_in_process),
+    )
+
+
+def execute_command(command_class, action_query=None, **parameters):
+    """
+    Execute the command with its default parameters, overriden by the given ones
+    """
+    command = create_command(command_class)
+    command_parameters = {
+        name: parameter["value"] for name, parameter in command.parameters.items()
+    }
+    command_parameters.update(parameters)
+    action_query = action_query or create_action_query()
+    return asyncio.run(
+        command(
+            command_parameters,
+            action_query,
+            logging.getLogger(command_class.__name__),
+        )
+    )
@@ -4,11 +4,15 @@
 Unit testing functions for the class ActionQuery
 """
 
+import pathlib
+import time
+
 import pytest
 
 from silex_client.action.action_query import ActionQuery
 from silex_client.core.context import Context
 from silex_client.resolve.config import Config
+from silex_client.utils import trash
 from silex_client.utils.enums import Status
 
 from .test_config import dummy_config
@@ -63,3 +67,84 @@ def test_execute_tester_action(dummy_context: Context):
     future.result()
 
     assert action.status is Status.COMPLETED
+
+
+def test_execute_foo_action_parallel(dummy_config: Config, dummy_context: Context):
+    """
+    Test the execution of all the commands in the 'foo' action with the parallel scheduler
+    """
+    action = ActionQuery("foo", category="test")
+    assert hasattr(action, "buffer")
+
+    action.max_parallelism = 4
+    future = action.execute(batch=True)
+
+    # Let the execution of the action happen in the event loop thread
+    future.result()
+
+    assert action.status is Status.COMPLETED
+    assert action.current_command_index == len(action.commands) - 1
+
+
+def test_redo_action_parallel(dummy_config: Config, dummy_context: Context):
+    """
+    Test that the completed commands are not executed again when the action
+    is executed again after an error with the parallel scheduler
+    """
+    action = ActionQuery("iterate", category="test")
+    action.max_parallelism = 4
+    action.execute(batch=True).result()
+    assert action.status is Status.COMPLETED
+    steps_count = len(action.steps)
+    assert len(action.store["sleep_intervals"]) == 6
+
+    # Simulate an error on the last command and execute the action again
+    action.commands[-1].status = Status.ERROR
+    # This is what a redo does on an action that is not running anymore
+    action.execute(batch=True).result()
+
+    assert action.status is Status.COMPLETED
+    # The IterateAction must not insert its steps a second time
+    assert len(action.steps) == steps_count
+    assert len(action.store["sleep_intervals"]) == 7
+
+
+def test_closed_action_purge_trash(
+    tmp_path: pathlib.Path, dummy_config: Config, dummy_context: Context
+):
+    """
+    Test that the files moved to the trash by an action are deleted once it is closed
+    """
+    action = ActionQuery("foo", category="test")
+    (tmp_path / "file.exr").write_bytes(b"content")
+    trash.stage_paths([tmp_path / "file.exr"], action.buffer.uuid)
+    action.trash_roots.add(tmp_path / trash.TRASH_NAME)
+
+    action.closed.set_result(True)
+    deadline = time.perf_counter() + 2
+    while (tmp_path / trash.TRASH_NAME).exists() and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    assert not (tmp_path / trash.TRASH_NAME).exists()
+    assert action.trash_roots == set()
+
+
+def test_execute_iterate_action_parallel(dummy_config: Config, dummy_context: Context):
+    """
+    Test that the branches of an IterateAction are executed concurrently
+    with the parallel scheduler, and the steps of each branch in order
+    """
+    action = ActionQuery("iterate", category="test")
+    action.max_parallelism = 4
+    future = action.execute(batch=True)
+    future.result()
+
+    assert action.status is Status.COMPLETED
+    branches = {}
+    for step_branches, label, start, end in action.store["sleep_intervals"]:
+        branches.setdefault(tuple(step_branches), {})[label] = (start, end)
+    assert len(branches) == 3
+
+    for branch in branches.values():
+        assert branch["second"][0] >= branch["first"][1]
+    first_intervals = sorted(branch["first"] for branch in branches.values())
+    assert first_intervals[1][0] < first_intervals[0][1]
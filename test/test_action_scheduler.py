@@ -0,0 +1,110 @@
+"""
+@author: TD gang
+
+Unit testing functions for the module core.action_scheduler
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from silex_client.core.action_scheduler import ActionScheduler
+
+
+def create_action(uuid: str, batch: bool = False, active_commands: int = 1):
+    return SimpleNamespace(
+        name=uuid,
+        batch=batch,
+        buffer=SimpleNamespace(uuid=uuid),
+        active_commands=active_commands,
+    )
+
+
+def test_action_scheduler_priority():
+    """
+    Test that the actions wait for a free slot, the interactive ones first
+    """
+    scheduler = ActionScheduler(max_running=1)
+    order = []
+
+    async def run_action(action):
+        async with scheduler.running(action):
+            order.append(action.name)
+            await asyncio.sleep(0.01)
+
+    async def run_all():
+        first = asyncio.ensure_future(run_action(create_action("first")))
+        await asyncio.sleep(0)
+        await asyncio.gather(
+            first,
+            run_action(create_action("batch", batch=True)),
+            run_action(create_action("interactive")),
+        )
+
+    asyncio.run(run_all())
+
+    assert order == ["first", "interactive", "batch"]
+    assert scheduler.stats()["admitted"] == 3
+    assert not scheduler.stats()["running"]
+
+
+def test_action_scheduler_suspend():
+    """
+    Test that a suspended action gives its slot to the queued actions
+    """
+    scheduler = ActionScheduler(max_running=1)
+    waiting, queued = create_action("waiting"), create_action("queued")
+    order = []
+
+    async def run_all():
+        async def wait_user():
+            async with scheduler.running(waiting):
+                async with scheduler.suspend(waiting):
+                    await asyncio.sleep(0.01)
+                order.append("waiting")
+
+        async def run_queued():
+            async with scheduler.running(queued):
+                order.append("queued")
+
+        await asyncio.gather(wait_user(), run_queued())
+
+    asyncio.run(run_all())
+    assert order == ["queued", "waiting"]
+
+
+def test_action_scheduler_suspend_parallel():
+    """
+    Test that an action keeps its slot while one of its commands is still running
+    """
+    scheduler = ActionScheduler(max_running=1)
+    parallel, queued = create_action("parallel", active_commands=2), create_action(
+        "queued"
+    )
+    order = []
+
+    async def run_all():
+        async def wait_user():
+            async with scheduler.suspend(parallel):
+                await asyncio.sleep(0.02)
+            order.append("prompt")
+
+        async def run_command():
+            await asyncio.sleep(0.01)
+            order.append("command")
+            parallel.active_commands = 1
+            scheduler.release_if_suspended(parallel)
+
+        async def run_parallel():
+            async with scheduler.running(parallel):
+                await asyncio.gather(wait_user(), run_command())
+                order.append("parallel")
+
+        async def run_queued():
+            await asyncio.sleep(0)
+            async with scheduler.running(queued):
+                order.append("queued")
+
+        await asyncio.gather(run_parallel(), run_queued())
+
+    asyncio.run(run_all())
+    assert order == ["command", "queued", "prompt", "parallel"]
@@ -0,0 +1,144 @@
+"""
+@author: TD gang
+
+Unit testing functions for the command ConformTransfer
+"""
+
+import pathlib
+
+import pytest
+
+import silex_client
+import silex_client.commands.conform_transfer as conform_transfer_module
+from silex_client.commands.conform_transfer import ConformTransfer
+from silex_client.resolve.config import Config
+from silex_client.utils.enums import ConflictBehaviour
+from silex_client.utils.path_sequence import PathSequence
+
+from .mocks.command import execute_command
+
+
+def create_sources(directory: pathlib.Path, count: int = 3):
+    directory.mkdir(parents=True, exist_ok=True)
+    src_paths = [directory / f"source.{index:04d}.exr" for index in range(count)]
+    for index, src_path in enumerate(src_paths):
+        src_path.write_bytes(f"source {index}".encode())
+    return src_paths
+
+
+def execute_transfer(src_paths, dst_dir, **parameters):
+    names = [f"conform.{index:04d}.exr" for index in range(len(src_paths))]
+    return execute_command(
+        ConformTransfer,
+        src=PathSequence(src_paths),
+        dst=dst_dir,
+        name=names,
+        **parameters,
+    )
+
+
+def test_conform_transfer(tmp_path: pathlib.Path):
+    """
+    Test that the files are copied under their new name, with the extension of the source,
+    and that no temporary file is left
+    """
+    src_paths = create_sources(tmp_path / "src")
+    output = execute_transfer(src_paths, tmp_path / "dst")
+
+    new_paths = [tmp_path / "dst" / f"conform.{index:04d}.exr" for index in range(3)]
+    assert output["new_paths"] == new_paths
+    assert sorted((tmp_path / "dst").iterdir()) == new_paths
+    for src_path, new_path in zip(src_paths, new_paths):
+        assert new_path.read_bytes() == src_path.read_bytes()
+
+
+def test_conform_transfer_replace(tmp_path: pathlib.Path, monkeypatch):
+    """
+    Test that an existing file is replaced by a rename, and is left untouched
+    if the copy fails
+    """
+    src_paths = create_sources(tmp_path / "src", 1)
+    dst_path = tmp_path / "dst" / "conform.0000.exr"
+    dst_path.parent.mkdir()
+    dst_path.write_bytes(b"existing")
+    existing_inode = dst_path.stat().st_ino
+
+    def failing_copy(src, dst, progress, progress_lock=None):
+        pathlib.Path(dst).write_bytes(b"partial")
+        raise OSError("Disk full")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(conform_transfer_module, "copy_file", failing_copy)
+        with pytest.raises(OSError):
+            execute_transfer(src_paths, tmp_path / "dst")
+    assert dst_path.read_bytes() == b"existing"
+    assert list((tmp_path / "dst").iterdir()) == [dst_path]
+
+    execute_transfer(src_paths, tmp_path / "dst")
+    assert dst_path.read_bytes() == b"source 0"
+    assert dst_path.stat().st_ino != existing_inode
+    assert list((tmp_path / "dst").iterdir()) == [dst_path]
+
+
+def test_conform_transfer_conflicts(tmp_path: pathlib.Path, monkeypatch):
+    """
+    Test that the conflicts are all resolved before the first copy starts
+    """
+    src_paths = create_sources(tmp_path / "src")
+    dst_dir = tmp_path / "dst"
+    dst_dir.mkdir()
+    for index in [0, 1]:
+        (dst_dir / f"conform.{index:04d}.exr").write_bytes(b"existing")
+    events = []
+    responses = [
+        (ConflictBehaviour.KEEP_EXISTING, "conform.0000"),
+        (ConflictBehaviour.RENAME, "renamed.0001"),
+    ]
+
+    async def prompt_override(command, file_path, action_query, current_name):
+        events.append(("prompt", file_path.name))
+        return responses.pop(0)
+
+    def copy_file(src, dst, progress, progress_lock=None):
+        events.append(("copy", src.name))
+        pathlib.Path(dst).write_bytes(src.read_bytes())
+
+    monkeypatch.setattr(conform_transfer_module, "prompt_override", prompt_override)
+    monkeypatch.setattr(conform_transfer_module, "copy_file", copy_file)
+    output = execute_transfer(src_paths, dst_dir, force=False)
+
+    assert events[:2] == [
+        ("prompt", "conform.0000.exr"),
+        ("prompt", "conform.0001.exr"),
+    ]
+    assert sorted(events[2:]) == [
+        ("copy", "source.0001.exr"),
+        ("copy", "source.0002.exr"),
+    ]
+    assert output["new_paths"] == [
+        dst_dir / "conform.0000.exr",
+        dst_dir / "renamed.0001.exr",
+        dst_dir / "conform.0002.exr",
+    ]
+    assert (dst_dir / "conform.0000.exr").read_bytes() == b"existing"
+    assert (dst_dir / "conform.0001.exr").read_bytes() == b"existing"
+    assert (dst_dir / "renamed.0001.exr").read_bytes() == b"source 1"
+
+
+def test_conform_output_cache():
+    """
+    Test that the cached output of the default conform is the output of the transfer
+    """
+    config_root = pathlib.Path(silex_client.__file__).parent / "config"
+    conform = Config([str(config_root)]).resolve_conform("exr")
+    commands = conform["exr"]["steps"]["conform"]["commands"]
+
+    value = commands["set_output_cache"]["parameters"]["value"]
+    assert (value.step, value.command, value.output_keys) == (
+        "conform",
+        "transfer",
+        ["new_paths"],
+    )
+    assert commands["transfer"]["path"] == (
+        "silex_client.commands.conform_transfer.ConformTransfer"
+    )
@@ -0,0 +1,134 @@
+"""
+@author: TD gang
+
+Unit testing functions for the command Copy
+"""
+
+import os
+import pathlib
+import shutil
+import threading
+import time
+
+import pytest
+
+import silex_client.commands.copy as copy_module
+from silex_client.commands.copy import Copy
+from silex_client.utils.enums import ConflictBehaviour
+from silex_client.utils.path_sequence import PathSequence
+
+from .mocks.command import create_action_query, execute_command
+
+
+def execute_copy(src_paths, dst_path, action_query=None, **parameters):
+    dst_path.mkdir(parents=True, exist_ok=True)
+    return execute_command(
+        Copy,
+        action_query,
+        src=PathSequence(src_paths),
+        dst=PathSequence([dst_path]),
+        **parameters,
+    )
+
+
+def create_files(directory: pathlib.Path, count: int, content: bytes = b"content"):
+    directory.mkdir(parents=True, exist_ok=True)
+    file_paths = [directory / f"file.{index:04d}.exr" for index in range(count)]
+    for file_path in file_paths:
+        file_path.write_bytes(content)
+    return file_paths
+
+
+def test_copy_concurrency(tmp_path: pathlib.Path, monkeypatch):
+    """
+    Test that the files are copied at the same time, at most max_in_flight at once
+    """
+    src_paths = create_files(tmp_path / "src", 12)
+    lock = threading.Lock()
+    in_flight = {"current": 0, "max": 0}
+
+    def slow_copy(src, dst, progress, progress_lock=None, *args):
+        with lock:
+            in_flight["current"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["current"])
+        time.sleep(0.05)
+        shutil.copyfile(src, dst)
+        with lock:
+            in_flight["current"] -= 1
+
+    monkeypatch.setattr(copy_module, "copy_file", slow_copy)
+    output = execute_copy(src_paths, tmp_path / "dst", max_in_flight=4)
+
+    assert in_flight["max"] == 4
+    assert output["transferred_files"] == 12
+    assert all((tmp_path / "dst" / path.name).exists() for path in src_paths)
+
+
+def test_copy_cancellation(tmp_path: pathlib.Path, monkeypatch):
+    """
+    Test that the remaining copies are cancelled when one of them fails
+    """
+    src_paths = create_files(tmp_path / "src", 20)
+    started = []
+
+    def failing_copy(src, dst, progress, progress_lock=None, *args):
+        started.append(src)
+        if len(started) == 1:
+            raise OSError("Disk full")
+        time.sleep(0.05)
+        shutil.copyfile(src, dst)
+
+    monkeypatch.setattr(copy_module, "copy_file", failing_copy)
+    with pytest.raises(OSError):
+        execute_copy(src_paths, tmp_path / "dst", max_in_flight=2)
+
+    # Let the copies that were already running finish
+    time.sleep(0.2)
+    assert len(started) < len(src_paths)
+    assert len(list((tmp_path / "dst").iterdir())) < len(src_paths)
+
+
+@pytest.mark.parametrize("verify", [False, True])
+def test_copy_sync(tmp_path: pathlib.Path, verify: bool):
+    """
+    Test that the identical files are skipped in sync mode, and the others are replaced
+    """
+    src_paths = create_files(tmp_path / "src", 4)
+    for src_path in src_paths:
+        os.utime(src_path, (1000000000, 1000000000))
+    execute_copy(src_paths, tmp_path / "dst", sync=True, verify=verify)
+    assert (tmp_path / "dst" / src_paths[0].name).stat().st_mtime == 1000000000
+
+    # The synced copies keep the modification time, a second sync has nothing to copy
+    output = execute_copy(src_paths, tmp_path / "dst", sync=True)
+    assert output["skipped_files"] == 4
+    assert output["transferred_files"] == 0
+
+    src_paths[0].write_bytes(b"modified content")
+    output = execute_copy(src_paths, tmp_path / "dst", sync=True)
+    assert output["skipped_files"] == 3
+    assert output["transferred_files"] == 1
+    assert (tmp_path / "dst" / src_paths[0].name).read_bytes() == b"modified content"
+
+
+def test_copy_sync_prompt(tmp_path: pathlib.Path, monkeypatch):
+    """
+    Test that the sync chosen in the prompt is not stored where the other commands
+    read the conflict behaviour, they don't handle it
+    """
+    src_paths = create_files(tmp_path / "src", 3)
+    execute_copy(src_paths, tmp_path / "dst")
+    prompts = []
+
+    async def prompt_sync(command, file_path, action_query, sync=False):
+        prompts.append(sync)
+        return ConflictBehaviour.SYNC
+
+    monkeypatch.setattr(copy_module, "prompt_override", prompt_sync)
+    action_query = create_action_query()
+    output = execute_copy(src_paths, tmp_path / "dst", action_query, force=False)
+
+    assert prompts == [True]
+    assert output["skipped_files"] == 3
+    assert "file_conflict_behaviour" not in action_query.store
+    assert action_query.store["copy_conflict_behaviour"] is ConflictBehaviour.SYNC
@@ -0,0 +1,122 @@
+"""
+@author: TD gang
+
+Unit testing functions for the module utils.dedup
+"""
+
+import os
+import pathlib
+import stat
+import time
+
+import pytest
+
+from silex_client.utils import dedup, transfer
+from silex_client.utils.datatypes import SharedVariable
+
+
+@pytest.fixture
+def store(tmp_path: pathlib.Path, monkeypatch) -> dedup.ContentStore:
+    """
+    Store without reflinks, the contents are hardlinked
+    """
+    monkeypatch.setattr(dedup, "copy_file_reflink", lambda fsrc, fdst: False)
+    return dedup.ContentStore(tmp_path / "store")
+
+
+def count_objects(store: dedup.ContentStore) -> int:
+    return sum(len(files) for _, _, files in os.walk(store.root / "objects"))
+
+
+def test_publish(tmp_path: pathlib.Path, store: dedup.ContentStore, monkeypatch):
+    """
+    Test that an identical content is only stored once, and that the source
+    is not copied when its content is already stored
+    """
+    src = tmp_path / "src.exr"
+    src.write_bytes(b"content")
+    progress = SharedVariable(0)
+    assert store.publish(src, tmp_path / "a.exr", progress) == ("hardlink", False)
+    assert progress.value == len(b"content")
+
+    def failing_copy(*args, **kwargs):
+        raise AssertionError("The stored content must not be copied")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(dedup, "copy_file_hashed", failing_copy)
+        progress = SharedVariable(0)
+        assert store.publish(src, tmp_path / "b.exr", progress) == (
+            "hardlink",
+            True,
+        )
+    assert progress.value == len(b"content")
+    assert (tmp_path / "a.exr").read_bytes() == b"content"
+    assert (tmp_path / "b.exr").read_bytes() == b"content"
+    assert (tmp_path / "b.exr").stat().st_nlink == 3
+    assert count_objects(store) == 1
+    assert list((store.root / "tmp").iterdir()) == []
+    assert (store.hits, store.misses) == (1, 1)
+    assert store.saved_bytes == len(b"content")
+
+
+def test_publish_read_only(tmp_path: pathlib.Path, store: dedup.ContentStore):
+    """
+    Test that the hardlinked files are read-only, they share their content
+    with the store and the other files
+    """
+    src = tmp_path / "src.exr"
+    src.write_bytes(b"content")
+    store.publish(src, tmp_path / "a.exr", SharedVariable(0))
+
+    file_stat = (tmp_path / "a.exr").stat()
+    assert file_stat.st_nlink == 2
+    assert not file_stat.st_mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)
+
+
+def test_publish_collected(tmp_path: pathlib.Path, store: dedup.ContentStore):
+    """
+    Test that a content deleted by the garbage collector while being published
+    is stored again
+    """
+    src = tmp_path / "src.exr"
+    src.write_bytes(b"content")
+    store.publish(src, tmp_path / "a.exr", SharedVariable(0))
+    materialize = store.materialize
+
+    def collect_and_materialize(key, dst):
+        os.remove(store.get_object_path(key))
+        store.materialize = materialize
+        return materialize(key, dst)
+
+    store.materialize = collect_and_materialize
+    assert store.publish(src, tmp_path / "b.exr", SharedVariable(0)) == (
+        "hardlink",
+        False,
+    )
+    assert (tmp_path / "b.exr").read_bytes() == b"content"
+    assert count_objects(store) == 1
+
+
+def test_collect_garbage(tmp_path: pathlib.Path, store: dedup.ContentStore):
+    """
+    Test that only the contents that are not linked and not used recently are deleted
+    """
+    expired = time.time() - 2 * 60 * 60
+    for name in ["linked", "unlinked", "recent"]:
+        src = tmp_path / f"{name}.exr"
+        src.write_bytes(name.encode())
+        published = tmp_path / f"{name}_published.exr"
+        store.publish(src, published, SharedVariable(0))
+        key = transfer.hash_file(src)
+        if name != "linked":
+            os.remove(published)
+        if name != "recent":
+            os.utime(store.get_object_path(key), (expired, expired))
+    temp_path = store.root / "tmp" / "crashed"
+    temp_path.write_bytes(b"crashed")
+    os.utime(temp_path, (expired, expired))
+
+    assert store.collect_garbage(retention=60 * 60) == (1, len(b"unlinked"))
+    assert count_objects(store) == 2
+    assert not temp_path.exists()
+    assert (tmp_path / "linked_published.exr").read_bytes() == b"linked"
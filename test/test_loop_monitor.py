@@ -0,0 +1,108 @@
+"""
+@author: TD gang
+
+Unit testing functions for the module core.loop_monitor
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from types import SimpleNamespace
+
+from silex_client.core.event_loop import EventLoop
+from silex_client.core.loop_monitor import LatencyHistogram, LoopMonitor
+
+
+def test_latency_histogram():
+    """
+    Test that the latencies are counted in the right buckets
+    """
+    histogram = LatencyHistogram()
+    for latency in [0.0005, 0.003, 0.003, 10.0]:
+        histogram.record(latency)
+
+    stats = histogram.stats()
+    assert stats["count"] == 4
+    assert stats["max"] == 10.0
+    assert stats["buckets"]["<=0.001"] == 1
+    assert stats["buckets"]["<=0.005"] == 2
+    assert stats["buckets"][">5.0"] == 1
+
+
+def test_loop_monitor_task_factory():
+    """
+    Test that the tasks created with the extra arguments of the recent python versions
+    are timed and still receive these arguments
+    """
+    loop = asyncio.new_event_loop()
+    monitor = LoopMonitor(SimpleNamespace(loop=loop))
+    loop.set_task_factory(monitor.task_factory)
+    variable = contextvars.ContextVar("variable", default="unset")
+
+    async def read_variable():
+        return variable.get()
+
+    context = contextvars.copy_context()
+    context.run(variable.set, "set")
+    try:
+        task = monitor.task_factory(loop, read_variable(), context=context)
+        assert loop.run_until_complete(task) == "set"
+        assert loop.run_until_complete(loop.create_task(read_variable())) == "unset"
+    finally:
+        loop.close()
+
+    task_latencies = monitor.stats()["task_latencies"]
+    assert sum(histogram["count"] for histogram in task_latencies.values()) == 2
+
+
+def test_loop_monitor_slow_callback():
+    """
+    Test that a callback blocking the loop is reported by the watchdog
+    """
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    monitor = LoopMonitor(SimpleNamespace(loop=loop, thread=thread), 0.05)
+    thread.start()
+    monitor.start()
+    try:
+        time.sleep(0.15)
+        loop.call_soon_threadsafe(time.sleep, 0.3)
+        time.sleep(0.5)
+    finally:
+        monitor.stop()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+    stats = monitor.stats()
+    assert stats["slow_callback_count"] >= 1
+    assert stats["loop_lag"]["max"] >= 0.2
+
+
+def test_loop_monitor_command_loop(monkeypatch):
+    """
+    Test that the command loop is monitored too, apart from the event loop
+    """
+    monkeypatch.setenv("SILEX_LOOP_MONITOR", "1")
+    monkeypatch.setenv("SILEX_SLOW_CALLBACK_MS", "50")
+    monkeypatch.setenv("SILEX_COMMAND_LOOP", "1")
+    monkeypatch.delenv("SILEX_LOOP_STATS_FILE", raising=False)
+    event_loop = EventLoop()
+
+    async def block_loop():
+        time.sleep(0.3)
+
+    event_loop.start()
+    try:
+        time.sleep(0.15)
+        event_loop.register_command_task(block_loop()).result()
+    finally:
+        event_loop.stop()
+
+    command_stats = event_loop.stats()["command_loop"]
+    assert command_stats["slow_callback_count"] >= 1
+    assert command_stats["register_latency"]["count"] == 1
+    assert any(
+        histogram["count"] for histogram in command_stats["task_latencies"].values()
+    )
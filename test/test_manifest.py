@@ -0,0 +1,52 @@
+"""
+@author: TD gang
+
+Unit testing functions for the module utils.manifest
+"""
+
+import pathlib
+from concurrent import futures
+
+from silex_client.utils import manifest
+
+
+def test_update_manifest(tmp_path: pathlib.Path):
+    """
+    Test that the entries are added to the existing ones, and read back
+    """
+    manifest.update_manifest(tmp_path, {"a.exr": {"hash": "a"}})
+    manifest.update_manifest(tmp_path, {"b.exr": {"hash": "b"}})
+    manifest.update_manifest(tmp_path, {"a.exr": {"hash": "c"}})
+
+    assert manifest.read_manifest(tmp_path) == {
+        "a.exr": {"hash": "c"},
+        "b.exr": {"hash": "b"},
+    }
+    assert [path.name for path in tmp_path.iterdir()] == [manifest.MANIFEST_NAME]
+
+
+def test_update_manifest_concurrent(tmp_path: pathlib.Path):
+    """
+    Test that no entries are lost when the manifest is updated from several threads
+    """
+    with futures.ThreadPoolExecutor(max_workers=8) as executor:
+        for index in range(64):
+            executor.submit(
+                manifest.update_manifest, tmp_path, {f"{index}.exr": {"hash": index}}
+            )
+
+    assert len(manifest.read_manifest(tmp_path)) == 64
+    assert [path.name for path in tmp_path.iterdir()] == [manifest.MANIFEST_NAME]
+
+
+def test_read_manifest_invalid(tmp_path: pathlib.Path):
+    """
+    Test that a missing, corrupted or outdated manifest is considered empty
+    """
+    assert manifest.read_manifest(tmp_path) == {}
+    manifest.get_manifest_path(tmp_path).write_text("{", encoding="utf-8")
+    assert manifest.read_manifest(tmp_path) == {}
+    manifest.get_manifest_path(tmp_path).write_text(
+        '{"version": 0, "files": {"a.exr": {}}}', encoding="utf-8"
+    )
+    assert manifest.read_manifest(tmp_path) == {}
@@ -0,0 +1,135 @@
+"""
+@author: TD gang
+
+Unit testing functions for the command Move
+"""
+
+import os
+import pathlib
+
+import silex_client.commands.move as move_module
+from silex_client.commands.move import Move
+from silex_client.utils.enums import ConflictBehaviour
+
+from .mocks.command import create_action_query, execute_command
+
+
+class CrossDeviceOs:
+    """
+    The os module, except that the paths under the given root are on an other device
+    """
+
+    def __init__(self, root: pathlib.Path):
+        self.root = str(root)
+
+    def __getattr__(self, name):
+        return getattr(os, name)
+
+    def stat(self, path, *args, **kwargs):
+        result = os.stat(path, *args, **kwargs)
+        if not str(path).startswith(self.root):
+            return result
+        values = list(result[:10])
+        values[2] += 1
+        return os.stat_result(values)
+
+
+def create_sources(directory: pathlib.Path):
+    (directory / "folder" / "nested").mkdir(parents=True)
+    files = {
+        "file.exr": b"file",
+        "folder/a.exr": b"a",
+        "folder/nested/b.exr": b"b",
+    }
+    for name, content in files.items():
+        (directory / name).write_bytes(content)
+    return [directory / "file.exr", directory / "folder"], files
+
+
+def assert_moved(src: pathlib.Path, dst: pathlib.Path, files):
+    assert not any((src / name).exists() for name in files)
+    assert (dst / "file.exr").read_bytes() == b"file"
+    # The content of the source directories is moved, not the directories
+    assert (dst / "a.exr").read_bytes() == b"a"
+    assert (dst / "nested" / "b.exr").read_bytes() == b"b"
+
+
+def test_move_same_device(tmp_path: pathlib.Path):
+    """
+    Test that the moves on the same device are renames
+    """
+    src_paths, files = create_sources(tmp_path / "src")
+    output = execute_command(Move, src=src_paths, dst=tmp_path / "dst")
+
+    assert output["renamed_files"] == 3
+    assert output["transferred_files"] == 0
+    assert_moved(tmp_path / "src", tmp_path / "dst", files)
+
+
+def test_move_cross_device(tmp_path: pathlib.Path, monkeypatch):
+    """
+    Test that the moves to an other device are copied file by file,
+    and that the sources are removed once copied
+    """
+    src_paths, files = create_sources(tmp_path / "src")
+    monkeypatch.setattr(move_module, "os", CrossDeviceOs(tmp_path / "dst"))
+    output = execute_command(Move, src=src_paths, dst=tmp_path / "dst")
+
+    assert output["renamed_files"] == 0
+    assert output["transferred_files"] == 3
+    assert output["transferred_bytes"] == sum(map(len, files.values()))
+    assert_moved(tmp_path / "src", tmp_path / "dst", files)
+    assert not (tmp_path / "src" / "folder" / "nested").exists()
+
+
+def test_move_override(tmp_path: pathlib.Path, monkeypatch):
+    """
+    Test that the existing destination is replaced when the user chooses to override it,
+    and that the choice is stored for the next commands
+    """
+    src_paths, files = create_sources(tmp_path / "src")
+    (tmp_path / "dst").mkdir()
+    (tmp_path / "dst" / "old.exr").write_bytes(b"old")
+    prompts = []
+
+    async def prompt_override(command, file_path, action_query):
+        prompts.append(file_path)
+        return ConflictBehaviour.ALWAYS_OVERRIDE
+
+    monkeypatch.setattr(move_module, "prompt_override", prompt_override)
+    action_query = create_action_query()
+    execute_command(
+        Move, action_query, src=src_paths, dst=tmp_path / "dst", force=False
+    )
+
+    assert prompts == [tmp_path / "dst"]
+    assert action_query.store["file_conflict_behaviour"] is (
+        ConflictBehaviour.ALWAYS_OVERRIDE
+    )
+    assert not (tmp_path / "dst" / "old.exr").exists()
+    assert_moved(tmp_path / "src", tmp_path / "dst", files)
+
+
+def test_move_keep_existing(tmp_path: pathlib.Path, monkeypatch):
+    """
+    Test that the existing destination is kept when the user chooses to,
+    the sources are then removed without being moved
+    """
+    src_paths, _ = create_sources(tmp_path / "src")
+    (tmp_path / "dst").mkdir()
+    (tmp_path / "dst" / "old.exr").write_bytes(b"old")
+
+    async def prompt_override(command, file_path, action_query):
+        return ConflictBehaviour.KEEP_EXISTING
+
+    monkeypatch.setattr(move_module, "prompt_override", prompt_override)
+    action_query = create_action_query()
+    output = execute_command(
+        Move, action_query, src=src_paths, dst=tmp_path / "dst", force=False
+    )
+
+    assert output["renamed_files"] == 0
+    assert output["transferred_files"] == 0
+    assert "file_conflict_behaviour" not in action_query.store
+    assert (tmp_path / "dst" / "old.exr").read_bytes() == b"old"
+    assert not any(path.exists() for path in src_paths)
@@ -0,0 +1,65 @@
+"""
+@author: TD gang
+
+Unit testing functions for the module utils.path_sequence
+"""
+
+import pathlib
+
+import fileseq
+
+from silex_client.utils.parameter_types import (
+    ListParameterMeta,
+    PathSequenceParameterMeta,
+)
+from silex_client.utils.path_sequence import PathSequence
+
+
+def test_path_sequence_order():
+    """
+    Test that the paths are grouped into sequences without changing their order
+    """
+    paths = [pathlib.Path(f"/render/beauty.{frame:04d}.exr") for frame in range(1, 101)]
+    paths += [
+        pathlib.Path("/render/beauty.exr"),
+        pathlib.Path("/render/beauty.0050.exr"),
+    ]
+
+    path_sequence = PathSequence(paths)
+    assert len(path_sequence.records) == 3
+    assert path_sequence == paths
+    assert path_sequence[99] == paths[99] and path_sequence[-1] == paths[-1]
+    assert str(path_sequence.sequences()[0]) == "/render/beauty.1-100#.exr"
+
+
+def test_path_sequence_unpadded():
+    """
+    Test that the unpadded frames get the padding of their smallest frame, like fileseq
+    """
+    paths = [pathlib.Path(f"/render/shot.{frame}.exr") for frame in range(1001, 1011)]
+    path_sequence = PathSequence(paths)
+
+    assert path_sequence == paths
+    assert str(path_sequence.sequences()[0]) == "/render/shot.1001-1010#.exr"
+    assert str(path_sequence.sequences()[0]) == str(
+        fileseq.findSequencesInList([str(path) for path in paths])[0]
+    )
+
+    paths = [pathlib.Path(f"/render/shot.{frame}.exr") for frame in range(8, 12)]
+    assert str(PathSequence(paths).sequences()[0]) == "/render/shot.8-11@.exr"
+
+
+def test_path_sequence_parameter():
+    """
+    Test that the file sequences are accepted without expanding them,
+    and expanded by the list parameters
+    """
+    sequence = fileseq.FileSequence("/render/beauty.1001-1100#.exr")
+    parameter_type = PathSequenceParameterMeta()
+    path_sequence = parameter_type(PathSequence(sequence))
+
+    assert isinstance(path_sequence, PathSequence)
+    assert len(path_sequence) == 100
+    assert ListParameterMeta(pathlib.Path)(path_sequence) == [
+        pathlib.Path(str(path)) for path in sequence
+    ]
@@ -0,0 +1,135 @@
+"""
+@author: TD gang
+
+Unit testing functions for the command Remove and the module utils.trash
+"""
+
+import asyncio
+import logging
+import os
+import pathlib
+import time
+
+import pytest
+
+import silex_client.commands.remove as remove_module
+from silex_client.commands.remove import Remove
+from silex_client.utils import trash
+
+from .mocks.command import create_action_query, create_command, execute_command
+
+
+def create_tree(directory: pathlib.Path, count: int = 5):
+    (directory / "nested").mkdir(parents=True)
+    for index in range(count):
+        (directory / f"file.{index}.exr").write_bytes(b"content")
+    (directory / "nested" / "file.exr").write_bytes(b"content")
+    return directory
+
+
+def test_list_removals_chunks(tmp_path: pathlib.Path, monkeypatch):
+    """
+    Test that the files of a large directory are split into chunks
+    """
+    directory = create_tree(tmp_path / "folder", 5)
+    monkeypatch.setattr(remove_module, "REMOVE_CHUNK_SIZE", 2)
+
+    file_chunks, directories = Remove.list_removals([directory])
+
+    assert sorted(len(files) for files in file_chunks) == [1, 1, 2, 2]
+    assert all(len({path.parent for path in files}) == 1 for files in file_chunks)
+    assert sum(len(files) for files in file_chunks) == 6
+    assert directories == [directory, directory / "nested"]
+
+
+def test_remove(tmp_path: pathlib.Path, monkeypatch):
+    """
+    Test that the files and the directories are removed
+    """
+    directory = create_tree(tmp_path / "folder")
+    (tmp_path / "file.exr").write_bytes(b"content")
+    monkeypatch.setattr(remove_module, "REMOVE_CHUNK_SIZE", 2)
+
+    output = execute_command(Remove, file_path=[directory, tmp_path / "file.exr"])
+
+    assert output == {"staged_paths": []}
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_remove_staged_and_undo(tmp_path: pathlib.Path):
+    """
+    Test that the staged files are moved to the trash, and restored by the undo
+    """
+    directory = create_tree(tmp_path / "folder")
+    (tmp_path / "file.exr").write_bytes(b"content")
+    file_paths = [directory, tmp_path / "file.exr"]
+    action_query = create_action_query()
+
+    output = execute_command(Remove, action_query, file_path=file_paths, stage=True)
+
+    trash_directory = tmp_path / trash.TRASH_NAME / action_query.buffer.uuid
+    assert not any(path.exists() for path in file_paths)
+    assert sorted(staged for _, staged in output["staged_paths"]) == [
+        trash_directory / "file.exr",
+        trash_directory / "folder",
+    ]
+    assert (trash_directory / "folder" / "nested" / "file.exr").exists()
+    assert action_query.trash_roots == {tmp_path / trash.TRASH_NAME}
+
+    command = create_command(Remove)
+    command.command_buffer.output_result = output
+    asyncio.run(command.undo({}, action_query, logging.getLogger("test_remove")))
+
+    assert all(path.exists() for path in file_paths)
+    assert (directory / "nested" / "file.exr").exists()
+    assert not (tmp_path / trash.TRASH_NAME).exists()
+    assert command.command_buffer.output_result == {"staged_paths": []}
+
+
+def test_restore_paths_existing(tmp_path: pathlib.Path):
+    """
+    Test that a staged file is not restored over a new file at the same path
+    """
+    (tmp_path / "file.exr").write_bytes(b"old")
+    staged_paths = trash.stage_paths([tmp_path / "file.exr"], "action")
+    (tmp_path / "file.exr").write_bytes(b"new")
+
+    with pytest.raises(FileExistsError):
+        trash.restore_paths(staged_paths)
+    assert (tmp_path / "file.exr").read_bytes() == b"new"
+
+
+def test_purge_trash(tmp_path: pathlib.Path):
+    """
+    Test that only the trash directories older than the retention are purged
+    """
+    for name in ["old", "recent"]:
+        (tmp_path / name).mkdir()
+        create_tree(tmp_path / name / "folder")
+        trash.stage_paths([tmp_path / name / "folder"], name)
+    trash_root = tmp_path / "old" / trash.TRASH_NAME
+    expired = time.time() - 2 * 60 * 60
+    os.utime(trash_root / "old", (expired, expired))
+
+    trash_roots = [tmp_path / name / trash.TRASH_NAME for name in ["old", "recent"]]
+    trash.purge_trash(trash_roots, retention=60 * 60)
+
+    assert not trash_root.exists()
+    assert (tmp_path / "recent" / trash.TRASH_NAME / "recent" / "folder").exists()
+
+
+def test_purge_action_trash(tmp_path: pathlib.Path):
+    """
+    Test that only the trash directory of the given action is purged
+    """
+    for name in ["closed", "open"]:
+        (tmp_path / name).write_bytes(name.encode())
+        trash.stage_paths([tmp_path / name], name)
+    trash_root = tmp_path / trash.TRASH_NAME
+
+    trash.purge_action_trash([trash_root], "closed")
+    assert not (trash_root / "closed").exists()
+    assert (trash_root / "open" / "open").exists()
+
+    trash.purge_action_trash([trash_root], "open")
+    assert not trash_root.exists()
@@ -0,0 +1,90 @@
+"""
+@author: TD gang
+
+Unit testing functions for the module utils.scan
+"""
+
+import os
+import pathlib
+
+import pytest
+
+from silex_client.utils import scan
+
+
+def create_files(directory: pathlib.Path, names):
+    directory.mkdir(parents=True, exist_ok=True)
+    for index, name in enumerate(names):
+        (directory / name).write_bytes(b"x" * index)
+    return [directory / name for name in names]
+
+
+@pytest.mark.parametrize("with_stat", [True, False])
+def test_stat_paths(tmp_path: pathlib.Path, with_stat: bool):
+    """
+    Test the stats of the listed directories and of the small ones, stated file by file
+    """
+    listed = create_files(tmp_path / "listed", [f"file.{i}.exr" for i in range(6)])
+    small = create_files(tmp_path / "small", ["file.exr"])
+    (tmp_path / "listed" / "folder").mkdir()
+    paths = [
+        *listed,
+        *small,
+        tmp_path / "listed" / "folder",
+        tmp_path / "listed" / "missing.exr",
+        tmp_path / "missing" / "file.0.exr",
+        *[tmp_path / "missing" / f"file.{i}.exr" for i in range(1, 6)],
+    ]
+
+    file_stats = scan.stat_paths(paths, with_stat)
+
+    assert set(file_stats) == set(paths)
+    for path in [*listed, *small]:
+        assert file_stats[path].exists
+        assert not file_stats[path].is_dir
+        expected_size = path.stat().st_size if with_stat else 0
+        assert file_stats[path].size == expected_size
+    assert file_stats[tmp_path / "listed" / "folder"].is_dir
+    assert file_stats[tmp_path / "listed" / "missing.exr"] is scan.MISSING
+    for index in range(6):
+        assert file_stats[tmp_path / "missing" / f"file.{index}.exr"] is scan.MISSING
+
+
+def test_stat_paths_broken_symlink(tmp_path: pathlib.Path):
+    """
+    Test that a broken symlink is missing, like for os.path.exists
+    """
+    paths = create_files(tmp_path, [f"file.{i}.exr" for i in range(4)])
+    os.symlink(tmp_path / "nowhere.exr", tmp_path / "link.exr")
+    paths.append(tmp_path / "link.exr")
+
+    for with_stat in [True, False]:
+        file_stats = scan.stat_paths(paths, with_stat)
+        assert file_stats[tmp_path / "link.exr"] is scan.MISSING
+        assert all(file_stats[path].exists for path in paths[:-1])
+
+
+def test_stat_paths_case_insensitive(tmp_path: pathlib.Path, monkeypatch):
+    """
+    Test that on macOS, a path that only differs by its case from a listed file
+    is stated, the volume might be case insensitive
+    """
+    create_files(tmp_path, [f"File.{i}.EXR" for i in range(4)])
+    stated = []
+
+    def stat_case_insensitive(path, with_stat):
+        stated.append(path)
+        return scan.FileStat(exists=True)
+
+    monkeypatch.setattr(scan.sys, "platform", "darwin")
+    monkeypatch.setattr(scan, "_stat_path", stat_case_insensitive)
+    paths = [tmp_path / f"file.{i}.exr" for i in range(4)]
+    paths.append(tmp_path / "other.exr")
+    paths.append(tmp_path / "File.0.EXR")
+
+    file_stats = scan.stat_paths(paths)
+
+    assert stated == paths[:4]
+    assert all(file_stats[path].exists for path in paths[:4])
+    assert file_stats[tmp_path / "other.exr"] is scan.MISSING
+    assert file_stats[tmp_path / "File.0.EXR"].exists
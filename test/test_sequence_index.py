@@ -0,0 +1,116 @@
+"""
+@author: TD gang
+
+Unit testing functions for the module utils.sequence_index
+"""
+
+import asyncio
+import logging
+import os
+from types import SimpleNamespace
+
+import silex_client.utils.sequence_index as sequence_index_module
+from silex_client.commands.select_conform import SelectConform
+from silex_client.utils.scan import scan_sequences
+from silex_client.utils.sequence_index import SequenceIndex
+
+from .mocks.command import create_action_query, create_command
+
+
+def test_sequence_index_cache(tmp_path):
+    """
+    Test that a directory is listed once, and listed again after an invalidation
+    """
+    for frame in range(10):
+        (tmp_path / f"render.{frame:04d}.exr").touch()
+
+    sequence_index = SequenceIndex()
+    for frame in range(10):
+        sequence = sequence_index.find_sequence_of_file(
+            tmp_path / f"render.{frame:04d}.exr"
+        )
+        assert sequence is not None and len(sequence) == 10
+    assert sequence_index.stats()["misses"] == 1
+
+    os.rename(tmp_path / "render.0000.exr", tmp_path / "other.exr")
+    sequence_index.invalidate(tmp_path)
+    assert sequence_index.find_sequence_of_file(tmp_path / "render.0000.exr") is None
+    assert sequence_index.find_sequence(tmp_path / "other.exr", "other", ".exr")
+
+
+def test_scan_sequences(tmp_path):
+    """
+    Test that the sequences are yielded while scanning, and that the last yield is complete
+    """
+    for frame in range(1, 51):
+        (tmp_path / f"render.{frame:04d}.exr").touch()
+    (tmp_path / "render.exr").touch()
+    (tmp_path / "preview.1.jpg").touch()
+
+    snapshots = list(scan_sequences(tmp_path, chunk_size=10))
+    assert len(snapshots) > 1
+
+    records = {(record.basename, record.extension): record for record in snapshots[-1]}
+    assert len(records["render.", ".exr"]) == 50
+    assert records["render.", ".exr"].padding == 4
+    assert records["render", ".exr"].frame_set is None
+    assert [path.name for path in records["preview.", ".jpg"].paths()] == [
+        "preview.1.jpg"
+    ]
+
+
+def test_sequence_index_progress(tmp_path, monkeypatch):
+    """
+    Test that the sequences found during the scan are reported when asked,
+    and that the directory is grouped at once otherwise
+    """
+    for frame in range(1, 51):
+        (tmp_path / f"render.{frame:04d}.exr").touch()
+    monkeypatch.setattr(sequence_index_module, "SCAN_CHUNK_SIZE", 10)
+
+    snapshots = []
+    sequence = SequenceIndex().find_sequence_of_file(
+        tmp_path / "render.0001.exr", snapshots.append
+    )
+    assert len(sequence) == 50
+    assert len(snapshots) > 1
+    assert sum(len(record) for record in snapshots[-1]) == 50
+
+    def group_sequences(*args, **kwargs):
+        raise AssertionError("The sequences are not needed during the scan")
+
+    monkeypatch.setattr(sequence_index_module, "group_sequences", group_sequences)
+    sequence = SequenceIndex().find_sequence_of_file(tmp_path / "render.0001.exr")
+    assert len(sequence) == 50
+
+
+def test_select_conform_scan(tmp_path, monkeypatch):
+    """
+    Test that the amount of files scanned is displayed while looking for the sequences
+    """
+    for frame in range(1, 51):
+        (tmp_path / f"render.{frame:04d}.exr").touch()
+    monkeypatch.setattr(sequence_index_module, "SCAN_CHUNK_SIZE", 10)
+    labels = []
+
+    class CommandBuffer(SimpleNamespace):
+        def __setattr__(self, name, value):
+            if name == "label":
+                labels.append(value)
+            super().__setattr__(name, value)
+
+    command = create_command(SelectConform)
+    command.command_buffer = CommandBuffer(**vars(command.command_buffer))
+    parameters = {
+        "file_paths": [tmp_path / "render.0001.exr"],
+        "find_sequence": True,
+        "auto_select_type": False,
+        "conform_type": "exr",
+    }
+    output = asyncio.run(
+        command(parameters, create_action_query(), logging.getLogger("test"))
+    )
+
+    assert len(output["files"][0]["file_paths"]) == 50
+    assert "SelectConform (50 files scanned)" in labels
+    assert command.command_buffer.label == "SelectConform"
@@ -0,0 +1,68 @@
+"""
+@author: TD gang
+
+Unit testing functions for the module utils.serialiser
+"""
+
+import copy
+import json
+import pathlib
+
+from silex_client.utils.datatypes import CommandLogs
+from silex_client.utils.path_sequence import PathSequence
+from silex_client.utils.serialiser import (
+    PATH_SEQUENCE_KEY,
+    PathSequenceStats,
+    compress_paths,
+    expand_paths,
+    silex_diff,
+    silex_encoder,
+)
+
+
+def test_path_sequence_wire_format():
+    """
+    Test that the path lists are compressed without loss, and that the other lists
+    are sent as they are
+    """
+    paths = [pathlib.Path(f"/render/beauty.{frame:04d}.exr") for frame in range(1, 101)]
+    data = {
+        "src": paths,
+        "file_paths": PathSequence(paths),
+        "name": [f"50%_beauty.{frame}.exr" for frame in range(-5, 95)],
+        "types": ["image"] * 100,
+        "short": paths[:2],
+    }
+    stats = PathSequenceStats()
+    compressed = compress_paths(data, stats)
+
+    assert PATH_SEQUENCE_KEY in compressed["src"]
+    assert PATH_SEQUENCE_KEY in compressed["file_paths"]
+    assert PATH_SEQUENCE_KEY in compressed["name"]
+    assert compressed["types"] == data["types"]
+    assert compressed["short"] == data["short"]
+
+    raw_payload = json.dumps(data, default=silex_encoder)
+    payload = json.dumps(compressed, default=silex_encoder)
+    assert expand_paths(json.loads(payload)) == json.loads(raw_payload)
+    assert stats.lists == 3
+    assert stats.compressed_bytes < stats.raw_bytes
+
+
+def test_log_stream_diff():
+    """
+    Test that only the new logs are sent, and that the old logs are dropped
+    """
+    logs = CommandLogs()
+    logs.max_size = 3
+    for index in range(2):
+        logs.append({"level": "INFO", "message": f"log {index}"})
+    previous = {"logs": copy.deepcopy(logs)}
+    assert silex_diff(previous, {"logs": copy.deepcopy(logs)}, log_stream=True) == {}
+
+    for index in range(2, 5):
+        logs.append({"level": "INFO", "message": f"log {index}"})
+    diff = silex_diff(previous, {"logs": copy.deepcopy(logs)}, log_stream=True)
+    assert diff["logs"]["start"] == 2 and diff["logs"]["cursor"] == 5
+    assert [log["index"] for log in diff["logs"]["logs"]] == [2, 3, 4]
+    assert silex_diff(previous, {"logs": logs})["logs"] == list(logs)
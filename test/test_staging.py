@@ -0,0 +1,167 @@
+"""
+@author: TD gang
+
+Unit testing functions for the module utils.staging
+"""
+
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import time
+
+import silex_client.commands.conform_transfer as conform_transfer_module
+from silex_client.commands.conform_transfer import ConformTransfer
+from silex_client.commands.move import Move
+from silex_client.utils import staging
+from silex_client.utils.enums import ConflictBehaviour
+from silex_client.utils.path_sequence import PathSequence
+
+from .mocks.command import create_action_query, execute_command
+
+
+def create_staging(parent: pathlib.Path, files) -> pathlib.Path:
+    staging_path = staging.create_staging_directory(staging.get_staging_path(parent))
+    for name, content in files.items():
+        (staging_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (staging_path / name).write_bytes(content)
+    return staging_path
+
+
+def test_commit_staging_missing_directory(tmp_path: pathlib.Path):
+    """
+    Test that the staging directory is renamed to a missing final directory
+    """
+    staging_path = create_staging(tmp_path, {"a.exr": b"a", "b.exr": b"b"})
+    directory = tmp_path / "output"
+
+    committed = staging.commit_staging_directory(staging_path, directory)
+
+    assert sorted(committed) == [directory / "a.exr", directory / "b.exr"]
+    assert sorted(path.name for path in directory.iterdir()) == ["a.exr", "b.exr"]
+    assert not staging_path.exists()
+
+
+def test_commit_staging_non_empty_directory(tmp_path: pathlib.Path):
+    """
+    Test that the entries of the staging directory are merged into a non empty
+    final directory, the existing files and directories with the same name are replaced
+    """
+    directory = tmp_path / "output"
+    (directory / "folder").mkdir(parents=True)
+    (directory / "folder" / "old.exr").write_bytes(b"old")
+    (directory / "a.exr").write_bytes(b"old")
+    (directory / "kept.exr").write_bytes(b"kept")
+    staging_path = create_staging(tmp_path, {"a.exr": b"new", "folder/new.exr": b"new"})
+
+    staging.commit_staging_directory(staging_path, directory)
+
+    assert (directory / "a.exr").read_bytes() == b"new"
+    assert (directory / "kept.exr").read_bytes() == b"kept"
+    assert [path.name for path in (directory / "folder").iterdir()] == ["new.exr"]
+    assert not (directory / staging.STAGING_MARKER).exists()
+    assert not staging_path.exists()
+
+
+def test_staging_stale(tmp_path: pathlib.Path):
+    """
+    Test that a staging directory is stale when its process is dead or when it is too old,
+    and that only the stale ones are cleaned
+    """
+    alive = create_staging(tmp_path, {})
+    dead = create_staging(tmp_path, {})
+    old = create_staging(tmp_path, {})
+
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    marker_path = dead / staging.STAGING_MARKER
+    marker = json.loads(marker_path.read_text(encoding="utf-8"))
+    marker["pid"] = process.pid
+    marker_path.write_text(json.dumps(marker), encoding="utf-8")
+    expired = time.time() - 2 * 60 * 60
+    os.utime(old, (expired, expired))
+
+    assert not staging.is_staging_stale(alive, 60 * 60)
+    assert staging.is_staging_stale(dead, 60 * 60) == (os.name != "nt")
+    assert staging.is_staging_stale(old, 60 * 60)
+
+    staging.clean_stale_staging(tmp_path, 60 * 60)
+    assert alive.exists()
+    assert not old.exists()
+
+
+def test_move_commit_staging(tmp_path: pathlib.Path):
+    """
+    Test that the staging directory moved by a publish is committed and removed
+    """
+    staging_path = create_staging(tmp_path, {"a.exr": b"a"})
+    directory = tmp_path / "output"
+
+    output = execute_command(Move, src=[staging_path], dst=directory, merge=True)
+
+    assert str(staging_path) in output["timings"]
+    assert (directory / "a.exr").read_bytes() == b"a"
+    assert not staging_path.exists()
+    assert [path.name for path in tmp_path.iterdir()] == ["output"]
+
+
+def test_conform_transfer_staging(tmp_path: pathlib.Path):
+    """
+    Test that the conform creates its staging directory itself, and commits it
+    """
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "source.exr").write_bytes(b"source")
+    staging_path = staging.get_staging_path(tmp_path)
+
+    execute_command(
+        ConformTransfer,
+        src=PathSequence([tmp_path / "src" / "source.exr"]),
+        dst=tmp_path / "output",
+        name=["conform.exr"],
+        temp_dir=staging_path,
+    )
+
+    assert (tmp_path / "output" / "conform.exr").read_bytes() == b"source"
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["output", "src"]
+
+
+def test_conform_transfer_staging_nothing_to_transfer(
+    tmp_path: pathlib.Path, monkeypatch
+):
+    """
+    Test that the conform does not create, clean nor commit its staging directory
+    when all the destination files are kept
+    """
+    calls = []
+    for name in [
+        "create_staging_directory",
+        "clean_stale_staging",
+        "commit_staging_directory",
+    ]:
+        monkeypatch.setattr(
+            conform_transfer_module,
+            name,
+            lambda *args, name=name: calls.append(name),
+        )
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "source.exr").write_bytes(b"source")
+    (tmp_path / "output").mkdir()
+    (tmp_path / "output" / "conform.exr").write_bytes(b"existing")
+    action_query = create_action_query()
+    action_query.store["file_conflict_behaviour"] = (
+        ConflictBehaviour.ALWAYS_KEEP_EXISTING
+    )
+
+    execute_command(
+        ConformTransfer,
+        action_query,
+        src=PathSequence([tmp_path / "src" / "source.exr"]),
+        dst=tmp_path / "output",
+        name=["conform.exr"],
+        temp_dir=staging.get_staging_path(tmp_path),
+        force=False,
+    )
+
+    assert (tmp_path / "output" / "conform.exr").read_bytes() == b"existing"
+    assert calls == []
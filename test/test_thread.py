@@ -0,0 +1,114 @@
+"""
+@author: TD gang
+
+Unit testing functions for the module utils.thread
+"""
+
+import asyncio
+import threading
+import time
+from concurrent import futures
+
+import pytest
+
+from silex_client.utils.thread import (
+    ExecutionInThread,
+    MainThreadDispatcher,
+    get_thread_pool,
+)
+
+
+def test_execute_in_thread_pool():
+    """
+    Test that the functions are executed in the shared pool and their results awaited
+    """
+    execute_in_test_thread = ExecutionInThread("unittest")
+    thread_pool = get_thread_pool("unittest")
+
+    async def execute_all():
+        return await asyncio.gather(
+            *[execute_in_test_thread(pow, index, 2) for index in range(20)]
+        )
+
+    results = asyncio.run(execute_all())
+
+    assert results == [index**2 for index in range(20)]
+    stats = thread_pool.stats()
+    assert stats["submitted"] == 20
+    assert stats["completed"] == 20
+    assert stats["queue_depth"] == 0
+
+
+def test_execute_in_thread_exception():
+    """
+    Test that the exceptions raised in the thread are raised back in the event loop
+    """
+    execute_in_test_thread = ExecutionInThread("unittest")
+
+    with pytest.raises(ValueError):
+        asyncio.run(execute_in_test_thread(int, "not_a_number"))
+
+
+def test_execute_in_thread_base_exception():
+    """
+    Test that the exceptions that don't inherit from Exception are raised back too
+    """
+    execute_in_test_thread = ExecutionInThread("unittest")
+
+    def exit_thread():
+        raise SystemExit(1)
+
+    async def execute_exit():
+        return await asyncio.wait_for(execute_in_test_thread(exit_thread), 5)
+
+    with pytest.raises(SystemExit):
+        asyncio.run(execute_exit())
+
+
+def test_execute_in_thread_cancel():
+    """
+    Test that the queued functions are not executed if the awaiting task is cancelled
+    """
+    execute_in_test_thread = ExecutionInThread("unittest")
+    executed = []
+
+    async def cancel_queued():
+        # Fill the pool so the next function stay in the queue
+        blocking = [
+            asyncio.ensure_future(execute_in_test_thread(time.sleep, 0.1))
+            for _ in range(get_thread_pool("unittest").max_workers)
+        ]
+        queued = asyncio.ensure_future(execute_in_test_thread(executed.append, 1))
+        await asyncio.sleep(0)
+        queued.cancel()
+        await asyncio.gather(*blocking)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(cancel_queued())
+    assert not executed
+
+
+def test_main_thread_dispatcher():
+    """
+    Test that the callables posted from the event loop are executed in the owner thread
+    """
+    dispatcher = MainThreadDispatcher()
+    event_loop = asyncio.new_event_loop()
+    owner_thread = threading.current_thread()
+
+    async def post_calls():
+        return await asyncio.gather(
+            *[dispatcher.execute(threading.current_thread) for _ in range(10)]
+        )
+
+    future = futures.Future()
+
+    def run_event_loop():
+        future.set_result(event_loop.run_until_complete(post_calls()))
+
+    threading.Thread(target=run_event_loop, daemon=True).start()
+    dispatcher.run_until_complete(future)
+
+    assert future.result() == [owner_thread] * 10
+    assert dispatcher.stats()["executed"] == 10
+    assert dispatcher.stats()["queue_depth"] == 0
@@ -0,0 +1,121 @@
+"""
+@author: TD gang
+
+Unit testing functions for the module utils.transfer
+"""
+
+import errno
+import os
+import pathlib
+import shutil
+
+import pytest
+
+from silex_client.utils import transfer
+from silex_client.utils.datatypes import SharedVariable
+
+
+def create_source(tmp_path: pathlib.Path, size: int) -> pathlib.Path:
+    src = tmp_path / "src.bin"
+    src.write_bytes(os.urandom(size))
+    return src
+
+
+@pytest.mark.parametrize(
+    "method", ["reflink", "copy_file_range", "sendfile", "buffered"]
+)
+def test_copy_file_fallbacks(tmp_path: pathlib.Path, monkeypatch, method: str):
+    """
+    Test that each method of the copy chain copies the whole file,
+    and that the next one is used when a method is not supported
+    """
+    src = create_source(tmp_path, 3 * transfer.BUFFER_SIZE + 123)
+    dst = tmp_path / "dst.bin"
+    used = []
+
+    def fake_reflink(fsrc, fdst):
+        if method != "reflink":
+            return False
+        used.append("reflink")
+        shutil.copyfileobj(fsrc, fdst)
+        return True
+
+    def get_kernel_copy(name, kernel_copy):
+        def fake_kernel_copy(*args):
+            if method != name:
+                raise OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+            used.append(name)
+            return kernel_copy(*args)
+
+        return fake_kernel_copy
+
+    def fake_buffered(fsrc, fdst, report):
+        used.append("buffered")
+        transfer_copy_file_buffered(fsrc, fdst, report)
+
+    transfer_copy_file_buffered = transfer.copy_file_buffered
+    monkeypatch.setattr(transfer, "copy_file_reflink", fake_reflink)
+    monkeypatch.setattr(transfer, "copy_file_buffered", fake_buffered)
+    for name in ["copy_file_range", "sendfile"]:
+        if hasattr(os, name):
+            monkeypatch.setattr(os, name, get_kernel_copy(name, getattr(os, name)))
+    if method in ["copy_file_range", "sendfile"] and not hasattr(os, method):
+        pytest.skip(f"os.{method} is not available on this platform")
+
+    progress = SharedVariable(0)
+    transfer.copy_file(src, dst, progress)
+
+    assert dst.read_bytes() == src.read_bytes()
+    assert progress.value == src.stat().st_size
+    assert used[0] == method
+    # The buffered copy only copies the rest of the file, nothing in this case
+    assert set(used) <= {method, "buffered"}
+
+
+def test_copy_file_permissions(tmp_path: pathlib.Path):
+    """
+    Test that the permissions of the source are copied, but not its modification time
+    """
+    src = create_source(tmp_path, 1024)
+    os.chmod(src, 0o640)
+    os.utime(src, (1000000000, 1000000000))
+    dst = tmp_path / "dst.bin"
+
+    transfer.copy_file(src, dst, SharedVariable(0))
+    assert dst.stat().st_mode & 0o777 == 0o640
+    assert dst.stat().st_mtime != 1000000000
+
+
+def test_copy_file_ranges(tmp_path: pathlib.Path, monkeypatch):
+    """
+    Test that the large files are copied by ranges, with and without preallocation
+    """
+    src = create_source(tmp_path, 10 * 1024 + 17)
+
+    for preallocated in [True, False]:
+        if not preallocated:
+            monkeypatch.setattr(transfer, "preallocate", lambda fd, size: False)
+        dst = tmp_path / f"dst_{preallocated}.bin"
+        progress = SharedVariable(0)
+        transfer.copy_file_ranges(src, dst, progress, range_size=1024)
+
+        assert dst.read_bytes() == src.read_bytes()
+        assert progress.value == src.stat().st_size
+
+
+def test_verify_ranges(tmp_path: pathlib.Path):
+    """
+    Test that a corruption anywhere in a range is detected, not only at its edges
+    """
+    src = create_source(tmp_path, 4 * 1024 * 1024)
+    dst = tmp_path / "dst.bin"
+    ranges = [(0, 2 * 1024 * 1024), (2 * 1024 * 1024, 4 * 1024 * 1024)]
+    shutil.copyfile(src, dst)
+    assert transfer.verify_ranges(src, dst, ranges)
+
+    with open(dst, "r+b") as fdst:
+        fdst.seek(3 * 1024 * 1024)
+        byte = fdst.read(1)
+        fdst.seek(3 * 1024 * 1024)
+        fdst.write(bytes([byte[0] ^ 0xFF]))
+    assert not transfer.verify_ranges(src, dst, ranges)
@@ -0,0 +1,125 @@
+"""
+@author: TD gang
+
+Unit testing functions for the module network.websocket_log
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from silex_client.network.websocket_log import WebsocketLogHandler
+from silex_client.utils.datatypes import CommandLogs
+
+
+@pytest.fixture
+def event_loop_thread():
+    """
+    Event loop running in its own thread, like the event loop of the context
+    """
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    def call_in_command_loop(callback, *args):
+        loop.call_soon_threadsafe(callback, *args)
+
+    yield SimpleNamespace(
+        loop=loop,
+        thread=thread,
+        is_running=True,
+        call_in_command_loop=call_in_command_loop,
+    )
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def create_handler(event_loop) -> WebsocketLogHandler:
+    updates = []
+    action_query = SimpleNamespace(
+        buffer=SimpleNamespace(simplify=False),
+        event_loop=event_loop,
+        update_websocket=lambda: updates.append(threading.current_thread()),
+        updates=updates,
+    )
+    command = SimpleNamespace(logs=CommandLogs(), outdated_cache=False)
+    return WebsocketLogHandler(action_query, command)
+
+
+def create_record(message: str, level: int = logging.INFO) -> logging.LogRecord:
+    return logging.LogRecord("test", level, __file__, 1, message, (), None)
+
+
+def wait_for(condition, timeout: float = 2.0) -> bool:
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_websocket_log_batched(event_loop_thread):
+    """
+    Test that the records emitted from several threads are sent in a single update
+    """
+    handler = create_handler(event_loop_thread)
+    handler.flush_interval = 0.2
+    handler.batch_size = 1000
+
+    emitters = [
+        threading.Thread(
+            target=lambda index=index: [
+                handler.emit(create_record(f"log {index} {count}"))
+                for count in range(10)
+            ]
+        )
+        for index in range(4)
+    ]
+    for emitter in emitters:
+        emitter.start()
+    for emitter in emitters:
+        emitter.join()
+
+    assert wait_for(lambda: len(handler.silex_command.logs) == 40)
+    time.sleep(0.3)
+    # The logs are flushed from the thread of the loop that runs the action
+    assert handler.action_query.updates == [event_loop_thread.thread]
+    assert handler.silex_command.outdated_cache
+    assert [log["index"] for log in handler.silex_command.logs] == list(range(40))
+
+
+def test_websocket_log_batch_size(event_loop_thread):
+    """
+    Test that the records are sent without waiting for the interval
+    once the batch is full
+    """
+    handler = create_handler(event_loop_thread)
+    handler.flush_interval = 60
+    handler.batch_size = 5
+
+    for count in range(5):
+        handler.emit(create_record(f"log {count}"))
+
+    assert wait_for(lambda: len(handler.silex_command.logs) == 5)
+    assert len(handler.action_query.updates) == 1
+
+
+def test_websocket_log_not_running():
+    """
+    Test that the records are stored right away without update when the loop
+    is not running, and that the debug records are ignored
+    """
+    handler = create_handler(SimpleNamespace(is_running=False))
+
+    handler.emit(create_record("debug", logging.DEBUG))
+    handler.emit(create_record("info"))
+    handler.emit(create_record("error", logging.ERROR))
+
+    assert [log["level"] for log in handler.silex_command.logs] == ["INFO", "ERROR"]
+    assert handler.action_query.updates == []